@@ -1,10 +1,202 @@
+"""
+Admin for tables with millions of rows.
+
+Changelists join their foreign keys, never count the whole table and only
+search and filter on indexed columns. Forms use raw id widgets instead of a
+``<select>`` of every user or post, and moderation actions run one query per
+table whatever the number of rows selected.
+"""
+import json
+
+from django.conf import settings
 from django.contrib import admin
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from app.models import (Comment, Job, Like, Post, Profile, TimelineEntry,
+                        TrendingPost, User)
+
+MAX_ID = 2 ** 63 - 1
+
+
+def estimate_count(queryset):
+    """Return the planner's estimate of the number of rows of ``queryset``."""
+    try:
+        sql, params = queryset.order_by().query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Count exactly up to ``ADMIN_EXACT_COUNT_LIMIT`` rows, estimate above."""
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate > settings.ADMIN_EXACT_COUNT_LIMIT:
+            return estimate
+        return super().count
+
+
+def delete_comments(comments):
+    """Delete ``comments`` and their likes, one query per table."""
+    comment_ids = comments.values('pk')
+    with transaction.atomic(using=comments.db):
+        Like.objects.filter(comment__in=comment_ids)._raw_delete(comments.db)
+        return Comment.objects.filter(pk__in=comment_ids)._raw_delete(comments.db)
+
+
+def delete_posts(posts):
+    """Delete ``posts`` with their comments, likes, rankings and timeline entries, one query per table."""
+    post_ids = posts.values('pk')
+    with transaction.atomic(using=posts.db):
+        TrendingPost.objects.filter(post__in=post_ids)._raw_delete(posts.db)
+        TimelineEntry.objects.filter(post__in=post_ids)._raw_delete(posts.db)
+        Like.objects.filter(Q(post__in=post_ids) | Q(comment__post__in=post_ids))._raw_delete(posts.db)
+        Comment.objects.filter(post__in=post_ids)._raw_delete(posts.db)
+        return Post.objects.filter(pk__in=post_ids)._raw_delete(posts.db)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Base admin for the big tables.
+
+    Searches match the exact id, the id of ``search_id_fields`` or the
+    username of ``search_user_field``, all indexed, instead of scanning
+    every row with ``icontains``.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    ordering = ('-pk',)
+    search_id_fields = ('pk',)
+    search_user_field = None
+    actions = ['delete_rows']
+
+    def get_actions(self, request):
+        # The default action loads and lists every related row to confirm.
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        query = Q()
+        if term.isdigit() and int(term) <= MAX_ID:
+            for field in self.search_id_fields:
+                query |= Q(**{field: int(term)})
+        if self.search_user_field:
+            user_id = User.objects.filter(username=term).values_list('pk', flat=True).first()
+            if user_id is not None:
+                query |= Q(**{self.search_user_field: user_id})
+        if not query:
+            return queryset.none(), False
+        return queryset.filter(query), False
+
+    def delete_queryset(self, request, queryset):
+        return queryset.delete()[0]
+
+    @admin.action(description='Delete selected %(verbose_name_plural)s', permissions=['delete'])
+    def delete_rows(self, request, queryset):
+        deleted = self.delete_queryset(request, queryset)
+        self.message_user(request, f'Deleted {deleted} {self.model._meta.verbose_name_plural}.')
+
+
+class CategoryFilter(admin.SimpleListFilter):
+    """Filter on the indexed category, the choices are cached."""
+    title = 'category'
+    parameter_name = 'category'
+
+    def lookups(self, request, model_admin):
+        categories = cache.get('admin:post-categories')
+        if categories is None:
+            categories = list(Post.objects.order_by('category').values_list('category', flat=True).distinct())
+            cache.set('admin:post-categories', categories, settings.ADMIN_FILTER_CHOICES_TTL)
+        return [(category, category) for category in categories]
+
+    def queryset(self, request, queryset):
+        if self.value() is not None:
+            return queryset.filter(category=self.value())
+        return queryset
+
+
+@admin.register(Post)
+class PostAdmin(LargeTableAdmin):
+    list_display = ('id', 'title', 'author', 'category', 'publish_date', 'created')
+    list_select_related = ('author',)
+    list_filter = (CategoryFilter,)
+    raw_id_fields = ('author',)
+    search_fields = ('=id', '=author__username')
+    search_user_field = 'author'
+    actions = ['delete_rows', 'unpublish']
+
+    def delete_queryset(self, request, queryset):
+        return delete_posts(queryset)
+
+    @admin.action(description='Unpublish selected posts', permissions=['change'])
+    def unpublish(self, request, queryset):
+        updated = queryset.update(publish_date=None, modified=timezone.now())
+        self.message_user(request, f'Unpublished {updated} posts.')
+
+
+@admin.register(Comment)
+class CommentAdmin(LargeTableAdmin):
+    list_display = ('id', 'text', 'user', 'post', 'created')
+    list_select_related = ('user', 'post')
+    raw_id_fields = ('user', 'post')
+    search_fields = ('=id', '=post__id', '=user__username')
+    search_id_fields = ('pk', 'post')
+    search_user_field = 'user'
+
+    def delete_queryset(self, request, queryset):
+        return delete_comments(queryset)
+
+
+@admin.register(Like)
+class LikeAdmin(LargeTableAdmin):
+    list_display = ('id', 'user', 'post', 'comment', 'created')
+    list_select_related = ('user', 'post', 'comment')
+    raw_id_fields = ('user', 'post', 'comment')
+    search_fields = ('=id', '=post__id', '=comment__id', '=user__username')
+    search_id_fields = ('pk', 'post', 'comment')
+    search_user_field = 'user'
+
+
+@admin.register(User)
+class UserAdmin(admin.ModelAdmin):
+    list_display = ('id', 'username', 'email', 'first_name', 'last_name')
+    search_fields = ('=username', '=email')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    ordering = ('-pk',)
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        return queryset.filter(Q(username=term) | Q(email=term)), False
+
+
+@admin.register(Profile)
+class ProfileAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'created')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
 
-from app.models import Comment, Like, Post, Profile, User
 
-# Register your models here.
-admin.site.register(User)
-admin.site.register(Profile)
-admin.site.register(Post)
-admin.site.register(Comment)
-admin.site.register(Like)
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'priority', 'run_at', 'attempts')
+    list_filter = ('status',)
+    search_fields = ('=name', '=dedup_key')
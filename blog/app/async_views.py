@@ -0,0 +1,162 @@
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import (AuthenticationFailed, NotAuthenticated,
+                                       NotFound)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_api_settings
+
+from app.models import Comment, Post, User
+from app.serializers import PostSerializer, ShowCommentSerializer
+
+
+class AsyncReadView(View):
+    """Base view serving GET natively on the event loop.
+
+    Authentication runs the JWT validation in process and fetches the user
+    with the async ORM, so a slow client never ties up a worker thread.
+    Any other method, and ``?expand=``, is handed to the synchronous DRF view
+    in ``fallback``.
+    """
+    fallback = None
+    serializer_class = None
+    renderer = JSONRenderer()
+    jwt_authentication = JWTAuthentication()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Writes are delegated to DRF views, which are CSRF exempt themselves.
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method != 'GET' or 'expand' in request.GET:
+            return await sync_to_async(self.fallback)(request, *args, **kwargs)
+        try:
+            request.user = await self.authenticate(request)
+            data = await self.get(request, *args, **kwargs)
+        except Exception as exc:
+            return self.handle_exception(request, exc)
+        return self.render(data)
+
+    async def authenticate(self, request):
+        """Return the user owning the bearer token of the request."""
+        header = self.jwt_authentication.get_header(request)
+        raw_token = self.jwt_authentication.get_raw_token(header) if header else None
+        if raw_token is None:
+            raise NotAuthenticated()
+        validated_token = self.jwt_authentication.get_validated_token(raw_token)
+        try:
+            user_id = validated_token[jwt_api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise AuthenticationFailed('Token contained no recognizable user identification')
+        try:
+            user = await User.objects.aget(**{jwt_api_settings.USER_ID_FIELD: user_id})
+        except User.DoesNotExist:
+            raise AuthenticationFailed('User not found')
+        if not user.is_active:
+            raise AuthenticationFailed('User is inactive')
+        return user
+
+    def render(self, data, status_code=status.HTTP_200_OK):
+        return HttpResponse(self.renderer.render(data), status=status_code, content_type='application/json')
+
+    def handle_exception(self, request, exc):
+        """Format errors through the project exception handler, like DRF does."""
+        if isinstance(exc, Http404):
+            exc = NotFound()
+        handler = api_settings.EXCEPTION_HANDLER
+        response = handler(exc, {'view': self, 'request': request, 'args': self.args, 'kwargs': self.kwargs})
+        if response is None:
+            raise exc
+        if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+            response['WWW-Authenticate'] = self.jwt_authentication.authenticate_header(request)
+        return self.finalize(response)
+
+    def finalize(self, response: Response):
+        response.accepted_renderer = self.renderer
+        response.accepted_media_type = self.renderer.media_type
+        response.renderer_context = {}
+        return response.render()
+
+
+class AsyncListView(AsyncReadView):
+    """Async list view paginated exactly like ``PageNumberPagination``."""
+    page_query_param = 'page'
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    async def get(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        page_size = api_settings.PAGE_SIZE
+        count = await queryset.acount()
+        num_pages = max(1, -(-count // page_size))
+        try:
+            page_number = int(request.GET.get(self.page_query_param, 1))
+        except ValueError:
+            page_number = 0
+        if not 1 <= page_number <= num_pages:
+            raise NotFound('Invalid page.')
+        offset = (page_number - 1) * page_size
+        objects = [obj async for obj in queryset[offset:offset + page_size]]
+
+        url = request.build_absolute_uri()
+        next_link = previous_link = None
+        if page_number < num_pages:
+            next_link = replace_query_param(url, self.page_query_param, page_number + 1)
+        if page_number == 2:
+            previous_link = remove_query_param(url, self.page_query_param)
+        elif page_number > 2:
+            previous_link = replace_query_param(url, self.page_query_param, page_number - 1)
+        return {
+            'count': count,
+            'next': next_link,
+            'previous': previous_link,
+            'results': self.serializer_class(objects, many=True).data,
+        }
+
+
+class AsyncRetrieveView(AsyncReadView):
+    """Async detail view looking the object up by ``pk``."""
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    async def get(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        try:
+            instance = await queryset.aget(pk=kwargs['pk'])
+        except (ValueError, queryset.model.DoesNotExist):
+            raise NotFound('Not found.')
+        return self.serializer_class(instance).data
+
+
+class PostListView(AsyncListView):
+    """Async version of ``PostView.list``"""
+    serializer_class = PostSerializer
+
+    def get_queryset(self):
+        return Post.objects.all()
+
+
+class PostDetailView(AsyncRetrieveView):
+    """Async version of ``PostView.retrieve``"""
+    serializer_class = PostSerializer
+
+    def get_queryset(self):
+        return Post.objects.all()
+
+
+class CommentListView(AsyncListView):
+    """Async version of ``CommentView.list``"""
+    serializer_class = ShowCommentSerializer
+
+    def get_queryset(self):
+        return Comment.objects.all()
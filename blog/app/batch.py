@@ -0,0 +1,153 @@
+"""
+Several API calls in one request, dispatched in process.
+
+Each sub-request goes through the view of its path with its usual
+permissions and throttles. It is authenticated as the user of the batch, so
+the token is validated once. Sub-requests run in order. With ``parallel``,
+consecutive reads run together on a thread pool, and each write waits for the
+ones before it. With ``atomic``, everything runs in one transaction that is
+rolled back at the first error. The remaining sub-requests are then skipped
+and answer 424. A sub-request raising an unexpected exception is logged and
+answers 500, like it would on its own.
+"""
+import contextvars
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections, transaction
+from django.urls import resolve
+from rest_framework import status
+
+from blog import routers
+
+logger = logging.getLogger(__name__)
+
+READ_METHODS = ('GET',)
+
+# Parts of the batch request that do not apply to its sub-requests.
+SKIPPED_META = ('CONTENT_LENGTH', 'CONTENT_TYPE', 'PATH_INFO', 'QUERY_STRING', 'REQUEST_METHOD', 'wsgi.input')
+
+
+def build_request(request, method, path, body=None):
+    """Return the sub-request ``method path`` of ``request``, authenticated as its user."""
+    url = urlsplit(path)
+    data = json.dumps(body).encode() if body is not None else b''
+    environ = {key: value for key, value in request.META.items() if key not in SKIPPED_META}
+    environ.update({
+        'REQUEST_METHOD': method,
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(data)),
+        'wsgi.input': BytesIO(data),
+        'wsgi.url_scheme': request.scheme,
+    })
+    sub_request = WSGIRequest(environ)
+    # Picked up by DRF instead of running the authentication classes again.
+    sub_request._force_auth_user = request.user
+    sub_request._force_auth_token = request.auth
+    return sub_request
+
+
+def get_view(path):
+    """Return the view of ``path``, the synchronous one for async read views, with its arguments."""
+    match = resolve(urlsplit(path).path)
+    view = match.func
+    fallback = getattr(view, 'view_initkwargs', {}).get('fallback')
+    return fallback or view, match.args, match.kwargs
+
+
+def dispatch(request, item):
+    """Run one sub-request and return its result."""
+    view, args, kwargs = get_view(item['path'])
+    try:
+        response = view(build_request(request, item['method'], item['path'], item.get('body')), *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+    except Exception:
+        # The results of the sub-requests before it must still reach the client.
+        logger.exception('Batch sub-request %s %s failed', item['method'], item['path'])
+        body = {'detail': 'A server error occurred.'}
+        return {'id': item.get('id'), 'status': status.HTTP_500_INTERNAL_SERVER_ERROR, 'body': body}
+    if response.streaming:
+        body = {'detail': 'Streaming responses cannot be batched.'}
+        return {'id': item.get('id'), 'status': status.HTTP_501_NOT_IMPLEMENTED, 'body': body}
+    body = None
+    if response.content:
+        if response.get('Content-Type', '').startswith('application/json'):
+            body = json.loads(response.content)
+        else:
+            body = response.content.decode(response.charset)
+    return {'id': item.get('id'), 'status': response.status_code, 'body': body}
+
+
+def dispatch_in_thread(request, item):
+    try:
+        return dispatch(request, item)
+    finally:
+        for connection in connections.all():
+            connection.close()
+
+
+def skipped(item):
+    return {'id': item.get('id'), 'status': status.HTTP_424_FAILED_DEPENDENCY, 'body': None}
+
+
+def run_atomic(request, items):
+    results = []
+    # Reads have to see the writes of the transaction.
+    routers.pin_to_primary()
+    with transaction.atomic():
+        for item in items:
+            if results and results[-1]['status'] >= 400:
+                results.append(skipped(item))
+                continue
+            results.append(dispatch(request, item))
+        if results and results[-1]['status'] >= 400:
+            transaction.set_rollback(True)
+    return results
+
+
+def run_parallel(request, items):
+    results = []
+    with ThreadPoolExecutor(max_workers=settings.BATCH_MAX_WORKERS, thread_name_prefix='batch') as executor:
+        reads = []
+        for item in [*items, None]:
+            if item is not None and item['method'] in READ_METHODS:
+                # Threads inherit the replica pinning left by the writes before them.
+                reads.append(executor.submit(contextvars.copy_context().run, dispatch_in_thread, request, item))
+                continue
+            results += [future.result() for future in reads]
+            reads = []
+            if item is not None:
+                routers.pin_to_primary()
+                results.append(dispatch(request, item))
+    return results
+
+
+def run_sequential(request, items):
+    results = []
+    for item in items:
+        if item['method'] not in READ_METHODS:
+            routers.pin_to_primary()
+        results.append(dispatch(request, item))
+    return results
+
+
+def execute(request, requests, parallel=False, atomic=False):
+    """Run the sub-requests of ``request``, return their results in order."""
+    # The batch itself is a POST, its reads may still go to the replicas.
+    token = routers.set_pinned(settings.REPLICA_PIN_COOKIE in request.COOKIES)
+    try:
+        if atomic:
+            return run_atomic(request, requests)
+        if parallel:
+            return run_parallel(request, requests)
+        return run_sequential(request, requests)
+    finally:
+        routers.reset_pinned(token)
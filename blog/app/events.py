@@ -0,0 +1,321 @@
+"""
+Live comment and like events of a post, streamed as Server-Sent Events.
+
+``GET /api/v1/post/<id>/events/`` is answered straight from ``blog/asgi.py``
+by ``stream``, outside of the Django request cycle. An idle stream then holds
+no thread and no database connection, so one worker can keep thousands open.
+The access token is checked without a query, like the throttles do.
+
+Writes publish their events once committed. With ``EVENTS_BACKEND`` set to
+``local``, events reach the streams of the same process only. With
+``postgres``, they go through ``NOTIFY`` and every process listening
+receives them. Event ids are the creation time of the row in microseconds. A
+client reconnecting with ``Last-Event-ID`` first gets the comments and likes
+created since, read from the database, and those created shortly before in
+case they committed late: events may come twice. A replay cut at
+``EVENTS_REPLAY_LIMIT`` ends the stream, so the client resumes from its last
+event. Deletions are live only.
+"""
+import asyncio
+import json
+import logging
+import re
+import select
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+import psycopg2
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import (close_old_connections, connection, connections,
+                       transaction)
+from django.db.models import Q
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from app.models import Comment, Like, Post
+
+logger = logging.getLogger(__name__)
+
+PATH = re.compile(r'^/api/v1/post/(?P<pk>[0-9]+)/events/$')
+CHANNEL = 'post_events'
+OVERFLOW = object()
+RETRY_MS = 3000
+LISTEN_TIMEOUT = 5
+
+
+def event_id(moment):
+    return int(moment.timestamp() * 1_000_000)
+
+
+def format_event(event):
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n".encode()
+
+
+class Broker:
+    """Hand the events of a post to the queues of its open streams, from any thread."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = defaultdict(set)
+
+    def subscribe(self, post_id, queue):
+        with self.lock:
+            self.subscribers[post_id].add((asyncio.get_running_loop(), queue))
+
+    def unsubscribe(self, post_id, queue):
+        with self.lock:
+            subscribers = self.subscribers[post_id]
+            subscribers.discard((asyncio.get_running_loop(), queue))
+            if not subscribers:
+                del self.subscribers[post_id]
+
+    def dispatch(self, post_id, event):
+        with self.lock:
+            subscribers = list(self.subscribers.get(post_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(deliver, queue, event)
+            except RuntimeError:
+                # The loop of that stream is closed.
+                pass
+
+    def count(self):
+        with self.lock:
+            return sum(len(subscribers) for subscribers in self.subscribers.values())
+
+
+def deliver(queue, event):
+    """Queue ``event``, or end a stream too slow to keep up; its client resumes from the database."""
+    if queue.full():
+        while not queue.empty():
+            queue.get_nowait()
+        event = OVERFLOW
+    queue.put_nowait(event)
+
+
+broker = Broker()
+
+
+class Listener:
+    """Thread receiving the ``NOTIFY`` of every process on its own connection."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread = None
+        self.ready = threading.Event()
+        self.stopping = threading.Event()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.ready.clear()
+                self.stopping.clear()
+                self.thread = threading.Thread(target=self.run, name='events-listener', daemon=True)
+                self.thread.start()
+        self.ready.wait(LISTEN_TIMEOUT)
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def run(self):
+        while not self.stopping.is_set():
+            try:
+                self.listen()
+            except psycopg2.Error:
+                logger.exception('Listening to %s failed, retrying', CHANNEL)
+                self.stopping.wait(1)
+
+    def listen(self):
+        listening = psycopg2.connect(**connections['default'].get_connection_params())
+        try:
+            listening.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            with listening.cursor() as cursor:
+                cursor.execute(f'LISTEN {CHANNEL}')
+            self.ready.set()
+            while not self.stopping.is_set():
+                if select.select([listening], [], [], 1) == ([], [], []):
+                    continue
+                listening.poll()
+                while listening.notifies:
+                    message = json.loads(listening.notifies.pop(0).payload)
+                    broker.dispatch(message['post'], message['event'])
+        finally:
+            listening.close()
+
+
+listener = Listener()
+
+
+def publish(post_id, event):
+    """Send ``event`` to the streams of ``post_id``, of every process with the postgres backend."""
+    if settings.EVENTS_BACKEND == 'postgres':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, json.dumps({'post': post_id, 'event': event})])
+    else:
+        broker.dispatch(post_id, event)
+
+
+def publish_on_commit(post_id, name, moment, data):
+    event = {'id': event_id(moment), 'event': name, 'data': data}
+    transaction.on_commit(lambda: publish(post_id, event))
+
+
+def comment_data(comment):
+    return {'id': comment.id, 'user': comment.user_id, 'post': comment.post_id, 'text': comment.text}
+
+
+def like_data(like):
+    return {'id': like.id, 'user': like.user_id, 'post': like.post_id, 'comment': like.comment_id}
+
+
+def liked_post_id(like):
+    return like.post_id if like.post_id else like.comment.post_id
+
+
+def comment_created(comment):
+    publish_on_commit(comment.post_id, 'comment.created', comment.created, comment_data(comment))
+
+
+def comment_deleted(comment):
+    publish_on_commit(comment.post_id, 'comment.deleted', datetime.now(timezone.utc), {'id': comment.id})
+
+
+def like_created(like):
+    publish_on_commit(liked_post_id(like), 'like.created', like.created, like_data(like))
+
+
+def like_deleted(like):
+    publish_on_commit(liked_post_id(like), 'like.deleted', datetime.now(timezone.utc), {'id': like.id})
+
+
+def refresh_connection():
+    """Drop a broken or expired connection, as requests do, since the streams run outside of them."""
+    if not connection.in_atomic_block:
+        close_old_connections()
+
+
+def created_events(post_id, limit, **created):
+    """Return the first ``limit`` events of the comments and likes of ``post_id`` matching ``created``."""
+    created = {f'created__{lookup}': moment for lookup, moment in created.items()}
+    comments = Comment.objects.filter(post=post_id, **created).order_by('created')[:limit]
+    likes = Like.objects.filter(Q(post=post_id) | Q(comment__post=post_id), **created).order_by('created')
+    events = [{'id': event_id(comment.created), 'event': 'comment.created', 'data': comment_data(comment)}
+              for comment in comments]
+    events += [{'id': event_id(like.created), 'event': 'like.created', 'data': like_data(like)}
+               for like in likes[:limit]]
+    return sorted(events, key=lambda event: event['id'])[:limit]
+
+
+def replay(post_id, last_event_id):
+    """Return ``(events, complete)``, the events created after ``last_event_id`` oldest first.
+
+    Rows get their creation time before their transaction commits, so those
+    created ``EVENTS_REPLAY_MARGIN`` seconds before are sent again, in case
+    they committed later. ``complete`` is False when more than
+    ``EVENTS_REPLAY_LIMIT`` events were missed and only the first ones are
+    returned.
+    """
+    refresh_connection()
+    since = datetime.fromtimestamp(last_event_id / 1_000_000, timezone.utc)
+    limit = settings.EVENTS_REPLAY_LIMIT
+    late = created_events(post_id, limit, gt=since - timedelta(seconds=settings.EVENTS_REPLAY_MARGIN), lte=since)
+    missed = created_events(post_id, limit + 1, gt=since)
+    return late + missed[:limit], len(missed) <= limit
+
+
+def post_exists(post_id):
+    refresh_connection()
+    return Post.objects.filter(pk=post_id).exists()
+
+
+def authenticate(headers):
+    """Return the user id of the bearer access token in ``headers``, None when missing or invalid."""
+    header = headers.get(b'authorization', b'').decode('latin-1').split()
+    if len(header) != 2 or header[0] not in jwt_api_settings.AUTH_HEADER_TYPES:
+        return None
+    try:
+        return AccessToken(header[1])[jwt_api_settings.USER_ID_CLAIM]
+    except (InvalidToken, TokenError, KeyError):
+        return None
+
+
+async def send_error(send, status, code, detail):
+    body = json.dumps({'type': 'client_error', 'errors': [{'code': code, 'detail': detail, 'attr': None}]}).encode()
+    await send({'type': 'http.response.start', 'status': status, 'headers': [
+        (b'content-type', b'application/json'), (b'content-length', str(len(body)).encode()),
+    ]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def stream(scope, receive, send, post_id):
+    """Answer one event stream until the client disconnects."""
+    headers = dict(scope['headers'])
+    if scope['method'] != 'GET':
+        return await send_error(send, 405, 'method_not_allowed', f'Method "{scope["method"]}" not allowed.')
+    if authenticate(headers) is None:
+        return await send_error(send, 401, 'not_authenticated', 'Authentication credentials were not provided.')
+    if not await sync_to_async(post_exists)(post_id):
+        return await send_error(send, 404, 'not_found', 'Not found.')
+
+    queue = asyncio.Queue(maxsize=settings.EVENTS_QUEUE_SIZE)
+    if settings.EVENTS_BACKEND == 'postgres':
+        await sync_to_async(listener.start, thread_sensitive=False)()
+    broker.subscribe(post_id, queue)
+    try:
+        backlog, complete = [], True
+        last_event_id = headers.get(b'last-event-id', b'').decode('latin-1')
+        if last_event_id.isdigit():
+            backlog, complete = await sync_to_async(replay)(post_id, int(last_event_id))
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache'), (b'x-accel-buffering', b'no'),
+        ]})
+        replayed = {(event['event'], event['data']['id']) for event in backlog}
+        chunk = f'retry: {RETRY_MS}\n\n'.encode() + b''.join(map(format_event, backlog))
+        if not complete:
+            # Live events would move the client's Last-Event-ID past the rest, let it resume instead.
+            return await send({'type': 'http.response.body', 'body': chunk})
+        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+
+        disconnected = asyncio.ensure_future(receive())
+        try:
+            while True:
+                next_event = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait(
+                    {disconnected, next_event}, timeout=settings.EVENTS_HEARTBEAT, return_when=asyncio.FIRST_COMPLETED,
+                )
+                if disconnected in done and disconnected.result()['type'] == 'http.disconnect':
+                    next_event.cancel()
+                    return
+                if disconnected in done:
+                    disconnected = asyncio.ensure_future(receive())
+                if next_event not in done:
+                    next_event.cancel()
+                    await send({'type': 'http.response.body', 'body': b': ping\n\n', 'more_body': True})
+                    continue
+                event = next_event.result()
+                if event is OVERFLOW:
+                    break
+                if (event['event'], event['data']['id']) not in replayed:
+                    await send({'type': 'http.response.body', 'body': format_event(event), 'more_body': True})
+        finally:
+            disconnected.cancel()
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        broker.unsubscribe(post_id, queue)
+
+
+def route(application):
+    """Wrap the Django ASGI ``application``, answering the event streams before it."""
+    async def router(scope, receive, send):
+        if scope['type'] == 'http':
+            match = PATH.match(scope['path'])
+            if match:
+                return await stream(scope, receive, send, int(match['pk']))
+        return await application(scope, receive, send)
+    return router
@@ -0,0 +1,74 @@
+"""
+``?expand=`` support, embedding related objects instead of their ids.
+
+A view lists the paths it can expand and the ``select_related`` lookup each
+needs, so a page takes the same number of queries whatever its size. Its
+serializer lists the fields that can be replaced by a nested serializer;
+dotted paths are handed down to it, e.g. ``author.profile``.
+"""
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework.exceptions import ValidationError
+from rest_framework.mixins import ListModelMixin
+
+EXPAND_PARAMETER = OpenApiParameter(
+    'expand', str, description='Comma separated relations to embed, e.g. author,author.profile.',
+)
+
+
+def parse_expand(value, expandable):
+    """Return the paths of ``value`` with their parents, rejecting those not in ``expandable``."""
+    paths = set()
+    for path in filter(None, (part.strip() for part in value.split(','))):
+        if path not in expandable:
+            raise ValidationError({'expand': f'Cannot expand "{path}", choose from {", ".join(expandable)}.'})
+        parts = path.split('.')
+        paths.update('.'.join(parts[:index]) for index in range(1, len(parts) + 1))
+    return paths
+
+
+class ExpandableSerializerMixin:
+    """Serializer replacing the fields of ``expandable_fields`` by nested serializers when expanded."""
+    expandable_fields = {}
+
+    def __init__(self, *args, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.expand = set(self.context.get('expand', ()) if expand is None else expand)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for name, serializer_class in self.expandable_fields.items():
+            if name in self.expand:
+                kwargs = {}
+                if issubclass(serializer_class, ExpandableSerializerMixin):
+                    kwargs['expand'] = {path[len(name) + 1:] for path in self.expand if path.startswith(f'{name}.')}
+                fields[name] = serializer_class(read_only=True, allow_null=True, **kwargs)
+        return fields
+
+
+class ExpandMixin:
+    """View honoring ``?expand=`` for the paths of ``expandable``, mapped to ``select_related`` lookups."""
+    expandable = {}
+
+    def get_expand(self):
+        if not hasattr(self, '_expand'):
+            self._expand = parse_expand(self.request.query_params.get('expand', ''), self.expandable)
+        return self._expand
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        lookups = [self.expandable[path] for path in self.get_expand() if path in self.expandable]
+        return queryset.select_related(*lookups) if lookups else queryset
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'expand': self.get_expand()}
+
+    @extend_schema(parameters=[EXPAND_PARAMETER])
+    def list(self, request, *args, **kwargs):
+        if self.get_expand():
+            # Nested objects are out of reach of the values_list() fast path.
+            return ListModelMixin.list(self, request, *args, **kwargs)
+        return super().list(request, *args, **kwargs)
+
+    @extend_schema(parameters=[EXPAND_PARAMETER])
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
@@ -0,0 +1,97 @@
+"""
+Read-only fast path for list endpoints.
+
+A ``RowConverter`` is compiled once per serializer class. It reads the
+columns the serializer needs with ``values_list()`` and turns each row tuple
+into the same dict the serializer would produce, without instantiating
+models or going through the per-field ``to_representation`` machinery.
+Field types without a fast equivalent fall back to the serializer field
+itself, so the output never differs.
+"""
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.mixins import ListModelMixin
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+_converters = {}
+
+
+def format_datetime(value, tz):
+    """Format like ``serializers.DateTimeField`` with the ISO 8601 format."""
+    value = value.astimezone(tz).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def is_plain(field):
+    """Return True when the DB value is already what the field outputs."""
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        return field.pk_field is None
+    return type(field) in (serializers.IntegerField, serializers.CharField, serializers.BooleanField)
+
+
+def is_iso_datetime(field):
+    if type(field) is not serializers.DateTimeField or getattr(field, 'timezone', None) is not None:
+        return False
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    return settings.USE_TZ and output_format is not None and output_format.lower() == ISO_8601
+
+
+class RowConverter:
+    """Convert ``values_list()`` rows to the representation of a serializer."""
+
+    def __init__(self, serializer_class):
+        serializer = serializer_class()
+        model = serializer.Meta.model
+        namespace = {'format_datetime': format_datetime}
+        fields = [(name, field) for name, field in serializer.fields.items() if not field.write_only]
+        self.columns = []
+        items = []
+        for index, (name, field) in enumerate(fields):
+            self.columns.append(model._meta.get_field(field.source).attname)
+            value = f'row[{index}]'
+            if is_plain(field):
+                expression = value
+            elif is_iso_datetime(field):
+                expression = f'format_datetime({value}, tz) if {value} else None'
+            elif isinstance(field, serializers.ListField) and is_plain(field.child):
+                expression = f'list({value}) if {value} is not None else None'
+            else:
+                namespace[f'field_{index}'] = field.to_representation
+                expression = f'field_{index}({value}) if {value} is not None else None'
+            items.append(f'{name!r}: {expression}')
+        source = 'def convert(row, tz):\n    return {' + ', '.join(items) + '}\n'
+        exec(compile(source, f'<{serializer_class.__name__} row converter>', 'exec'), namespace)
+        self.convert = namespace['convert']
+
+    def __call__(self, rows):
+        """Return the representations of ``rows``."""
+        tz = timezone.get_current_timezone()
+        convert = self.convert
+        return [convert(row, tz) for row in rows]
+
+
+def get_row_converter(serializer_class):
+    converter = _converters.get(serializer_class)
+    if converter is None:
+        converter = _converters[serializer_class] = RowConverter(serializer_class)
+    return converter
+
+
+class FastListModelMixin(ListModelMixin):
+    """``list`` action serializing from ``values_list()`` rows.
+
+    Produces the same page as ``ListModelMixin.list`` for serializers whose
+    readable fields all map to model columns.
+    """
+
+    def list(self, request, *args, **kwargs):
+        converter = get_row_converter(self.get_serializer_class())
+        queryset = self.filter_queryset(self.get_queryset()).values_list(*converter.columns)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(converter(page))
+        return Response(converter(queryset))
@@ -0,0 +1,150 @@
+"""
+Background jobs stored in Postgres, run by ``manage.py jobworker``.
+
+Jobs are registered by name with ``@register`` and queued with ``enqueue``,
+in the caller's transaction: a job queued by a request that rolls back is
+never run. Workers claim one job at a time with ``FOR UPDATE SKIP LOCKED``,
+so any number of them share the queue without blocking each other. A job
+that raises is retried after an exponential backoff, up to its
+``max_attempts``, then kept as failed. Jobs that succeed are deleted.
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from app.models import Job
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+CLAIM_SQL = """
+    UPDATE app_job
+    SET status = 'running', attempts = attempts + 1, locked_at = clock_timestamp(), modified = clock_timestamp()
+    WHERE id = (
+        SELECT id FROM app_job
+        WHERE status = 'queued' AND run_at <= clock_timestamp()
+        ORDER BY priority DESC, run_at
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING *
+"""
+
+
+def register(name):
+    """Register the decorated function as the job ``name``, called with the payload as keyword arguments."""
+    def decorator(function):
+        registry[name] = function
+        return function
+    return decorator
+
+
+def enqueue(name, payload=None, priority=0, delay=None, run_at=None, dedup_key=None, max_attempts=5):
+    """Queue the job ``name``, return it or None when a job with ``dedup_key`` is already queued."""
+    if name not in registry:
+        raise KeyError(f'No job registered as {name!r}')
+    if run_at is None:
+        run_at = timezone.now() + (delay or timedelta())
+    job = Job(name=name, payload=payload or {}, priority=priority, run_at=run_at,
+              dedup_key=dedup_key, max_attempts=max_attempts)
+    if dedup_key is None:
+        job.save(using='default')
+        return job
+    try:
+        with transaction.atomic(using='default'):
+            job.save(using='default')
+    except IntegrityError:
+        return None
+    return job
+
+
+def claim():
+    """Lock the next job due and mark it running, None when there is none."""
+    with transaction.atomic(using='default'):
+        return next(iter(Job.objects.db_manager('default').raw(CLAIM_SQL)), None)
+
+
+def retry_delay(attempts):
+    """Seconds to wait before the next attempt, doubling up to ``JOB_RETRY_MAX_DELAY``, with jitter."""
+    delay = min(settings.JOB_RETRY_BASE_DELAY * 2 ** (attempts - 1), settings.JOB_RETRY_MAX_DELAY)
+    return delay * random.uniform(0.5, 1)
+
+
+def run(job):
+    """Run a claimed job, then delete it, queue it again or mark it failed. Return whether it succeeded."""
+    try:
+        function = registry[job.name]
+        with transaction.atomic(using='default'):
+            function(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        jobs = Job.objects.using('default').filter(id=job.id)
+        if job.attempts >= job.max_attempts:
+            logger.error('Job %s failed for good after %s attempts', job, job.attempts)
+            jobs.update(status=Job.FAILED, locked_at=None, last_error=error, modified=timezone.now())
+        else:
+            logger.warning('Job %s failed, attempt %s of %s', job, job.attempts, job.max_attempts)
+            run_at = timezone.now() + timedelta(seconds=retry_delay(job.attempts))
+            try:
+                with transaction.atomic(using='default'):
+                    jobs.update(status=Job.QUEUED, run_at=run_at, locked_at=None, last_error=error,
+                                modified=timezone.now())
+            except IntegrityError:
+                # The same work was queued again meanwhile, it will be done then.
+                jobs.delete()
+        return False
+    Job.objects.using('default').filter(id=job.id).delete()
+    return True
+
+
+def run_next():
+    """Claim and run the next job due. Return the job, None when the queue is empty."""
+    job = claim()
+    if job is not None:
+        run(job)
+    return job
+
+
+def requeue_stale():
+    """Queue again the jobs running for more than ``JOB_TIMEOUT`` seconds, left by a dead worker.
+
+    Jobs out of attempts are marked failed instead: a job killing its worker
+    would otherwise be retried forever.
+    """
+    now = timezone.now()
+    stale = Job.objects.using('default').filter(status=Job.RUNNING, locked_at__lt=now - timedelta(seconds=settings.JOB_TIMEOUT))
+    queued_keys = Job.objects.using('default').filter(status=Job.QUEUED, dedup_key__isnull=False).values('dedup_key')
+    with transaction.atomic(using='default'):
+        failed = stale.filter(attempts__gte=F('max_attempts')).update(
+            status=Job.FAILED, locked_at=None, last_error='Timed out or lost its worker on the last attempt.', modified=now,
+        )
+        if failed:
+            logger.error('%s jobs timed out or lost their worker on their last attempt', failed)
+        stale.filter(dedup_key__in=queued_keys).delete()
+        return stale.update(status=Job.QUEUED, locked_at=None, modified=now)
+
+
+def stats():
+    """Return the number of jobs by status and how late the oldest job due is, in seconds."""
+    now = timezone.now()
+    jobs = Job.objects.using('default')
+    counts = dict(jobs.values_list('status').annotate(count=Count('id')).order_by())
+    oldest = jobs.filter(status=Job.QUEUED, run_at__lte=now).aggregate(oldest=Min('run_at'))['oldest']
+    return {
+        'queued': counts.get(Job.QUEUED, 0),
+        'running': counts.get(Job.RUNNING, 0),
+        'failed': counts.get(Job.FAILED, 0),
+        'lag': (now - oldest).total_seconds() if oldest else 0.0,
+    }
+
+
+def close_connections():
+    for connection in connections.all():
+        connection.close()
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app import trending
+
+
+class Command(BaseCommand):
+    help = 'Recompute the trending posts of every category.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schedule', action='store_true',
+                            help='Queue a job recomputing them every TRENDING_INTERVAL seconds instead.')
+
+    def handle(self, *args, schedule, **options):
+        if schedule:
+            job = trending.schedule()
+            self.stdout.write(f'Scheduled {job}' if job else 'Already scheduled')
+            return
+        start = time.monotonic()
+        ranked = trending.compute()
+        self.stdout.write(f'{ranked} trending posts in {time.monotonic() - start:.2f}s')
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from app import exports
+
+
+class Command(BaseCommand):
+    help = 'Stream every post, comment or like as NDJSON or CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(exports.EXPORTS))
+        parser.add_argument('--format', dest='output_format', choices=sorted(exports.FORMATS), default='ndjson')
+        parser.add_argument('--since', help='Only rows modified after this ISO 8601 date time.')
+        parser.add_argument('--output', help='File to write, standard output by default.')
+
+    def handle(self, *args, name, output_format, since, output, **options):
+        if since is not None:
+            since = parse_datetime(since)
+            if since is None:
+                raise CommandError('--since must be an ISO 8601 date time.')
+        if not output:
+            for chunk in exports.stream(name, output_format, since):
+                self.stdout.write(chunk, ending='')
+            return
+        with open(output, 'w', newline='') as destination:
+            for chunk in exports.stream(name, output_format, since):
+                destination.write(chunk)
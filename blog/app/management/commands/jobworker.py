@@ -0,0 +1,83 @@
+import threading
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app import jobs
+from blog import routers
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs with concurrent workers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4, help='Number of concurrent workers.')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--report-interval', type=float, default=30.0, help='Seconds between two reports.')
+        parser.add_argument('--once', action='store_true', help='Stop once no job is due.')
+
+    def handle(self, *args, threads, poll_interval, report_interval, once, **options):
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()
+        self.runs = defaultdict(lambda: {'ok': 0, 'failed': 0, 'latency': 0.0, 'duration': 0.0})
+        jobs.requeue_stale()
+        workers = [
+            threading.Thread(target=self.work, args=(poll_interval, once), name=f'jobworker-{index}', daemon=True)
+            for index in range(threads)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            while any(worker.is_alive() for worker in workers):
+                for worker in workers:
+                    worker.join(report_interval / len(workers))
+                if not once:
+                    jobs.requeue_stale()
+                self.report()
+        except KeyboardInterrupt:
+            self.stopping.set()
+            for worker in workers:
+                worker.join()
+            self.report()
+        finally:
+            jobs.close_connections()
+
+    def work(self, poll_interval, once):
+        """Claim and run jobs until stopped, on the primary only."""
+        token = routers.set_pinned(True)
+        try:
+            while not self.stopping.is_set():
+                job = jobs.claim()
+                if job is None:
+                    if once:
+                        return
+                    self.stopping.wait(poll_interval)
+                    continue
+                start = time.monotonic()
+                latency = (timezone.now() - job.run_at).total_seconds()
+                succeeded = jobs.run(job)
+                with self.lock:
+                    run = self.runs[job.name]
+                    run['ok' if succeeded else 'failed'] += 1
+                    run['latency'] += latency
+                    run['duration'] += time.monotonic() - start
+        finally:
+            routers.reset_pinned(token)
+            jobs.close_connections()
+
+    def report(self):
+        """Write the queue depth and the latency and duration of the jobs run since the last report."""
+        stats = jobs.stats()
+        self.stdout.write(
+            f"queued={stats['queued']} running={stats['running']} failed={stats['failed']} lag={stats['lag']:.1f}s"
+        )
+        with self.lock:
+            runs, self.runs = self.runs, defaultdict(self.runs.default_factory)
+        for name, run in sorted(runs.items()):
+            count = run['ok'] + run['failed']
+            self.stdout.write(
+                f"  {name}: ok={run['ok']} failed={run['failed']} "
+                f"latency={run['latency'] / count:.3f}s duration={run['duration'] / count:.3f}s"
+            )
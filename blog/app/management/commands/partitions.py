@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app import partitions
+
+
+class Command(BaseCommand):
+    help = 'Partition the comment and like tables by month of creation, and keep their partitions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['list', 'convert', 'create', 'detach'])
+        parser.add_argument('tables', nargs='*', help=f'Among {", ".join(partitions.TABLES)}, default all.')
+        parser.add_argument('--months-ahead', type=int, default=3, help='Months to create partitions for.')
+        parser.add_argument('--retention', type=int, default=12, help='Months of partitions kept by detach.')
+        parser.add_argument('--archive-schema', default='archive', help='Schema receiving the detached partitions.')
+        parser.add_argument('--drop', action='store_true', help='Drop the detached partitions instead.')
+
+    def handle(self, *args, action, tables, months_ahead, retention, archive_schema, drop, **options):
+        unknown = set(tables) - set(partitions.TABLES)
+        if unknown:
+            raise CommandError(f'Unknown tables: {", ".join(sorted(unknown))}.')
+        for table in [partitions.TABLES[name] for name in tables or partitions.TABLES]:
+            started = time.monotonic()
+            if action == 'convert':
+                if partitions.is_partitioned(table):
+                    raise CommandError(f'{table} is already partitioned.')
+                created = partitions.convert(table, months_ahead)
+                self.stdout.write(f'{table} partitioned in {time.monotonic() - started:.1f}s, created {len(created)}')
+                continue
+            if not partitions.is_partitioned(table):
+                self.stdout.write(f'{table} is not partitioned, run convert first')
+                continue
+            if action == 'list':
+                for name, upper in partitions.partitions(table):
+                    self.stdout.write(f'{name} until {upper:%Y-%m-%d}')
+            elif action == 'create':
+                created = partitions.create(table, months_ahead)
+                self.stdout.write(f'{table}: created {", ".join(created) or "nothing"}')
+            else:
+                before = partitions.month_start(partitions.now(), -retention)
+                detached = partitions.detach(table, before, archive_schema, drop)
+                where = 'dropped' if drop else f'moved to {archive_schema}'
+                self.stdout.write(f'{table}: detached {", ".join(detached) or "nothing"}{f", {where}" if detached else ""}')
+                if detached:
+                    self.stdout.write('Run rebuild_user_stats to stop counting the detached rows.')
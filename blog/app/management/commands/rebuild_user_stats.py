@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+
+from app import stats
+from app.models import User
+
+
+class Command(BaseCommand):
+    help = 'Recount the posts, comments and likes received of every user, in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Users recounted per transaction.')
+        parser.add_argument('--start', type=int, default=0, help='First user id to recount.')
+
+    def handle(self, *args, batch_size, start, **options):
+        started = time.monotonic()
+        last_id = User.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+        changed = 0
+        for first in range(start, last_id + 1, batch_size):
+            # Short transactions keep the rows locked only briefly for the API writes.
+            with transaction.atomic():
+                changed += stats.rebuild(first, first + batch_size)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE app_userstats')
+        self.stdout.write(f'{changed} user stats fixed in {time.monotonic() - started:.1f}s')
@@ -0,0 +1,87 @@
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+USERS_SQL = """
+    INSERT INTO app_user (password, is_superuser, email, first_name, last_name, username)
+    SELECT %(password)s, false, %(prefix)s || g || '@example.com', 'Seed', 'User ' || g, %(prefix)s || g
+    FROM generate_series(%(start)s, %(stop)s) AS g
+"""
+
+POSTS_SQL = """
+    WITH users AS (SELECT array_agg(id) AS ids FROM app_user)
+    INSERT INTO app_post (created, modified, author_id, title, content, publish_date, category, tags)
+    SELECT d, d, ids[1 + g %% cardinality(ids)], 'Post ' || g, repeat('lorem ipsum ', 10), d,
+           (ARRAY['news', 'tech', 'sports', 'culture'])[1 + g %% 4], ARRAY['seed', 'tag' || g %% 50]
+    FROM users, (
+        SELECT g, now() - random() * interval '365 days' AS d FROM generate_series(%(start)s, %(stop)s) AS g
+    ) AS rows
+"""
+
+COMMENTS_SQL = """
+    WITH users AS (SELECT array_agg(id) AS ids FROM app_user),
+         posts AS (SELECT array_agg(id) AS ids FROM app_post)
+    INSERT INTO app_comment (created, modified, user_id, post_id, text)
+    SELECT d, d, users.ids[1 + g %% cardinality(users.ids)],
+           posts.ids[1 + (g::bigint * 7919 %% cardinality(posts.ids))::int], 'Comment ' || g
+    FROM users, posts, (
+        SELECT g, now() - random() * interval '365 days' AS d FROM generate_series(%(start)s, %(stop)s) AS g
+    ) AS rows
+"""
+
+# Each like is a distinct (user, post) pair as long as users x posts allows it.
+LIKES_SQL = """
+    WITH users AS (SELECT array_agg(id) AS ids FROM app_user),
+         posts AS (SELECT array_agg(id) AS ids FROM app_post)
+    INSERT INTO app_like (created, modified, user_id, post_id)
+    SELECT d, d, users.ids[1 + g %% cardinality(users.ids)],
+           posts.ids[1 + (g / cardinality(users.ids)) %% cardinality(posts.ids)]
+    FROM users, posts, (
+        SELECT g, now() - random() * interval '365 days' AS d FROM generate_series(%(start)s, %(stop)s) AS g
+    ) AS rows
+"""
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic dataset with set based inserts, for benchmarks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument('--likes', type=int, default=100000)
+        parser.add_argument('--batch-size', type=int, default=500000, help='Rows per INSERT statement.')
+        parser.add_argument('--password', default='password', help='Password of every seeded user.')
+
+    def handle(self, *args, **options):
+        prefix = f'seed{int(time.time())}_'
+        with connection.cursor() as cursor:
+            # Losing the last batches on a crash is fine for synthetic data.
+            cursor.execute('SET synchronous_commit TO off')
+            params = {'password': make_password(options['password']), 'prefix': prefix}
+            for table, sql, rows in [
+                ('app_user', USERS_SQL, options['users']),
+                ('app_post', POSTS_SQL, options['posts']),
+                ('app_comment', COMMENTS_SQL, options['comments']),
+                ('app_like', LIKES_SQL, options['likes']),
+            ]:
+                self.insert(cursor, table, sql, rows, options['batch_size'], params)
+            cursor.execute('ANALYZE app_user, app_post, app_comment, app_like')
+        call_command('rebuild_user_stats', stdout=self.stdout)
+
+    def insert(self, cursor, table, sql, rows, batch_size, params):
+        if rows and table != 'app_user':
+            cursor.execute('SELECT EXISTS (SELECT 1 FROM app_user), EXISTS (SELECT 1 FROM app_post)')
+            has_users, has_posts = cursor.fetchone()
+            if not has_users or (table != 'app_post' and not has_posts):
+                raise CommandError(f'Cannot seed {table} without users and posts.')
+        start = time.monotonic()
+        for first in range(1, rows + 1, batch_size):
+            with transaction.atomic():
+                cursor.execute(sql, {**params, 'start': first, 'stop': min(rows, first + batch_size - 1)})
+        if rows:
+            elapsed = time.monotonic() - start
+            self.stdout.write(f'{table}: {rows} rows in {elapsed:.1f}s ({rows / max(elapsed, 1e-6):.0f} rows/s)')
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app import timeline
+
+
+class Command(BaseCommand):
+    help = 'Trim the home timelines to their newest TIMELINE_LENGTH posts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schedule', action='store_true',
+                            help='Queue a job trimming them every TIMELINE_TRIM_INTERVAL seconds instead.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Users trimmed per transaction.')
+
+    def handle(self, *args, schedule, batch_size, **options):
+        if schedule:
+            job = timeline.schedule_trim()
+            self.stdout.write(f'Scheduled {job}' if job else 'Already scheduled')
+            return
+        start = time.monotonic()
+        deleted = timeline.trim_all(batch_size)
+        self.stdout.write(f'{deleted} timeline entries removed in {time.monotonic() - start:.2f}s')
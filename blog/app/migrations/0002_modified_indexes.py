@@ -0,0 +1,28 @@
+# Generated by Django 4.2.1 on 2026-10-19 01:51
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Built without blocking the writes to the big tables.
+    atomic = False
+
+    dependencies = [
+        ('app', '0001_initial'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='comment',
+            index=models.Index(fields=['modified', 'id'], name='app_comment_modifie_39f306_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='like',
+            index=models.Index(fields=['modified', 'id'], name='app_like_modifie_8c4216_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(fields=['modified', 'id'], name='app_post_modifie_57279d_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.1 on 2026-10-19 02:16
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Built without blocking the writes to the big tables.
+    atomic = False
+
+    dependencies = [
+        ('app', '0003_job'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(fields=['category'], name='app_post_categor_ee7d9e_idx'),
+        ),
+    ]
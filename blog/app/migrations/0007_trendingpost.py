@@ -0,0 +1,28 @@
+# Generated by Django 4.2.1 on 2026-10-19 02:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_job_queued_dedup_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingPost',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='app.post')),
+                ('category', models.CharField(max_length=255)),
+                ('rank', models.PositiveIntegerField()),
+                ('score', models.FloatField()),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['category', 'rank'],
+                'indexes': [models.Index(fields=['category', 'rank'], name='app_trendin_categor_f99f87_idx'), models.Index(fields=['-score'], name='app_trendin_score_157299_idx')],
+            },
+        ),
+    ]
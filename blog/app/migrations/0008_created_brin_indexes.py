@@ -0,0 +1,25 @@
+# Generated by Django 4.2.1 on 2026-10-19 02:36
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Built without blocking the writes to the big tables.
+    atomic = False
+
+    dependencies = [
+        ('app', '0007_trendingpost'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='comment',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['created'], name='app_comment_created_brin'),
+        ),
+        AddIndexConcurrently(
+            model_name='like',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['created'], name='app_like_created_brin'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.1 on 2026-10-19 02:40
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Built without blocking the writes to the big tables.
+    atomic = False
+
+    dependencies = [
+        ('app', '0009_follow_timeline'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(fields=['author', '-created'], name='app_post_author_created_idx'),
+        ),
+    ]
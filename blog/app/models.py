@@ -1,7 +1,9 @@
 from django.contrib.auth.models import (AbstractBaseUser, BaseUserManager,
                                         PermissionsMixin)
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import BrinIndex
 from django.db import IntegrityError, models
+from django.utils import timezone
 from rest_framework.exceptions import ValidationError
 from rest_framework_simplejwt.tokens import RefreshToken
 
@@ -99,14 +101,117 @@ class Post(BaseModel):
     category = models.CharField(max_length=255)
     tags = ArrayField(models.CharField(max_length=255, blank=True))
 
+    class Meta(BaseModel.Meta):
+        indexes = [
+            models.Index(fields=['modified', 'id']), models.Index(fields=['category']),
+            models.Index(fields=['author', '-created'], name='app_post_author_created_idx'),
+        ]
+
 
 class Comment(BaseModel):
     user = models.ForeignKey('User', on_delete=models.CASCADE)
     post = models.ForeignKey('Post', on_delete=models.CASCADE)
     text = models.TextField(max_length=255, blank=True)
 
+    class Meta(BaseModel.Meta):
+        indexes = [models.Index(fields=['modified', 'id']), BrinIndex(fields=['created'], name='app_comment_created_brin')]
+
 
 class Like(BaseModel):
     user = models.ForeignKey('User', on_delete=models.CASCADE)
     post = models.ForeignKey('Post', on_delete=models.CASCADE, null=True, blank=True)
     comment = models.ForeignKey('Comment', on_delete=models.CASCADE, null=True, blank=True)
+
+    class Meta(BaseModel.Meta):
+        indexes = [models.Index(fields=['modified', 'id']), BrinIndex(fields=['created'], name='app_like_created_brin')]
+
+
+class Follow(BaseModel):
+    follower = models.ForeignKey('User', on_delete=models.CASCADE, related_name='following')
+    followed = models.ForeignKey('User', on_delete=models.CASCADE, related_name='followers')
+
+    class Meta(BaseModel.Meta):
+        constraints = [
+            models.UniqueConstraint(fields=['follower', 'followed'], name='app_follow_unique'),
+            models.CheckConstraint(check=~models.Q(follower=models.F('followed')), name='app_follow_not_self'),
+        ]
+
+    def __str__(self):
+        return f'{self.follower} follows {self.followed}'
+
+
+class TimelineEntry(models.Model):
+    """A post of the home timeline of ``user``, written by app/timeline.py."""
+    user = models.ForeignKey('User', on_delete=models.CASCADE, related_name='+', db_index=False)
+    post = models.ForeignKey('Post', on_delete=models.CASCADE, related_name='timeline_entries')
+    created = models.DateTimeField(help_text='Creation date time of the post.')
+
+    class Meta:
+        ordering = ['-created']
+        indexes = [models.Index(fields=['user', '-created'], name='app_timeline_user_created_idx')]
+        constraints = [models.UniqueConstraint(fields=['user', 'post'], name='app_timelineentry_unique')]
+
+    def __str__(self):
+        return f'{self.post_id} in the timeline of {self.user_id}'
+
+
+class UserStats(models.Model):
+    """Counters of a user, kept up to date by app/stats.py."""
+    user = models.OneToOneField('User', on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    posts = models.IntegerField(default=0)
+    comments = models.IntegerField(default=0)
+    likes_received = models.IntegerField(default=0)
+    followers = models.IntegerField(default=0)
+    following = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f'Stats of {self.user}'
+
+
+class TrendingPost(models.Model):
+    """A post of the top of its category, recomputed by app/trending.py."""
+    post = models.OneToOneField('Post', on_delete=models.CASCADE, primary_key=True, related_name='trending')
+    category = models.CharField(max_length=255)
+    rank = models.PositiveIntegerField()
+    score = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['category', 'rank']
+        indexes = [models.Index(fields=['category', 'rank']), models.Index(fields=['-score'])]
+
+    def __str__(self):
+        return f'{self.category} #{self.rank}'
+
+
+class Job(BaseModel):
+    """A background job run by the ``jobworker`` command, see app/jobs.py."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=255)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+    priority = models.SmallIntegerField(default=0, help_text='Higher runs first.')
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    dedup_key = models.CharField(max_length=255, null=True, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta(BaseModel.Meta):
+        indexes = [
+            models.Index(fields=['-priority', 'run_at'], condition=models.Q(status='queued'), name='app_job_ready_idx'),
+            models.Index(fields=['locked_at'], condition=models.Q(status='running'), name='app_job_running_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedup_key'], condition=models.Q(status='queued'), name='app_job_queued_dedup_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
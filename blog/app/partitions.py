@@ -0,0 +1,191 @@
+"""
+Monthly range partitions on ``created`` for the append-only tables.
+
+Partitioning is optional: the tables are created unpartitioned by the
+migrations, and ``convert`` switches one over online. The existing table
+becomes the first partition, holding everything before the next month, so no
+row is copied. Only the swap takes a lock, for a few catalog updates. Indexes
+and foreign keys of the table are recreated on the partitioned parent, then
+found on the old table when it is attached, instead of being rebuilt.
+
+The primary key becomes ``(id, created)``, as Postgres requires the partition
+key in it. ``app_like.comment_id`` can then no longer reference comments, so
+converting ``app_comment`` drops that foreign key. Likes of a deleted comment
+are still removed by the ORM and the admin's set-based deletes.
+
+``create`` adds the partitions of the coming months, ``detach`` takes old ones
+out of the table, into an archive schema or dropped. Detaching comments also
+takes out the likes of those comments, which have no foreign key to keep them
+consistent. Detached rows are still counted in the user stats until
+``manage.py rebuild_user_stats`` runs. See ``manage.py partitions``.
+"""
+import re
+from datetime import datetime, timedelta, timezone
+
+from django.db import connection, transaction
+
+TABLES = {'comment': 'app_comment', 'like': 'app_like'}
+
+UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+# Rows of other tables pointing to a partitioned table without a foreign key,
+# as ``(table, column)``: detached along with the rows they point to.
+DEPENDENTS = {'app_comment': [('app_like', 'comment_id')]}
+
+# The legacy partition's bound is a month start at least this far ahead, so
+# that no insert can fail the check constraint before the swap.
+CONVERT_MARGIN = timedelta(days=1)
+
+
+def now():
+    return datetime.now(timezone.utc)
+
+
+def month_start(moment, months=0):
+    """Return the first instant of the month ``months`` after the one of ``moment``, in UTC."""
+    index = moment.year * 12 + moment.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def concurrently():
+    """Build and detach concurrently, which Postgres only allows outside of a transaction."""
+    return '' if connection.in_atomic_block else 'CONCURRENTLY'
+
+
+def fetch(sql, params=()):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def execute(*statements):
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def is_partitioned(table):
+    return fetch("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(%s)", [table]) == [(True,)]
+
+
+def partitions(table):
+    """Return ``(name, upper bound)`` of the partitions of ``table``, oldest first."""
+    rows = fetch("""
+        SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+        FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = to_regclass(%s)
+    """, [table])
+    bounds = [(name, datetime.fromisoformat(UPPER_BOUND.search(bound)[1])) for name, bound in rows]
+    return sorted(bounds, key=lambda item: item[1])
+
+
+def partition_name(table, start):
+    return f'{table}_p{start:%Y_%m}'
+
+
+def create(table, months_ahead):
+    """Create the missing monthly partitions of ``table`` up to ``months_ahead`` months from now."""
+    existing = partitions(table)
+    start = existing[-1][1] if existing else month_start(now())
+    stop = month_start(now(), months_ahead + 1)
+    created = []
+    while start < stop:
+        end = month_start(start, 1)
+        name = partition_name(table, start)
+        execute(
+            f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+        created.append(name)
+        start = end
+    return created
+
+
+def detach_dependents(table, name, archive_schema, drop):
+    """Take the rows pointing to the detached partition ``name`` of ``table`` out of their tables."""
+    for dependent, column in DEPENDENTS.get(table, []):
+        delete = f'DELETE FROM {dependent} WHERE {column} IN (SELECT id FROM {name})'
+        if drop:
+            execute(delete)
+            continue
+        archive = f'{archive_schema}.{name}_{dependent.removeprefix("app_")}'
+        execute(
+            f'CREATE TABLE IF NOT EXISTS {archive} (LIKE {dependent})',
+            f'WITH moved AS ({delete} RETURNING *) INSERT INTO {archive} SELECT * FROM moved',
+        )
+
+
+def detach(table, before, archive_schema='archive', drop=False):
+    """Detach the partitions of ``table`` ending by ``before``, then archive or drop them."""
+    detached = []
+    for name, upper in partitions(table)[:-1]:
+        if upper > before:
+            break
+        execute(f'ALTER TABLE {table} DETACH PARTITION {name} {concurrently()}')
+        if not drop:
+            execute(f'CREATE SCHEMA IF NOT EXISTS {archive_schema}')
+        # Once detached, the API no longer finds these rows to point new ones to them.
+        detach_dependents(table, name, archive_schema, drop)
+        if drop:
+            execute(f'DROP TABLE {name}')
+        else:
+            execute(f'ALTER TABLE {name} SET SCHEMA {archive_schema}')
+        detached.append(name)
+    return detached
+
+
+def referencing_foreign_keys(table):
+    """Return ``(table, constraint)`` of the foreign keys of other tables to ``table``."""
+    return fetch("""
+        SELECT conrelid::regclass::text, conname FROM pg_constraint
+        WHERE contype = 'f' AND confrelid = to_regclass(%s) AND conrelid <> confrelid
+    """, [table])
+
+
+def convert(table, months_ahead):
+    """Turn ``table`` into a partitioned table, keeping it as the partition of all rows so far."""
+    legacy = f'{table}_legacy'
+    # Slow but online steps first: they leave writes running.
+    execute(f'CREATE UNIQUE INDEX {concurrently()} IF NOT EXISTS {legacy}_pkey ON {table} (id, created)')
+    # Inserts past the boundary fail the check until the swap, keep it a margin ahead.
+    boundary = month_start(now() + CONVERT_MARGIN, 1).isoformat()
+    execute(
+        f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {legacy}_created_check',
+        f"ALTER TABLE {table} ADD CONSTRAINT {legacy}_created_check CHECK (created < '{boundary}') NOT VALID",
+        f'ALTER TABLE {table} VALIDATE CONSTRAINT {legacy}_created_check',
+    )
+    with transaction.atomic():
+        execute(f'LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE')
+        indexes = fetch("""
+            SELECT index.relname, pg_get_indexdef(index.oid) FROM pg_index
+            JOIN pg_class index ON index.oid = pg_index.indexrelid
+            WHERE pg_index.indrelid = to_regclass(%s) AND NOT pg_index.indisprimary AND index.relname <> %s
+        """, [table, f'{legacy}_pkey'])
+        foreign_keys = fetch("""
+            SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+            WHERE contype = 'f' AND conrelid = to_regclass(%s)
+        """, [table])
+        sequence = fetch("SELECT pg_get_serial_sequence(%s, 'id')", [table])[0][0]
+        last_id = fetch(f'SELECT last_value FROM {sequence}')[0][0]
+        for referencing, constraint in referencing_foreign_keys(table):
+            execute(f'ALTER TABLE {referencing} DROP CONSTRAINT {constraint}')
+        execute(
+            f'ALTER TABLE {table} RENAME TO {legacy}',
+            f'ALTER TABLE {legacy} DROP CONSTRAINT {table}_pkey, '
+            f'ADD CONSTRAINT {legacy}_pkey PRIMARY KEY USING INDEX {legacy}_pkey',
+            f'ALTER TABLE {legacy} ALTER COLUMN id DROP IDENTITY',
+            f'CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE (created)',
+            f'ALTER TABLE {table} ADD PRIMARY KEY (id, created), '
+            f'ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY (START WITH {last_id + 1})',
+        )
+        for name, definition in indexes:
+            execute(
+                f'ALTER INDEX {name} RENAME TO {name[:56]}_legacy',
+                re.sub(r' ON \S+ ', f' ON {table} ', definition, count=1),
+            )
+        for name, definition in foreign_keys:
+            execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} {definition}')
+        execute(
+            f"ALTER TABLE {table} ATTACH PARTITION {legacy} FOR VALUES FROM (MINVALUE) TO ('{boundary}')",
+            f'ALTER TABLE {legacy} DROP CONSTRAINT {legacy}_created_check',
+        )
+        return create(table, months_ahead)
@@ -1,9 +1,16 @@
+from urllib.parse import urlsplit
+
+from django.conf import settings
 from django.contrib.auth import authenticate, get_user_model
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
+from django.urls import Resolver404, resolve, reverse
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 from rest_framework.exceptions import AuthenticationFailed, ValidationError
 
-from app.models import Comment, Like, Post, Profile
+from app import events, stats, timeline
+from app.expand import ExpandableSerializerMixin
+from app.models import Comment, Like, Post, Profile, TrendingPost, UserStats
 
 
 class LoginUserSerializer(serializers.ModelSerializer):
@@ -13,11 +20,7 @@ class LoginUserSerializer(serializers.ModelSerializer):
     tokens = serializers.SerializerMethodField()
 
     def get_tokens(self, obj):
-        user = get_user_model().objects.get(username=obj['username'])
-        return {
-            'access': user.tokens()['access'],
-            'refresh': user.tokens()['refresh']
-        }
+        return obj['tokens']
 
     class Meta:
         model = get_user_model()
@@ -51,12 +54,45 @@ class UserSerializer(serializers.ModelSerializer):
         return get_user_model().objects.create_user(**validated_data)
 
 
+class UserStatsSerializer(serializers.ModelSerializer):
+    """Serializer for the counters of a user"""
+
+    class Meta:
+        model = UserStats
+        fields = ('posts', 'comments', 'likes_received', 'followers', 'following')
+
+
+def user_stats(user):
+    """Return the serialized stats of ``user``, zeros when it has none yet."""
+    try:
+        return UserStatsSerializer(user.stats).data
+    except UserStats.DoesNotExist:
+        return UserStatsSerializer(UserStats(user=user)).data
+
+
+class UserDetailSerializer(UserSerializer):
+    """Serializer for user object with its stats"""
+    stats = serializers.SerializerMethodField()
+
+    class Meta(UserSerializer.Meta):
+        fields = UserSerializer.Meta.fields + ('stats',)
+
+    @extend_schema_field(UserStatsSerializer)
+    def get_stats(self, obj):
+        return user_stats(obj)
+
+
 class ProfileSerializer(serializers.ModelSerializer):
     """Serializer for profile object"""
+    stats = serializers.SerializerMethodField()
 
     class Meta:
         model = Profile
-        fields = ('biography', 'profile_image')
+        fields = ('biography', 'profile_image', 'stats')
+
+    @extend_schema_field(UserStatsSerializer)
+    def get_stats(self, obj):
+        return user_stats(obj.user)
 
     def create(self, validated_data):
         """Create profile"""
@@ -70,14 +106,41 @@ class ProfileSerializer(serializers.ModelSerializer):
             raise ValidationError({'detail': 'Profile exists'})
 
 
-class PostSerializer(serializers.ModelSerializer):
+class PublicProfileSerializer(serializers.ModelSerializer):
+    """Serializer for the profile of a user shown to others"""
+
+    class Meta:
+        model = Profile
+        fields = ('biography', 'profile_image')
+
+
+class PublicUserSerializer(ExpandableSerializerMixin, serializers.ModelSerializer):
+    """Serializer for a user shown to others, embedded with ?expand="""
+    expandable_fields = {'profile': PublicProfileSerializer}
+
+    class Meta:
+        model = get_user_model()
+        fields = ('id', 'username', 'first_name', 'last_name')
+
+
+class PostSerializer(ExpandableSerializerMixin, serializers.ModelSerializer):
     """Serializer for post object"""
+    expandable_fields = {'author': PublicUserSerializer}
 
     class Meta:
         model = Post
         fields = ('id', 'author', 'title', 'content', 'publish_date', 'category', 'tags')
 
 
+class TrendingPostSerializer(serializers.ModelSerializer):
+    """Serializer for a trending post"""
+    post = PostSerializer()
+
+    class Meta:
+        model = TrendingPost
+        fields = ('rank', 'score', 'post')
+
+
 class CreatePostSerializer(serializers.ModelSerializer):
     """Serializer for create update post object"""
 
@@ -94,13 +157,18 @@ class CreatePostSerializer(serializers.ModelSerializer):
         category = validated_data.pop('category')
         tags = validated_data.pop('tags')
 
-        return Post.objects.create(
-            author=author, title=title, content=content, publish_date=publish_date, category=category, tags=tags
-        )
+        with transaction.atomic():
+            post = Post.objects.create(
+                author=author, title=title, content=content, publish_date=publish_date, category=category, tags=tags
+            )
+            stats.post_created(post)
+            timeline.post_created(post)
+        return post
 
 
-class ShowCommentSerializer(serializers.ModelSerializer):
+class ShowCommentSerializer(ExpandableSerializerMixin, serializers.ModelSerializer):
     """Serializer for comment object"""
+    expandable_fields = {'user': PublicUserSerializer}
 
     class Meta:
         model = Comment
@@ -119,7 +187,11 @@ class CommentSerializer(serializers.ModelSerializer):
         user = self.context['user']
         post = Post.objects.get(id=validated_data.pop('post').id)
         text = validated_data.pop('text')
-        return Comment.objects.create(user=user, post=post, text=text)
+        with transaction.atomic():
+            comment = Comment.objects.create(user=user, post=post, text=text)
+            stats.comment_created(comment)
+            events.comment_created(comment)
+        return comment
 
 
 class UpdateCommentSerializer(serializers.ModelSerializer):
@@ -147,13 +219,19 @@ class LikeSerializer(serializers.ModelSerializer):
             previous_like = Like.objects.filter(user=user, comment=comment).count()
             if previous_like == 1:
                 raise ValidationError({'detail': 'You already liked this comment'})
-            Like.objects.create(user=user, comment=comment)
+            with transaction.atomic():
+                like = Like.objects.create(user=user, comment=comment)
+                stats.like_created(like)
+                events.like_created(like)
         elif 'post' in validated_data:
             post = Post.objects.get(id=validated_data.pop('post').id)
             previous_like = Like.objects.filter(user=user, post=post).count()
             if previous_like == 1:
                 raise ValidationError({'detail': 'You already liked this post'})
-            Like.objects.create(user=user, post=post)
+            with transaction.atomic():
+                like = Like.objects.create(user=user, post=post)
+                stats.like_created(like)
+                events.like_created(like)
         else:
             raise ValidationError({'detail': 'You did not set the object you like'})
         return {'detail': 'Liked'}
@@ -165,3 +243,40 @@ class ShowLikeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Like
         fields = ('id', 'user', 'post', 'comment')
+
+
+class BatchItemSerializer(serializers.Serializer):
+    """Serializer for one sub-request of a batch"""
+    id = serializers.CharField(required=False, max_length=255, help_text='Echoed back with the result.')
+    method = serializers.ChoiceField(choices=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'])
+    path = serializers.CharField(max_length=2048, help_text='Path of an API endpoint, with its query string.')
+    body = serializers.JSONField(required=False)
+
+    def validate_path(self, value):
+        path = urlsplit(value).path
+        if not path.startswith('/api/v1/') or path == reverse('app:batch'):
+            raise ValidationError('Only API endpoints other than the batch itself can be called.')
+        try:
+            resolve(path)
+        except Resolver404:
+            raise ValidationError('No endpoint at this path.')
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    """Serializer for a batch of sub-requests"""
+    requests = BatchItemSerializer(many=True, allow_empty=False, max_length=settings.BATCH_MAX_REQUESTS)
+    parallel = serializers.BooleanField(default=False, help_text='Run consecutive reads concurrently.')
+    atomic = serializers.BooleanField(default=False, help_text='Run everything in one transaction, stop at the first error.')
+
+
+class BatchResultSerializer(serializers.Serializer):
+    """Serializer for the result of a sub-request"""
+    id = serializers.CharField(allow_null=True)
+    status = serializers.IntegerField()
+    body = serializers.JSONField(allow_null=True)
+
+
+class BatchResponseSerializer(serializers.Serializer):
+    """Serializer for the results of a batch"""
+    responses = BatchResultSerializer(many=True)
@@ -0,0 +1,114 @@
+"""
+Per-user counters maintained in the transactions that change them.
+
+Writes call ``add`` with the changes to apply, one upsert for every user
+touched, so reading a user's stats is a primary key lookup instead of
+counting posts, comments, likes and follows. Deletes that bypass the API, like
+the admin's or a user's account, leave the counters behind: ``rebuild``
+recounts them, see ``manage.py rebuild_user_stats``.
+"""
+from collections import Counter, defaultdict
+
+from django.db import connection
+from django.db.models import Count
+
+from app.models import Comment, Like
+
+FIELDS = ('posts', 'comments', 'likes_received', 'followers', 'following')
+
+UPSERT_SQL = """
+    INSERT INTO app_userstats (user_id, posts, comments, likes_received, followers, following)
+    VALUES {values}
+    ON CONFLICT (user_id) DO UPDATE SET
+        posts = app_userstats.posts + EXCLUDED.posts,
+        comments = app_userstats.comments + EXCLUDED.comments,
+        likes_received = app_userstats.likes_received + EXCLUDED.likes_received,
+        followers = app_userstats.followers + EXCLUDED.followers,
+        following = app_userstats.following + EXCLUDED.following
+"""
+
+REBUILD_SQL = """
+    INSERT INTO app_userstats (user_id, posts, comments, likes_received, followers, following)
+    SELECT u.id,
+           (SELECT count(*) FROM app_post p WHERE p.author_id = u.id),
+           (SELECT count(*) FROM app_comment c WHERE c.user_id = u.id),
+           (SELECT count(*) FROM app_like l JOIN app_post p ON p.id = l.post_id WHERE p.author_id = u.id)
+           + (SELECT count(*) FROM app_like l JOIN app_comment c ON c.id = l.comment_id WHERE c.user_id = u.id),
+           (SELECT count(*) FROM app_follow f WHERE f.followed_id = u.id),
+           (SELECT count(*) FROM app_follow f WHERE f.follower_id = u.id)
+    FROM app_user u
+    WHERE u.id >= %s AND u.id < %s
+    ON CONFLICT (user_id) DO UPDATE SET
+        posts = EXCLUDED.posts, comments = EXCLUDED.comments, likes_received = EXCLUDED.likes_received,
+        followers = EXCLUDED.followers, following = EXCLUDED.following
+    WHERE (app_userstats.posts, app_userstats.comments, app_userstats.likes_received,
+           app_userstats.followers, app_userstats.following)
+          IS DISTINCT FROM (EXCLUDED.posts, EXCLUDED.comments, EXCLUDED.likes_received,
+                            EXCLUDED.followers, EXCLUDED.following)
+"""
+
+
+def add(changes):
+    """Apply ``{user_id: {'posts': 1, ...}}`` in one statement, to be run in the write's transaction."""
+    rows = sorted((user_id, delta) for user_id, delta in changes.items() if any(delta.values()))
+    if not rows:
+        return
+    params = []
+    for user_id, delta in rows:
+        params += [user_id, *(delta.get(field, 0) for field in FIELDS)]
+    # Rows are locked in user id order, so concurrent writes cannot deadlock.
+    sql = UPSERT_SQL.format(values=', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(rows)))
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def post_created(post):
+    add({post.author_id: {'posts': 1}})
+
+
+def followed(follow):
+    add({follow.follower_id: {'following': 1}, follow.followed_id: {'followers': 1}})
+
+
+def unfollowed(follow):
+    add({follow.follower_id: {'following': -1}, follow.followed_id: {'followers': -1}})
+
+
+def comment_created(comment):
+    add({comment.user_id: {'comments': 1}})
+
+
+def like_created(like):
+    add({liked_user_id(like): {'likes_received': 1}})
+
+
+def like_deleted(like):
+    add({liked_user_id(like): {'likes_received': -1}})
+
+
+def liked_user_id(like):
+    return like.post.author_id if like.post_id else like.comment.user_id
+
+
+def comment_deleted(comment):
+    """Count a comment out, with the likes it received."""
+    add({comment.user_id: {'comments': -1, 'likes_received': -comment.like_set.count()}})
+
+
+def post_deleted(post):
+    """Count a post out, with its comments and the likes they all received."""
+    changes = defaultdict(Counter)
+    changes[post.author_id].update(posts=-1, likes_received=-post.like_set.count())
+    for user_id, count in Comment.objects.filter(post=post).values_list('user').annotate(count=Count('id')).order_by():
+        changes[user_id]['comments'] -= count
+    comment_likes = Like.objects.filter(comment__post=post).values_list('comment__user').annotate(count=Count('id'))
+    for user_id, count in comment_likes.order_by():
+        changes[user_id]['likes_received'] -= count
+    add(changes)
+
+
+def rebuild(start, stop):
+    """Recount the stats of the users with ids in [start, stop), return the number of rows changed."""
+    with connection.cursor() as cursor:
+        cursor.execute(REBUILD_SQL, [start, stop])
+        return cursor.rowcount
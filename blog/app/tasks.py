@@ -0,0 +1,39 @@
+"""
+Jobs run by ``manage.py jobworker``, see app/jobs.py.
+"""
+from rest_framework_simplejwt.token_blacklist.models import (BlacklistedToken,
+                                                             OutstandingToken)
+
+from app import timeline, trending
+from app.jobs import register
+
+
+@register('blacklist_user_tokens')
+def blacklist_user_tokens(user_id):
+    """Blacklist every outstanding refresh token of a user, also called inline by logout."""
+    tokens = OutstandingToken.objects.filter(user=user_id, blacklistedtoken__isnull=True)
+    BlacklistedToken.objects.bulk_create(
+        [BlacklistedToken(token=token) for token in tokens.only('id')], ignore_conflicts=True,
+    )
+
+
+@register('compute_trending')
+def compute_trending(reschedule=False):
+    """Recompute the trending posts, then queue the next run when ``reschedule``."""
+    trending.compute()
+    if reschedule:
+        trending.schedule()
+
+
+@register('fan_out_post')
+def fan_out_post(post_id):
+    """Write a new post to the home timelines of its author and followers."""
+    timeline.fan_out(post_id)
+
+
+@register('trim_timelines')
+def trim_timelines(reschedule=False):
+    """Trim the home timelines, then queue the next run when ``reschedule``."""
+    timeline.trim_all()
+    if reschedule:
+        timeline.schedule_trim()
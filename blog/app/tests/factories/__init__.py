@@ -1,5 +1,13 @@
+from .comment import CommentFactory
+from .like import LikeFactory
+from .post import PostFactory
+from .profile import ProfileFactory
 from .user import UserFactory
 
 __all__ = [
+    "CommentFactory",
+    "LikeFactory",
+    "PostFactory",
+    "ProfileFactory",
     "UserFactory",
 ]
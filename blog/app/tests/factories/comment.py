@@ -0,0 +1,15 @@
+import factory
+
+from app.models import Comment
+
+from .post import PostFactory
+from .user import UserFactory
+
+
+class CommentFactory(factory.django.DjangoModelFactory):
+    user = factory.SubFactory(UserFactory)
+    post = factory.SubFactory(PostFactory)
+    text = factory.Faker("sentence")
+
+    class Meta:
+        model = Comment
@@ -0,0 +1,15 @@
+import factory
+
+from app.models import Like
+
+from .post import PostFactory
+from .user import UserFactory
+
+
+class LikeFactory(factory.django.DjangoModelFactory):
+    user = factory.SubFactory(UserFactory)
+    post = factory.SubFactory(PostFactory)
+    comment = None
+
+    class Meta:
+        model = Like
@@ -0,0 +1,18 @@
+import factory
+from django.utils import timezone
+
+from app.models import Post
+
+from .user import UserFactory
+
+
+class PostFactory(factory.django.DjangoModelFactory):
+    author = factory.SubFactory(UserFactory)
+    title = factory.Faker("sentence", nb_words=4)
+    content = factory.Faker("text", max_nb_chars=200)
+    publish_date = factory.LazyFunction(timezone.now)
+    category = "news"
+    tags = factory.List(["python", "django"])
+
+    class Meta:
+        model = Post
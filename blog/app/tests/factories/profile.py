@@ -0,0 +1,14 @@
+import factory
+
+from app.models import Profile
+
+from .user import UserFactory
+
+
+class ProfileFactory(factory.django.DjangoModelFactory):
+    user = factory.SubFactory(UserFactory)
+    biography = factory.Faker("sentence")
+    profile_image = "uploads/profile.png"
+
+    class Meta:
+        model = Profile
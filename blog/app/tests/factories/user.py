@@ -6,7 +6,7 @@ class UserFactory(factory.django.DjangoModelFactory):
     email = factory.Sequence(lambda n: "user_{}@example.com".format(n))
     first_name = factory.Faker("first_name")
     last_name = factory.Faker("last_name")
-    username = "username"
+    username = factory.Sequence(lambda n: "username_{}".format(n))
     password = "password"
 
     class Meta:
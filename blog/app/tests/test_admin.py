@@ -0,0 +1,101 @@
+from django.contrib import admin
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from app import trending
+from app.admin import delete_comments, delete_posts
+from app.models import Comment, Like, Post, TrendingPost
+from app.tests.factories import (CommentFactory, LikeFactory, PostFactory,
+                                 UserFactory)
+
+
+class LargeTableAdminTests(TestCase):
+    """Test the admin of posts, comments and likes"""
+
+    def setUp(self):
+        self.superuser = UserFactory(is_superuser=True)
+
+    def changelist(self, model, **params):
+        request = RequestFactory().get('/admin/', params)
+        request.user = self.superuser
+        return admin.site._registry[model].get_changelist_instance(request)
+
+    def test_foreign_keys_are_joined(self):
+        """A page of posts and their authors is one query"""
+        PostFactory.create_batch(5)
+        changelist = self.changelist(Post)
+
+        with self.assertNumQueries(1):
+            authors = [post.author.username for post in changelist.result_list]
+
+        self.assertEqual(len(authors), 5)
+
+    @override_settings(ADMIN_EXACT_COUNT_LIMIT=0)
+    def test_estimated_count(self):
+        """Above the limit, the planner's estimate replaces COUNT(*)"""
+        PostFactory.create_batch(3)
+
+        with CaptureQueriesContext(connection) as queries:
+            changelist = self.changelist(Post)
+
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+        self.assertGreater(changelist.result_count, 0)
+
+    def test_exact_count(self):
+        """Below the limit, rows are counted"""
+        PostFactory.create_batch(3)
+        self.assertEqual(self.changelist(Post).result_count, 3)
+
+    def test_search(self):
+        """Searches match ids and usernames exactly"""
+        post = PostFactory()
+        comment = CommentFactory(post=post)
+        CommentFactory()
+
+        self.assertEqual(list(self.changelist(Comment, q=str(comment.id)).result_list), [comment])
+        self.assertEqual(list(self.changelist(Comment, q=str(post.id)).result_list), [comment])
+        self.assertEqual(list(self.changelist(Comment, q=comment.user.username).result_list), [comment])
+        self.assertEqual(list(self.changelist(Comment, q='nobody').result_list), [])
+        self.assertEqual(self.changelist(Comment, q='nobody').result_count, 0)
+
+    def test_category_filter(self):
+        """Posts are filtered by category"""
+        news = PostFactory(category='news')
+        PostFactory(category='sports')
+
+        self.assertEqual(list(self.changelist(Post, category='news').result_list), [news])
+
+    def test_delete_posts(self):
+        """Posts are deleted with their comments and likes"""
+        post = PostFactory()
+        comment = CommentFactory(post=post)
+        LikeFactory(post=post)
+        LikeFactory(post=None, comment=comment)
+        kept = LikeFactory()
+
+        deleted = delete_posts(Post.objects.filter(id=post.id))
+
+        self.assertEqual(deleted, 1)
+        self.assertEqual(list(Post.objects.all()), [kept.post])
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(list(Like.objects.all()), [kept])
+
+    def test_delete_trending_posts(self):
+        """Deleting a ranked post removes it from the rankings"""
+        post = PostFactory()
+        LikeFactory(post=post)
+        trending.compute()
+
+        self.assertEqual(delete_posts(Post.objects.all()), 1)
+        connection.check_constraints()
+        self.assertFalse(TrendingPost.objects.exists())
+
+    def test_delete_comments(self):
+        """Comments are deleted with their likes"""
+        comment = CommentFactory()
+        LikeFactory(post=None, comment=comment)
+
+        self.assertEqual(delete_comments(Comment.objects.all()), 1)
+        self.assertFalse(Like.objects.exists())
+        self.assertTrue(Post.objects.exists())
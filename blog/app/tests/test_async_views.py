@@ -0,0 +1,68 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.test import AsyncRequestFactory, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from app import async_views, views
+from app.models import Comment, Post
+from app.tests.factories import UserFactory
+
+
+class TestAsyncReadViews(TestCase):
+    """Test the async post and comment read views"""
+
+    def setUp(self):
+        self.user = UserFactory()
+        for index in range(12):
+            post = Post.objects.create(
+                author=self.user, title=f'title {index}', content='content', category='news', tags=['a', 'b']
+            )
+        Comment.objects.create(user=self.user, post=post, text='nice')
+        self.factory = AsyncRequestFactory()
+        self.auth = {'headers': {'Authorization': f"Bearer {self.user.tokens()['access']}"}}
+
+    async def test_post_list_matches_sync_view(self):
+        """The async list is paginated and serialized like the viewset"""
+        view = async_views.PostListView.as_view()
+        response = await view(self.factory.get('/api/v1/post/?page=2', **self.auth))
+
+        client = APIClient()
+        await sync_to_async(client.force_authenticate)(user=self.user)
+        expected = await sync_to_async(client.get)(reverse('app:post-list'), {'page': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content), expected.json())
+
+    async def test_post_retrieve(self):
+        """Retrieve a single post and 404 on unknown ids"""
+        view = async_views.PostDetailView.as_view()
+        post = await Post.objects.afirst()
+        response = await view(self.factory.get(f'/api/v1/post/{post.id}/', **self.auth), pk=post.id)
+        self.assertEqual(json.loads(response.content)['title'], post.title)
+
+        response = await view(self.factory.get('/api/v1/post/0/', **self.auth), pk=0)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_comment_list(self):
+        """List comments"""
+        view = async_views.CommentListView.as_view()
+        response = await view(self.factory.get('/api/v1/comment/', **self.auth))
+        self.assertEqual(json.loads(response.content)['results'][0]['text'], 'nice')
+
+    async def test_unauthenticated(self):
+        """Requests without a token are rejected with the standard error format"""
+        view = async_views.PostListView.as_view()
+        response = await view(self.factory.get('/api/v1/post/'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(json.loads(response.content)['errors'][0]['code'], 'not_authenticated')
+
+    async def test_writes_use_fallback(self):
+        """Non GET requests are delegated to the synchronous viewset"""
+        view = async_views.PostListView.as_view(fallback=views.PostView.as_view({'post': 'create'}))
+        data = {'title': 'new', 'content': 'content', 'publish_date': None, 'category': 'news', 'tags': ['a']}
+        request = self.factory.post('/api/v1/post/', data, content_type='application/json', **self.auth)
+        response = await view(request)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(await Post.objects.filter(title='new').aexists())
@@ -0,0 +1,132 @@
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from app.models import Post
+from app.tests.factories import (CommentFactory, LikeFactory, PostFactory,
+                                 ProfileFactory, UserFactory)
+
+
+class TestBatchView(APITestCase):
+    """Test running several API calls in one request"""
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('app:batch')
+
+    def test_post_screen(self):
+        """Reads of several endpoints answer in one response, in order"""
+        post = PostFactory()
+        CommentFactory(post=post)
+        LikeFactory(post=post)
+        ProfileFactory(user=self.user)
+
+        response = self.client.post(self.url, {'requests': [
+            {'id': 'post', 'method': 'GET', 'path': reverse('app:post-detail', args=[post.id])},
+            {'id': 'comments', 'method': 'GET', 'path': reverse('app:comment-list') + '?page_size=5'},
+            {'id': 'likes', 'method': 'GET', 'path': reverse('app:like-list')},
+            {'id': 'profile', 'method': 'GET', 'path': reverse('app:profile')},
+            {'id': 'missing', 'method': 'GET', 'path': reverse('app:post-detail', args=[0])},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()['responses']
+        self.assertEqual([result['id'] for result in results], ['post', 'comments', 'likes', 'profile', 'missing'])
+        self.assertEqual([result['status'] for result in results], [200, 200, 200, 200, 404])
+        self.assertEqual(results[0]['body']['id'], post.id)
+        self.assertEqual(len(results[1]['body']['results']), 1)
+
+    def test_writes(self):
+        """Writes run as the batch user"""
+        response = self.client.post(self.url, {'requests': [
+            {'method': 'POST', 'path': reverse('app:post-list'), 'body': {
+                'title': 'title', 'content': 'content', 'publish_date': '2023-01-01T00:00:00Z',
+                'category': 'news', 'tags': ['python'],
+            }},
+            {'method': 'GET', 'path': reverse('app:user')},
+        ]}, format='json')
+
+        results = response.json()['responses']
+        self.assertEqual([result['status'] for result in results], [201, 200])
+        self.assertEqual(Post.objects.get().author, self.user)
+        self.assertEqual(results[1]['body']['stats']['posts'], 1)
+
+    def test_atomic(self):
+        """In atomic mode, an error rolls back the writes before it and skips the rest"""
+        response = self.client.post(self.url, {'atomic': True, 'requests': [
+            {'method': 'POST', 'path': reverse('app:post-list'), 'body': {
+                'title': 'title', 'content': 'content', 'publish_date': '2023-01-01T00:00:00Z',
+                'category': 'news', 'tags': ['python'],
+            }},
+            {'method': 'POST', 'path': reverse('app:comment-list'), 'body': {'post': 0, 'text': 'text'}},
+            {'method': 'GET', 'path': reverse('app:user')},
+        ]}, format='json')
+
+        results = response.json()['responses']
+        self.assertEqual([result['status'] for result in results], [201, 400, 424])
+        self.assertFalse(Post.objects.exists())
+
+    def test_server_error(self):
+        """A sub-request raising answers 500 without losing the results before it"""
+        post = PostFactory(author=self.user)
+        requests = [
+            {'method': 'DELETE', 'path': reverse('app:post-detail', args=[post.id])},
+            {'method': 'PATCH', 'path': reverse('app:post-detail', args=[PostFactory(author=self.user).id]),
+             'body': {'unknown': 'field'}},
+            {'method': 'GET', 'path': reverse('app:user')},
+        ]
+
+        # In debug mode the exception handler leaves unexpected exceptions to Django.
+        with self.settings(DEBUG=True), self.assertLogs('app.batch', 'ERROR'):
+            response = self.client.post(self.url, {'atomic': True, 'requests': requests}, format='json')
+        self.assertEqual([result['status'] for result in response.json()['responses']], [204, 500, 424])
+        self.assertTrue(Post.objects.filter(pk=post.pk).exists())
+
+        with self.settings(DEBUG=True), self.assertLogs('app.batch', 'ERROR'):
+            response = self.client.post(self.url, {'requests': requests}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['status'] for result in response.json()['responses']], [204, 500, 200])
+        self.assertFalse(Post.objects.filter(pk=post.pk).exists())
+
+    def test_validation(self):
+        """Only API endpoints can be called, and not the batch itself"""
+        response = self.client.post(self.url, {'requests': [
+            {'method': 'GET', 'path': '/admin/'},
+            {'method': 'GET', 'path': self.url},
+            {'method': 'GET', 'path': '/api/v1/nowhere/'},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            [error['attr'] for error in response.json()['errors']],
+            ['requests.0.path', 'requests.1.path', 'requests.2.path'],
+        )
+
+    def test_authentication(self):
+        """The batch and its sub-requests need a user"""
+        response = APIClient().post(self.url, {'requests': [{'method': 'GET', 'path': reverse('app:user')}]},
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class TestParallelBatch(TransactionTestCase):
+    """Test running the reads of a batch concurrently"""
+
+    def test_parallel_reads(self):
+        """Reads run concurrently, in order with the writes"""
+        user = UserFactory()
+        posts = PostFactory.create_batch(3)
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        response = client.post(reverse('app:batch'), {'parallel': True, 'requests': [
+            *[{'method': 'GET', 'path': reverse('app:post-detail', args=[post.id])} for post in posts],
+            {'method': 'DELETE', 'path': reverse('app:post-detail', args=[posts[0].id])},
+            {'method': 'GET', 'path': reverse('app:post-detail', args=[posts[1].id])},
+        ]}, format='json')
+
+        results = response.json()['responses']
+        self.assertEqual([result['status'] for result in results], [200, 200, 200, 400, 200])
+        self.assertEqual([result['body']['id'] for result in results[:3]], [post.id for post in posts])
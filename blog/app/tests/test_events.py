@@ -0,0 +1,214 @@
+import asyncio
+import json
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from app import events
+from app.models import Comment
+from app.tests.factories import CommentFactory, PostFactory, UserFactory
+
+
+async def django_application(scope, receive, send):
+    await send({'type': 'http.response.start', 'status': 418, 'headers': []})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+class Stream:
+    """An ASGI client of ``events.route``, reading the response as it is sent."""
+
+    def __init__(self, path, headers=()):
+        self.incoming = asyncio.Queue()
+        self.sent = asyncio.Queue()
+        scope = {'type': 'http', 'method': 'GET', 'path': path, 'headers': list(headers)}
+        self.task = asyncio.ensure_future(events.route(django_application)(scope, self.incoming.get, self.sent.put))
+
+    async def start(self):
+        message = await asyncio.wait_for(self.sent.get(), 5)
+        return message['status'], dict(message['headers'])
+
+    async def read(self):
+        message = await asyncio.wait_for(self.sent.get(), 5)
+        return message['body'].decode()
+
+    async def close(self):
+        await self.incoming.put({'type': 'http.disconnect'})
+        await asyncio.wait_for(self.task, 5)
+
+
+class TestEventStream(TestCase):
+    """Test the server-sent events of a post"""
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.post = PostFactory()
+        self.headers = [(b'authorization', f"Bearer {self.user.tokens()['access']}".encode())]
+
+    async def test_live_events(self):
+        """Published events reach the open streams of their post"""
+        stream = Stream(f'/api/v1/post/{self.post.id}/events/', self.headers)
+        other = Stream(f'/api/v1/post/{self.post.id}/events/', self.headers)
+        status_code, headers = await stream.start()
+        await other.start()
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(headers[b'content-type'], b'text/event-stream')
+        self.assertEqual(await stream.read(), 'retry: 3000\n\n')
+        await other.read()
+
+        events.publish(self.post.id, {'id': 7, 'event': 'comment.created', 'data': {'id': 1, 'text': 'hi'}})
+        events.publish(0, {'id': 8, 'event': 'comment.created', 'data': {'id': 2}})
+
+        expected = 'id: 7\nevent: comment.created\ndata: {"id": 1, "text": "hi"}\n\n'
+        self.assertEqual(await stream.read(), expected)
+        self.assertEqual(await other.read(), expected)
+        await stream.close()
+        await other.close()
+        self.assertEqual(events.broker.count(), 0)
+
+    @override_settings(EVENTS_REPLAY_MARGIN=0)
+    async def test_resume(self):
+        """Reconnecting with Last-Event-ID replays what was created since, once"""
+        seen = await sync_to_async(CommentFactory)(post=self.post)
+        missed = await sync_to_async(CommentFactory)(post=self.post, text='missed')
+        await Comment.objects.filter(pk=missed.pk).aupdate(created=seen.created + timedelta(seconds=1))
+        last_event_id = str(events.event_id(seen.created)).encode()
+
+        stream = Stream(f'/api/v1/post/{self.post.id}/events/', [*self.headers, (b'last-event-id', last_event_id)])
+        await stream.start()
+        body = await stream.read()
+        self.assertIn(f'"id": {missed.id}', body)
+        self.assertNotIn(f'"id": {seen.id}', body)
+
+        events.publish(self.post.id, {'id': 1, 'event': 'comment.created', 'data': {'id': missed.id}})
+        events.publish(self.post.id, {'id': 2, 'event': 'like.created', 'data': {'id': 5}})
+        self.assertIn('event: like.created', await stream.read())
+        await stream.close()
+
+    async def test_resume_late_commit(self):
+        """Rows created shortly before Last-Event-ID are sent again, in case they committed after it"""
+        late = await sync_to_async(CommentFactory)(post=self.post)
+        old = await sync_to_async(CommentFactory)(post=self.post)
+        await Comment.objects.filter(pk=old.pk).aupdate(created=late.created - timedelta(minutes=1))
+        last_event_id = str(events.event_id(late.created + timedelta(seconds=1))).encode()
+
+        stream = Stream(f'/api/v1/post/{self.post.id}/events/', [*self.headers, (b'last-event-id', last_event_id)])
+        await stream.start()
+        body = await stream.read()
+        self.assertIn(f'"id": {late.id}', body)
+        self.assertNotIn(f'"id": {old.id}', body)
+        await stream.close()
+
+    @override_settings(EVENTS_REPLAY_LIMIT=2, EVENTS_REPLAY_MARGIN=0)
+    async def test_truncated_replay_ends(self):
+        """A replay cut at the limit ends the stream, the client resumes from its last event"""
+        comments = await sync_to_async(CommentFactory.create_batch)(4, post=self.post)
+        start = comments[0].created - timedelta(seconds=1)
+        for index, comment in enumerate(comments):
+            await Comment.objects.filter(pk=comment.pk).aupdate(created=start + timedelta(seconds=index + 1))
+        last_event_id = str(events.event_id(start)).encode()
+
+        stream = Stream(f'/api/v1/post/{self.post.id}/events/', [*self.headers, (b'last-event-id', last_event_id)])
+        await stream.start()
+        message = await asyncio.wait_for(stream.sent.get(), 5)
+        await asyncio.wait_for(stream.task, 5)
+
+        self.assertFalse(message.get('more_body', False))
+        self.assertEqual(message['body'].decode().count('event: comment.created'), 2)
+        self.assertIn(f'"id": {comments[1].id}', message['body'].decode())
+        self.assertEqual(events.broker.count(), 0)
+
+    @override_settings(EVENTS_HEARTBEAT=0.01)
+    async def test_heartbeat(self):
+        """Idle streams get a comment line to keep proxies from closing them"""
+        stream = Stream(f'/api/v1/post/{self.post.id}/events/', self.headers)
+        await stream.start()
+        await stream.read()
+        self.assertEqual(await stream.read(), ': ping\n\n')
+        await stream.close()
+
+    @override_settings(EVENTS_QUEUE_SIZE=1)
+    async def test_slow_stream_is_closed(self):
+        """A stream that falls behind ends, so its client resumes from the database"""
+        stream = Stream(f'/api/v1/post/{self.post.id}/events/', self.headers)
+        await stream.start()
+        await stream.read()
+        for index in range(3):
+            events.publish(self.post.id, {'id': index, 'event': 'like.created', 'data': {'id': index}})
+
+        self.assertEqual(await stream.read(), '')
+        await asyncio.wait_for(stream.task, 5)
+        self.assertEqual(events.broker.count(), 0)
+
+    async def test_errors(self):
+        """Streams need a token and an existing post, other paths go to Django"""
+        stream = Stream(f'/api/v1/post/{self.post.id}/events/')
+        status_code, _ = await stream.start()
+        self.assertEqual(status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(json.loads(await stream.read())['errors'][0]['code'], 'not_authenticated')
+
+        stream = Stream('/api/v1/post/0/events/', self.headers)
+        self.assertEqual((await stream.start())[0], status.HTTP_404_NOT_FOUND)
+
+        stream = Stream('/api/v1/post/', self.headers)
+        self.assertEqual((await stream.start())[0], 418)
+
+
+class TestPublishedWrites(APITestCase):
+    """Test the events published by the comment and like endpoints"""
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.post = PostFactory()
+        self.client.force_authenticate(user=self.user)
+
+    def published(self):
+        return [(post_id, event['event']) for (post_id, event), _ in self.publish.call_args_list]
+
+    @mock.patch('app.events.publish')
+    def test_writes_publish_on_commit(self, publish):
+        """Comments and likes publish to their post once committed"""
+        self.publish = publish
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('app:comment-list'), {'post': self.post.id, 'text': 'text'}, format='json')
+            comment = Comment.objects.get()
+            self.client.post(reverse('app:like-list'), {'comment': comment.id}, format='json')
+            self.assertEqual(publish.call_count, 0)
+
+        self.assertEqual(self.published(), [(self.post.id, 'comment.created'), (self.post.id, 'like.created')])
+        self.assertEqual(publish.call_args_list[0][0][1]['id'], events.event_id(comment.created))
+
+        publish.reset_mock()
+        with self.captureOnCommitCallbacks(execute=True):
+            like = comment.like_set.get()
+            self.client.delete(reverse('app:like-detail', args=[like.id]))
+            response = self.client.delete(reverse('app:comment-detail', args=[comment.id]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.published(), [(self.post.id, 'like.deleted'), (self.post.id, 'comment.deleted')])
+
+
+@override_settings(EVENTS_BACKEND='postgres')
+class TestPostgresBackend(TransactionTestCase):
+    """Test events going through LISTEN/NOTIFY"""
+
+    def tearDown(self):
+        events.listener.stop()
+
+    async def test_notify_reaches_streams(self):
+        """Events published on any connection reach the streams of this process"""
+        user = await sync_to_async(UserFactory)()
+        post = await sync_to_async(PostFactory)()
+        tokens = await sync_to_async(user.tokens)()
+        headers = [(b'authorization', f"Bearer {tokens['access']}".encode())]
+        stream = Stream(f'/api/v1/post/{post.id}/events/', headers)
+        await stream.start()
+        await stream.read()
+
+        await sync_to_async(events.publish)(post.id, {'id': 3, 'event': 'like.created', 'data': {'id': 4}})
+
+        self.assertEqual(await stream.read(), 'id: 3\nevent: like.created\ndata: {"id": 4}\n\n')
+        await stream.close()
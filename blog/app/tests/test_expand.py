@@ -0,0 +1,82 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.test import AsyncRequestFactory
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from app import async_views, views
+from app.tests.factories import (CommentFactory, PostFactory, ProfileFactory,
+                                 UserFactory)
+
+
+class TestExpand(APITestCase):
+    """Test embedding authors and their profiles with ?expand="""
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.client.force_authenticate(user=self.user)
+
+    def create_posts(self, count):
+        for _ in range(count):
+            PostFactory(author=ProfileFactory().user)
+
+    def test_post_list(self):
+        """Authors and profiles are embedded in a constant number of queries"""
+        self.create_posts(2)
+        with self.assertNumQueries(2):
+            self.client.get(reverse('app:post-list'), {'expand': 'author.profile'})
+
+        self.create_posts(8)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('app:post-list'), {'expand': 'author,author.profile'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        author = response.json()['results'][0]['author']
+        self.assertEqual(set(author), {'id', 'username', 'first_name', 'last_name', 'profile'})
+        self.assertTrue(author['profile']['profile_image'].endswith('uploads/profile.png'))
+
+    def test_author_only(self):
+        """Expanding the author alone leaves out the profile"""
+        post = PostFactory()
+
+        response = self.client.get(reverse('app:post-detail', args=[post.id]), {'expand': 'author'})
+
+        self.assertEqual(response.json()['author'], {
+            'id': post.author.id, 'username': post.author.username,
+            'first_name': post.author.first_name, 'last_name': post.author.last_name,
+        })
+        response = self.client.get(reverse('app:post-detail', args=[post.id]))
+        self.assertEqual(response.json()['author'], post.author.id)
+
+    def test_comment_list(self):
+        """Comments expand their user, whose profile may be missing"""
+        CommentFactory(user=ProfileFactory().user)
+        CommentFactory()
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('app:comment-list'), {'expand': 'user.profile'})
+
+        profiles = [comment['user']['profile'] for comment in response.json()['results']]
+        self.assertEqual(profiles.count(None), 1)
+
+    def test_unknown_path(self):
+        """Paths the view cannot expand are rejected"""
+        response = self.client.get(reverse('app:post-list'), {'expand': 'author.password'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()['errors'][0]['attr'], 'expand')
+
+    async def test_async_view_falls_back(self):
+        """The async list hands expanded requests to the viewset"""
+        post = await sync_to_async(PostFactory)()
+        tokens = await sync_to_async(self.user.tokens)()
+        view = async_views.PostListView.as_view(fallback=views.PostView.as_view({'get': 'list'}))
+        request = AsyncRequestFactory().get('/api/v1/post/?expand=author', headers={
+            'Authorization': f"Bearer {tokens['access']}",
+        })
+
+        response = (await view(request)).render()
+
+        self.assertEqual(json.loads(response.content)['results'][0]['author']['id'], post.author_id)
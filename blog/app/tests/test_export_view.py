@@ -0,0 +1,83 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from app.models import Post
+from app.tests.factories import CommentFactory, PostFactory, UserFactory
+
+
+class TestExportView(APITestCase):
+    """Test the streaming exports"""
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.posts = PostFactory.create_batch(3, author=self.user, tags=['a', 'b'])
+        CommentFactory(post=self.posts[0])
+        self.client.force_authenticate(user=self.user)
+
+    def get_lines(self, response):
+        return b''.join(response.streaming_content).decode().splitlines()
+
+    def test_ndjson_export(self):
+        """Every post is streamed as one JSON line, oldest modification first"""
+        response = self.client.get(reverse('app:export', args=['posts', 'ndjson']))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.get_lines(response)]
+        self.assertEqual([row['id'] for row in rows], [post.id for post in self.posts])
+        self.assertEqual(rows[0]['tags'], ['a', 'b'])
+        self.assertEqual(rows[0]['author_id'], self.user.id)
+
+    def test_csv_export(self):
+        """CSV exports start with a header row"""
+        response = self.client.get(reverse('app:export', args=['comments', 'csv']))
+        rows = list(csv.reader(self.get_lines(response)))
+        self.assertEqual(rows[0], ['id', 'user_id', 'post_id', 'text', 'created', 'modified'])
+        self.assertEqual(len(rows), 2)
+
+    def test_incremental_export(self):
+        """Only rows modified after since are exported"""
+        since = self.posts[1].modified
+        Post.objects.filter(id=self.posts[0].id).update(modified=since + timedelta(seconds=1))
+        response = self.client.get(reverse('app:export', args=['posts', 'ndjson']), {'since': since.isoformat()})
+        rows = [json.loads(line) for line in self.get_lines(response)]
+        self.assertEqual({row['id'] for row in rows}, {self.posts[0].id, self.posts[2].id})
+
+    def test_patch_bumps_modified(self):
+        """Patched posts are exported again"""
+        since = max(post.modified for post in self.posts)
+        self.client.patch(reverse('app:post-detail', args=[self.posts[0].id]), {'title': 'new'}, format='json')
+        response = self.client.get(reverse('app:export', args=['posts', 'ndjson']), {'since': since.isoformat()})
+        rows = [json.loads(line) for line in self.get_lines(response)]
+        self.assertEqual([(row['id'], row['title']) for row in rows], [(self.posts[0].id, 'new')])
+
+    async def test_asgi_stream(self):
+        """Under ASGI the export is an async stream"""
+        tokens = await sync_to_async(self.user.tokens)()
+        headers = {'AUTHORIZATION': f"Bearer {tokens['access']}"}
+        response = await self.async_client.get(reverse('app:export', args=['posts', 'ndjson']), **headers)
+        self.assertTrue(response.is_async)
+        lines = b''.join([chunk async for chunk in response.streaming_content]).decode().splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [post.id for post in self.posts])
+
+    def test_invalid_requests(self):
+        """Unknown exports and bad dates are rejected"""
+        response = self.client.get(reverse('app:export', args=['users', 'ndjson']))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(reverse('app:export', args=['posts', 'csv']), {'since': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_command(self):
+        """The management command writes the same stream"""
+        output = io.StringIO()
+        call_command('export', 'likes', stdout=output)
+        self.assertEqual(output.getvalue(), '')
+        call_command('export', 'posts', '--format', 'csv', stdout=output)
+        self.assertEqual(len(list(csv.reader(io.StringIO(output.getvalue())))), 4)
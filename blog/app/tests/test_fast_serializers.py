@@ -0,0 +1,49 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from app.fast_serializers import get_row_converter
+from app.models import Comment, Like, Post
+from app.serializers import (PostSerializer, ShowCommentSerializer,
+                             ShowLikeSerializer)
+from app.tests.factories import (CommentFactory, LikeFactory, PostFactory,
+                                 UserFactory)
+
+
+class TestFastSerializers(TestCase):
+    """Parity of the row converters with the DRF serializers"""
+
+    def setUp(self):
+        self.user = UserFactory()
+        PostFactory.create_batch(3, author=self.user)
+        PostFactory(author=self.user, publish_date=None, tags=[], content='')
+        comment = CommentFactory(post=Post.objects.first())
+        LikeFactory(user=self.user, post=comment.post)
+        LikeFactory(user=self.user, post=None, comment=comment)
+
+    def assertSameOutput(self, serializer_class, queryset):
+        converter = get_row_converter(serializer_class)
+        expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+        fast = JSONRenderer().render(converter(queryset.values_list(*converter.columns)))
+        self.assertEqual(fast, expected)
+
+    def test_post_parity(self):
+        """Posts, with and without publish date"""
+        self.assertSameOutput(PostSerializer, Post.objects.all())
+
+    def test_comment_parity(self):
+        """Comments"""
+        self.assertSameOutput(ShowCommentSerializer, Comment.objects.all())
+
+    def test_like_parity(self):
+        """Likes on posts and on comments"""
+        self.assertSameOutput(ShowLikeSerializer, Like.objects.all())
+
+    def test_list_endpoint_uses_fast_path(self):
+        """The list endpoint returns the serializer representation"""
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.get(reverse('app:post-list'))
+        self.assertEqual(response.json()['count'], 4)
+        self.assertEqual(response.json()['results'], PostSerializer(Post.objects.all(), many=True).data)
@@ -0,0 +1,142 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.token_blacklist.models import (BlacklistedToken,
+                                                             OutstandingToken)
+
+from app import jobs
+from app.models import Job
+from app.tests.factories import UserFactory
+
+calls = []
+
+
+@jobs.register('test_record')
+def record(value):
+    calls.append(value)
+
+
+@jobs.register('test_fail')
+def fail():
+    raise RuntimeError('boom')
+
+
+class JobQueueTests(TestCase):
+    """Test queueing, claiming and retrying jobs"""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_priority_and_run_at(self):
+        """Jobs due run by priority, jobs scheduled later wait"""
+        jobs.enqueue('test_record', {'value': 'low'})
+        jobs.enqueue('test_record', {'value': 'high'}, priority=5)
+        jobs.enqueue('test_record', {'value': 'later'}, priority=10, delay=timedelta(hours=1))
+
+        while jobs.run_next():
+            pass
+
+        self.assertEqual(calls, ['high', 'low'])
+        self.assertEqual(list(Job.objects.values_list('payload', flat=True)), [{'value': 'later'}])
+
+    def test_dedup_key(self):
+        """A job with the dedup key of a pending one is not queued"""
+        first = jobs.enqueue('test_record', {'value': 1}, dedup_key='key')
+        second = jobs.enqueue('test_record', {'value': 2}, dedup_key='key')
+
+        self.assertIsNotNone(first)
+        self.assertIsNone(second)
+        jobs.run_next()
+        self.assertIsNotNone(jobs.enqueue('test_record', {'value': 3}, dedup_key='key'))
+
+    def test_dedup_key_while_running(self):
+        """A running job can queue its next run with its own dedup key"""
+        jobs.enqueue('test_record', {'value': 1}, dedup_key='key')
+        job = jobs.claim()
+
+        self.assertIsNotNone(jobs.enqueue('test_record', {'value': 2}, dedup_key='key'))
+        self.assertFalse(jobs.run(Job(id=job.id, name='test_fail', attempts=1, max_attempts=2)))
+        self.assertEqual(list(Job.objects.values_list('payload', flat=True)), [{'value': 2}])
+
+    def test_retry_with_backoff(self):
+        """A failing job is queued again later, then kept as failed"""
+        job = jobs.enqueue('test_fail', max_attempts=2)
+
+        with self.settings(JOB_RETRY_BASE_DELAY=60), mock.patch('random.uniform', return_value=1):
+            jobs.run_next()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertAlmostEqual((job.run_at - timezone.now()).total_seconds(), 60, delta=5)
+        self.assertIn('RuntimeError: boom', job.last_error)
+        self.assertIsNone(jobs.run_next())
+
+        Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        jobs.run_next()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_requeue_stale(self):
+        """Jobs left running by a dead worker are queued again"""
+        jobs.enqueue('test_record', {'value': 1})
+        job = jobs.claim()
+        Job.objects.filter(id=job.id).update(locked_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(jobs.stats()['queued'], 1)
+
+    def test_stale_out_of_attempts(self):
+        """Jobs killing their worker on their last attempt are failed, not queued again"""
+        job = jobs.enqueue('test_record', {'value': 1}, max_attempts=1)
+        jobs.claim()
+        Job.objects.filter(id=job.id).update(locked_at=timezone.now() - timedelta(hours=1))
+
+        with self.assertLogs('app.jobs', 'ERROR'):
+            self.assertEqual(jobs.requeue_stale(), 0)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 1))
+        self.assertIsNone(jobs.claim())
+
+
+class JobWorkerCommandTests(TransactionTestCase):
+    """Test the jobworker command"""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_once(self):
+        """Concurrent workers run every job due once, then report"""
+        for value in range(20):
+            jobs.enqueue('test_record', {'value': value})
+        output = StringIO()
+
+        call_command('jobworker', threads=4, once=True, stdout=output)
+
+        self.assertEqual(sorted(calls), list(range(20)))
+        self.assertFalse(Job.objects.exists())
+        self.assertIn('queued=0 running=0 failed=0', output.getvalue())
+        self.assertIn('test_record: ok=20 failed=0', output.getvalue())
+
+
+class LogoutAllTests(APITestCase):
+    """Test logging out of every session"""
+
+    def test_logout_all(self):
+        """Tokens are blacklisted before answering"""
+        user = UserFactory()
+        user.tokens()
+        user.tokens()
+        self.client.force_authenticate(user=user)
+
+        response = self.client.post(reverse('app:session-logout'), {'all': True})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(BlacklistedToken.objects.count(), 2)
+        self.assertEqual(BlacklistedToken.objects.count(), OutstandingToken.objects.filter(user=user).count())
+        self.assertFalse(Job.objects.exists())
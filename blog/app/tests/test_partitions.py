@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+
+from app import partitions
+from app.models import Comment, Like
+from app.tests.factories import CommentFactory, LikeFactory
+
+
+class TestPartitions(TestCase):
+    """Test partitioning the comment and like tables, rolled back with the test's transaction"""
+
+    def setUp(self):
+        self.comment = CommentFactory()
+        self.like = LikeFactory(post=None, comment=self.comment)
+        with connection.cursor() as cursor:
+            # Pending deferred foreign key checks would forbid altering the tables.
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+    def test_convert(self):
+        """The table is partitioned in place, keeping its rows, indexes and ids"""
+        output = StringIO()
+        call_command('partitions', 'convert', months_ahead=2, stdout=output)
+
+        self.assertTrue(partitions.is_partitioned('app_comment'))
+        self.assertTrue(partitions.is_partitioned('app_like'))
+        next_month = partitions.month_start(datetime.now(timezone.utc), 1)
+        self.assertEqual(partitions.partitions('app_comment'), [
+            ('app_comment_legacy', next_month),
+            (f'app_comment_p{next_month:%Y_%m}', partitions.month_start(next_month, 1)),
+            (f'app_comment_p{partitions.month_start(next_month, 1):%Y_%m}', partitions.month_start(next_month, 2)),
+        ])
+        self.assertEqual(Like.objects.get().comment, self.comment)
+        self.assertEqual(partitions.referencing_foreign_keys('app_comment'), [])
+
+        comment = CommentFactory(post=self.comment.post)
+        self.assertGreater(comment.id, self.comment.id)
+        Comment.objects.filter(pk=comment.pk).update(created=next_month)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT tableoid::regclass::text FROM app_comment WHERE id = %s', [comment.id])
+            self.assertEqual(cursor.fetchone(), (f'app_comment_p{next_month:%Y_%m}',))
+            cursor.execute('SELECT count(*) FROM pg_indexes WHERE tablename = %s', [f'app_comment_p{next_month:%Y_%m}'])
+            self.assertEqual(cursor.fetchone(), (5,))
+
+        with self.assertRaises(CommandError):
+            call_command('partitions', 'convert', 'comment', stdout=output)
+
+    def test_convert_near_month_end(self):
+        """Close to the next month, the legacy partition also takes that month"""
+        next_month = partitions.month_start(datetime.now(timezone.utc), 1)
+        with mock.patch('app.partitions.now', return_value=next_month - timedelta(hours=1)):
+            partitions.convert('app_comment', 1)
+
+        self.assertEqual(partitions.partitions('app_comment')[0], ('app_comment_legacy', partitions.month_start(next_month, 1)))
+
+    def test_detach_drop_likes(self):
+        """Dropped comment partitions take the likes of their comments along"""
+        call_command('partitions', 'convert', 'comment', months_ahead=1, stdout=StringIO())
+        kept = LikeFactory()
+
+        call_command('partitions', 'detach', 'comment', retention=-1, drop=True, stdout=StringIO())
+
+        self.assertEqual(list(Like.objects.all()), [kept])
+
+    def test_create_and_detach(self):
+        """Partitions are added ahead and old ones archived or dropped"""
+        call_command('partitions', 'convert', 'comment', months_ahead=1, stdout=StringIO())
+        next_month = partitions.month_start(datetime.now(timezone.utc), 1)
+
+        output = StringIO()
+        call_command('partitions', 'create', 'comment', 'like', months_ahead=3, stdout=output)
+        self.assertEqual(len(partitions.partitions('app_comment')), 4)
+        self.assertIn('app_like is not partitioned', output.getvalue())
+
+        call_command('partitions', 'detach', 'comment', retention=-1, stdout=output)
+        self.assertEqual(len(partitions.partitions('app_comment')), 3)
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Like.objects.exists())
+        self.assertIn('rebuild_user_stats', output.getvalue())
+        self.assertEqual(partitions.fetch('SELECT count(*) FROM archive.app_comment_legacy'), [(1,)])
+        self.assertEqual(partitions.fetch('SELECT id FROM archive.app_comment_legacy_like'), [(self.like.id,)])
+
+        call_command('partitions', 'detach', 'comment', retention=-3, drop=True, stdout=output)
+        self.assertEqual(len(partitions.partitions('app_comment')), 1)
+        self.assertEqual(partitions.fetch('SELECT to_regclass(%s)', [partitions.partition_name('app_comment', next_month)]),
+                         [(None,)])
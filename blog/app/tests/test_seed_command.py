@@ -0,0 +1,33 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from app.models import Comment, Like, Post, User
+from app.tests.factories import CommentFactory, LikeFactory, ProfileFactory
+
+
+class TestSeedCommand(TestCase):
+    """Test the synthetic dataset generator"""
+
+    def test_seed_creates_rows(self):
+        """Seeding inserts the requested number of rows"""
+        call_command('seed', users=3, posts=5, comments=7, likes=9, batch_size=4, stdout=StringIO())
+        self.assertEqual(User.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(Comment.objects.count(), 7)
+        self.assertEqual(Like.objects.count(), 9)
+        self.assertEqual(Like.objects.values('user', 'post').distinct().count(), 9)
+        self.assertTrue(User.objects.first().check_password('password'))
+
+    def test_seed_needs_posts_for_comments(self):
+        """Comments cannot be seeded without posts"""
+        with self.assertRaises(CommandError):
+            call_command('seed', users=1, posts=0, comments=1, likes=0, stdout=StringIO())
+
+    def test_factories(self):
+        """Factories build consistent related rows"""
+        like = LikeFactory(post=CommentFactory().post)
+        ProfileFactory(user=like.user)
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertEqual(like.user.profile.user, like.user)
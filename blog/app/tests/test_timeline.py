@@ -0,0 +1,139 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib import admin
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from drf_spectacular.generators import SchemaGenerator
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from app import jobs, timeline
+from app.models import Follow, Post, TimelineEntry, UserStats
+from app.tests.factories import PostFactory, UserFactory
+
+POST = {
+    'title': 'title', 'content': 'content', 'publish_date': '2023-01-01T00:00:00Z', 'category': 'news', 'tags': ['python'],
+}
+
+
+class TestTimeline(APITestCase):
+    """Test following authors and the home timeline"""
+
+    def setUp(self):
+        self.author = UserFactory()
+        self.reader = UserFactory()
+
+    def follow(self, user, followed):
+        self.client.force_authenticate(user=user)
+        return self.client.post(reverse('app:follow', args=[followed.id]))
+
+    def publish(self):
+        self.client.force_authenticate(user=self.author)
+        self.client.post(reverse('app:post-list'), POST, format='json')
+        while jobs.run_next():
+            pass
+        return Post.objects.latest('created')
+
+    def timeline(self, user, **params):
+        self.client.force_authenticate(user=user)
+        response = self.client.get(reverse('app:timeline'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_fan_out_on_write(self):
+        """New posts reach the timelines of the author and their followers only"""
+        self.assertEqual(self.follow(self.reader, self.author).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.follow(self.reader, self.author).status_code, status.HTTP_200_OK)
+        post = self.publish()
+
+        self.assertEqual([item['id'] for item in self.timeline(self.reader)['results']], [post.id])
+        self.assertEqual([item['id'] for item in self.timeline(self.author)['results']], [post.id])
+        self.assertEqual(self.timeline(UserFactory())['results'], [])
+        stats = UserStats.objects.get(user=self.author)
+        self.assertEqual((stats.followers, stats.following), (1, 0))
+
+    def test_follow_and_unfollow(self):
+        """Following copies the latest posts of the author, unfollowing removes them"""
+        posts = PostFactory.create_batch(2, author=self.author)
+        self.follow(self.reader, self.author)
+        self.assertEqual([item['id'] for item in self.timeline(self.reader)['results']], [posts[1].id, posts[0].id])
+
+        response = self.client.delete(reverse('app:follow', args=[self.author.id]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.timeline(self.reader)['results'], [])
+        self.assertEqual(UserStats.objects.get(user=self.reader).following, 0)
+        response = self.client.delete(reverse('app:follow', args=[self.author.id]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(self.follow(self.reader, self.reader).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(reverse('app:follow', args=[self.author.id + self.reader.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Follow.objects.exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_popular_author_pulled_on_read(self):
+        """Posts of authors with many followers are pulled when reading the first page"""
+        self.follow(self.reader, self.author)
+        post = self.publish()
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader).exists())
+
+        self.client.force_authenticate(user=self.reader)
+        response = self.client.get(reverse('app:timeline'), {'expand': 'author'})
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        results = response.json()['results']
+        self.assertEqual([item['id'] for item in results], [post.id])
+        self.assertEqual(results[0]['author']['username'], self.author.username)
+        self.assertTrue(TimelineEntry.objects.filter(user=self.reader, post=post).exists())
+
+    def test_schema(self):
+        """The timeline documents its expand parameter"""
+        operation = SchemaGenerator().get_schema(public=True)['paths']['/api/v1/timeline/']['get']
+        self.assertIn('expand', [parameter['name'] for parameter in operation['parameters']])
+
+    def test_cursor_pagination(self):
+        """Pages follow each other by cursor, each in a single query"""
+        posts = PostFactory.create_batch(12, author=self.author)
+        for index, post in enumerate(posts):
+            Post.objects.filter(pk=post.pk).update(created=timezone.now() - timedelta(minutes=index))
+        self.follow(self.reader, self.author)
+
+        first = self.timeline(self.reader)
+        self.assertEqual([item['id'] for item in first['results']], [post.id for post in posts[:10]])
+        self.assertNotIn('count', first)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(first['next'])
+        self.assertEqual(len(queries), 1)
+        self.assertEqual([item['id'] for item in response.json()['results']], [post.id for post in posts[10:]])
+        self.assertIsNone(response.json()['next'])
+
+    def test_admin_delete(self):
+        """Posts deleted from the admin leave the timelines"""
+        self.follow(self.reader, self.author)
+        post = self.publish()
+        request = RequestFactory().post('/admin/')
+        request.user = UserFactory(is_superuser=True)
+
+        self.assertEqual(admin.site._registry[Post].delete_queryset(request, Post.objects.filter(pk=post.pk)), 1)
+        connection.check_constraints()
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    @override_settings(TIMELINE_LENGTH=2)
+    def test_trim(self):
+        """Trimming keeps the newest entries of every timeline"""
+        posts = PostFactory.create_batch(3, author=self.author)
+        self.follow(self.reader, self.author)
+
+        self.assertEqual(timeline.trim_all(batch_size=1), 1)
+        self.assertEqual(list(TimelineEntry.objects.filter(user=self.reader).values_list('post', flat=True)),
+                         [posts[2].id, posts[1].id])
+
+        output = StringIO()
+        call_command('trim_timelines', schedule=True, stdout=output)
+        call_command('trim_timelines', schedule=True, stdout=output)
+        self.assertIn('Already scheduled', output.getvalue())
@@ -0,0 +1,94 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from app import jobs, trending
+from app.models import Job, Like, TrendingPost
+from app.tests.factories import (CommentFactory, LikeFactory, PostFactory,
+                                 UserFactory)
+
+
+class TestTrending(APITestCase):
+    """Test the trending posts ranking"""
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(user=UserFactory())
+
+    def test_ranking(self):
+        """Recent likes and comments rank posts, per category"""
+        liked = PostFactory(category='tech')
+        LikeFactory.create_batch(3, post=liked)
+        commented = PostFactory(category='tech')
+        CommentFactory.create_batch(2, post=commented)
+        news = PostFactory(category='news')
+        LikeFactory(post=news)
+        stale = PostFactory(category='tech')
+        LikeFactory.create_batch(5, post=stale)
+        Like.objects.filter(post=stale).update(created=timezone.now() - timedelta(days=3))
+
+        self.assertEqual(trending.compute(), 3)
+
+        response = self.client.get(reverse('app:trending'), {'category': 'tech'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['post']['id'] for item in response.json()], [commented.id, liked.id])
+        self.assertEqual([item['rank'] for item in response.json()], [1, 2])
+        response = self.client.get(reverse('app:trending'))
+        self.assertEqual({item['post']['id'] for item in response.json()}, {commented.id, liked.id, news.id})
+
+    def test_decay(self):
+        """Older posts and older likes score less"""
+        fresh = PostFactory(category='news')
+        old = PostFactory(category='news', publish_date=timezone.now() - timedelta(days=2))
+        LikeFactory(post=fresh)
+        LikeFactory(post=old)
+
+        trending.compute()
+
+        scores = dict(TrendingPost.objects.values_list('post', 'score'))
+        self.assertAlmostEqual(scores[fresh.id], 1, places=2)
+        self.assertAlmostEqual(scores[old.id], 1 / 16, places=3)
+
+    def test_served_from_cache(self):
+        """Rankings are read from the cache until recomputed"""
+        post = PostFactory()
+        LikeFactory(post=post)
+        trending.compute()
+        self.client.get(reverse('app:trending'))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('app:trending'))
+        self.assertEqual(len(response.json()), 1)
+
+        post.delete()
+        trending.compute()
+        self.assertEqual(self.client.get(reverse('app:trending')).json(), [])
+
+    def test_recomputed_elsewhere(self):
+        """A new computation replaces the cached rankings without touching the cache"""
+        first, second = PostFactory.create_batch(2)
+        LikeFactory(post=first)
+        trending.compute()
+        self.client.get(reverse('app:trending'))
+
+        Like.objects.all().delete()
+        LikeFactory(post=second)
+        trending.compute()
+
+        self.assertEqual([item['post']['id'] for item in self.client.get(reverse('app:trending')).json()], [second.id])
+
+    def test_job_reschedules_itself(self):
+        """The compute job queues the next run once"""
+        trending.schedule()
+        Job.objects.update(run_at=timezone.now())
+
+        jobs.run_next()
+
+        job = Job.objects.get()
+        self.assertEqual(job.name, 'compute_trending')
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=250))
+        self.assertIsNone(trending.schedule())
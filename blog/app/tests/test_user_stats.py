@@ -0,0 +1,142 @@
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from app import stats
+from app.models import Post, UserStats
+from app.tests.factories import (CommentFactory, LikeFactory, PostFactory,
+                                 ProfileFactory, UserFactory)
+
+GIF = b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
+
+
+class TestUserStats(APITestCase):
+    """Test the per-user counters"""
+
+    def setUp(self):
+        self.author = UserFactory()
+        self.reader = UserFactory()
+
+    def stats(self, user):
+        self.client.force_authenticate(user=user)
+        response = self.client.get(reverse('app:user'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()['stats']
+
+    def test_counts_follow_writes(self):
+        """Creating and deleting posts, comments and likes updates the counters"""
+        self.client.force_authenticate(user=self.author)
+        self.client.post(reverse('app:post-list'), {
+            'title': 'title', 'content': 'content', 'publish_date': '2023-01-01T00:00:00Z',
+            'category': 'news', 'tags': ['python'],
+        }, format='json')
+        post = Post.objects.get()
+        self.client.force_authenticate(user=self.reader)
+        self.client.post(reverse('app:comment-list'), {'post': post.id, 'text': 'text'}, format='json')
+        self.client.post(reverse('app:like-list'), {'post': post.id}, format='json')
+        comment = post.comment_set.get()
+        self.client.force_authenticate(user=self.author)
+        self.client.post(reverse('app:like-list'), {'comment': comment.id}, format='json')
+
+        self.assertEqual(self.stats(self.author), {'posts': 1, 'comments': 0, 'likes_received': 1, 'followers': 0, 'following': 0})
+        self.assertEqual(self.stats(self.reader), {'posts': 0, 'comments': 1, 'likes_received': 1, 'followers': 0, 'following': 0})
+
+        self.client.force_authenticate(user=self.author)
+        self.client.delete(reverse('app:post-detail', args=[post.id]))
+
+        self.assertEqual(self.stats(self.author), {'posts': 0, 'comments': 0, 'likes_received': 0, 'followers': 0, 'following': 0})
+        self.assertEqual(self.stats(self.reader), {'posts': 0, 'comments': 0, 'likes_received': 0, 'followers': 0, 'following': 0})
+
+    def test_deleting_likes_and_comments(self):
+        """Deleted likes and comments are counted out"""
+        comment = CommentFactory(user=self.reader)
+        like = LikeFactory(user=self.author, post=None, comment=comment)
+        UserStats.objects.create(user=self.reader, comments=1, likes_received=1)
+
+        self.client.force_authenticate(user=self.author)
+        self.client.delete(reverse('app:like-detail', args=[like.id]))
+        self.assertEqual(self.stats(self.reader), {'posts': 0, 'comments': 1, 'likes_received': 0, 'followers': 0, 'following': 0})
+
+        LikeFactory(post=None, comment=comment)
+        UserStats.objects.filter(user=self.reader).update(likes_received=1)
+        self.client.delete(reverse('app:comment-detail', args=[comment.id]))
+        self.assertEqual(self.stats(self.reader), {'posts': 0, 'comments': 0, 'likes_received': 0, 'followers': 0, 'following': 0})
+
+    def test_profile(self):
+        """The profile shows the stats of its user"""
+        ProfileFactory(user=self.author)
+        UserStats.objects.create(user=self.author, posts=2)
+        self.client.force_authenticate(user=self.author)
+
+        response = self.client.get(reverse('app:profile'))
+
+        self.assertEqual(response.json()['stats'], {'posts': 2, 'comments': 0, 'likes_received': 0, 'followers': 0, 'following': 0})
+
+    def test_create_profile(self):
+        """A profile created with its image answers with the new profile"""
+        self.client.force_authenticate(user=self.author)
+        image = SimpleUploadedFile('image.gif', GIF, content_type='image/gif')
+        with tempfile.TemporaryDirectory() as directory, override_settings(MEDIA_ROOT=directory):
+            response = self.client.post(reverse('app:profile'), {'biography': 'bio', 'profile_image': image})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['biography'], 'bio')
+        self.assertEqual(response.json()['stats']['posts'], 0)
+
+    def test_rebuild(self):
+        """The rebuild command fixes counters that drifted"""
+        post = PostFactory(author=self.author)
+        LikeFactory(post=post)
+        LikeFactory(post=None, comment=CommentFactory(user=self.author))
+        CommentFactory(user=self.reader, post=post)
+        UserStats.objects.create(user=self.author, posts=5)
+
+        output = StringIO()
+        call_command('rebuild_user_stats', batch_size=1, stdout=output)
+
+        self.assertEqual(self.stats(self.author), {'posts': 1, 'comments': 1, 'likes_received': 2, 'followers': 0, 'following': 0})
+        self.assertEqual(self.stats(self.reader)['comments'], 1)
+        self.assertIn('user stats fixed', output.getvalue())
+
+
+class TestConcurrentDeletes(TransactionTestCase):
+    """Test deletes racing for the same row"""
+
+    def test_like_counted_out_once(self):
+        """A like deleted by two requests at once is counted out once"""
+        like = LikeFactory()
+        UserStats.objects.create(user=like.post.author, likes_received=1)
+        url = reverse('app:like-detail', args=[like.id])
+        statuses = []
+
+        def delete():
+            client = APIClient()
+            client.force_authenticate(user=like.user)
+            statuses.append(client.delete(url).status_code)
+            connection.close()
+
+        other = threading.Thread(target=delete)
+        like_deleted = stats.like_deleted
+
+        def racing(like):
+            if not other.is_alive() and not statuses:
+                # The other request starts before this one commits.
+                other.start()
+                other.join(0.5)
+            like_deleted(like)
+
+        with mock.patch.object(stats, 'like_deleted', side_effect=racing):
+            delete()
+            other.join()
+
+        self.assertEqual(sorted(statuses), [status.HTTP_204_NO_CONTENT, status.HTTP_400_BAD_REQUEST])
+        self.assertEqual(UserStats.objects.get(user=like.post.author).likes_received, 0)
@@ -0,0 +1,136 @@
+"""
+Home timelines: the posts of the authors a user follows, and their own, newest first.
+
+A new post is written to the timeline of every follower by the
+``fan_out_post`` job, in one statement, so reading a timeline is a range scan
+of the ``(user, -created)`` index (fan-out on write). Authors with
+``TIMELINE_FANOUT_LIMIT`` followers or more would make that job write too
+many rows. Their latest posts are pulled into the timeline of each reader
+opening its first page instead (fan-out on read).
+
+Following someone copies their latest ``TIMELINE_BACKFILL`` posts, and
+unfollowing removes them. The ``trim_timelines`` job keeps the newest
+``TIMELINE_LENGTH`` entries of each user.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Max
+
+from app import jobs, stats
+from app.models import Follow, Post, TimelineEntry, User, UserStats
+
+FAN_OUT_SQL = """
+    INSERT INTO app_timelineentry (user_id, post_id, created)
+    SELECT follower_id, %(post)s, %(created)s FROM app_follow WHERE followed_id = %(author)s AND %(fan_out)s
+    UNION ALL
+    SELECT %(author)s, %(post)s, %(created)s
+    ON CONFLICT (user_id, post_id) DO NOTHING
+"""
+
+BACKFILL_SQL = """
+    INSERT INTO app_timelineentry (user_id, post_id, created)
+    SELECT %(user)s, id, created FROM app_post WHERE author_id = %(author)s ORDER BY created DESC LIMIT %(size)s
+    ON CONFLICT (user_id, post_id) DO NOTHING
+"""
+
+PULL_SQL = """
+    INSERT INTO app_timelineentry (user_id, post_id, created)
+    SELECT %(user)s, post.id, post.created
+    FROM app_follow follow
+    JOIN app_userstats stats ON stats.user_id = follow.followed_id AND stats.followers >= %(limit)s
+    CROSS JOIN LATERAL (
+        SELECT id, created FROM app_post WHERE author_id = follow.followed_id ORDER BY created DESC LIMIT %(size)s
+    ) post
+    WHERE follow.follower_id = %(user)s
+    ON CONFLICT (user_id, post_id) DO NOTHING
+"""
+
+TRIM_SQL = """
+    DELETE FROM app_timelineentry WHERE id IN (
+        SELECT id FROM (
+            SELECT id, row_number() OVER (PARTITION BY user_id ORDER BY created DESC, id DESC) AS position
+            FROM app_timelineentry WHERE user_id >= %s AND user_id < %s
+        ) ranked
+        WHERE position > %s
+    )
+"""
+
+
+def run(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def is_popular(user_id):
+    """Return True when the posts of ``user_id`` are fanned out on read."""
+    return UserStats.objects.filter(user=user_id, followers__gte=settings.TIMELINE_FANOUT_LIMIT).exists()
+
+
+def post_created(post):
+    """Queue the fan-out of ``post``, in the transaction creating it."""
+    jobs.enqueue('fan_out_post', {'post_id': post.id})
+
+
+def fan_out(post_id):
+    """Write ``post_id`` to the timelines of its author and, unless popular, of their followers."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        return 0
+    return run(FAN_OUT_SQL, {
+        'post': post.id, 'created': post.created, 'author': post.author_id, 'fan_out': not is_popular(post.author_id),
+    })
+
+
+def follow(follower, followed):
+    """Make ``follower`` follow ``followed``, return False when it already did."""
+    with transaction.atomic():
+        relation, created = Follow.objects.get_or_create(follower=follower, followed=followed)
+        if created:
+            stats.followed(relation)
+            run(BACKFILL_SQL, {'user': follower.id, 'author': followed.id, 'size': settings.TIMELINE_BACKFILL})
+    return created
+
+
+def unfollow(follower, followed):
+    """Stop ``follower`` following ``followed``, return False when it did not."""
+    with transaction.atomic():
+        relation = Follow.objects.select_for_update().filter(follower=follower, followed=followed).first()
+        if relation is None:
+            return False
+        stats.unfollowed(relation)
+        relation.delete()
+        TimelineEntry.objects.filter(user=follower, post__author=followed).delete()
+    return True
+
+
+def pull(user):
+    """Add the latest posts of the popular authors ``user`` follows to its timeline, return how many."""
+    return run(PULL_SQL, {'user': user.id, 'limit': settings.TIMELINE_FANOUT_LIMIT, 'size': settings.TIMELINE_BACKFILL})
+
+
+def posts(user):
+    """Return the posts of the timeline of ``user``, annotated with ``timeline_created`` to paginate on."""
+    return Post.objects.filter(timeline_entries__user=user).annotate(timeline_created=F('timeline_entries__created'))
+
+
+def trim(start, stop):
+    """Keep the newest ``TIMELINE_LENGTH`` entries of the users with ids in [start, stop), return the deleted."""
+    return run(TRIM_SQL, [start, stop, settings.TIMELINE_LENGTH])
+
+
+def trim_all(batch_size=1000):
+    last_id = User.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+    deleted = 0
+    for first in range(0, last_id + 1, batch_size):
+        with transaction.atomic():
+            deleted += trim(first, first + batch_size)
+    return deleted
+
+
+def schedule_trim():
+    """Queue the next trim in ``TIMELINE_TRIM_INTERVAL`` seconds, unless one is queued already."""
+    return jobs.enqueue('trim_timelines', {'reschedule': True},
+                        delay=timedelta(seconds=settings.TIMELINE_TRIM_INTERVAL), dedup_key='trim_timelines')
@@ -0,0 +1,117 @@
+"""
+Trending posts, recomputed into ``app_trendingpost`` and served from the cache.
+
+``compute`` ranks posts in one statement, from the likes and comments of the
+last window only, and keeps the top ``TRENDING_SIZE`` of each category.
+Each like or comment counts for its weight, halved every ``half_life`` of its
+age. The total is halved every ``post_half_life`` since the post was
+published, so older posts need more activity to stay on top. The settings are
+per category, see ``TRENDING_WINDOWS``.
+
+Cached rankings are keyed by the ``computed_at`` of the table, so every
+process moves to a new computation at once, even with a per-process cache.
+Reading a ranking is that small aggregate and one cache lookup, or one query
+on the small table.
+"""
+from datetime import timedelta
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from app import jobs
+from app.models import TrendingPost
+from app.serializers import TrendingPostSerializer
+
+COMPUTE_SQL = """
+    WITH config AS (
+        SELECT * FROM unnest(%(categories)s::text[], %(windows)s::float8[], %(half_lives)s::float8[],
+                             %(post_half_lives)s::float8[])
+        AS config (category, window_seconds, half_life, post_half_life)
+    ),
+    events AS (
+        SELECT post_id, created, %(like_weight)s::float8 AS weight
+        FROM app_like
+        WHERE post_id IS NOT NULL AND created >= %(since)s
+        UNION ALL
+        SELECT post_id, created, %(comment_weight)s::float8
+        FROM app_comment
+        WHERE created >= %(since)s
+    ),
+    scores AS (
+        SELECT p.id AS post_id, p.category,
+               sum(e.weight * power(0.5, extract(epoch FROM %(now)s - e.created)::float8 / config.half_life))
+               * power(0.5, least(
+                   extract(epoch FROM %(now)s - coalesce(p.publish_date, p.created))::float8 / config.post_half_life, 500
+               )) AS score
+        FROM events e
+        JOIN app_post p ON p.id = e.post_id
+        JOIN config ON config.category = CASE
+            WHEN p.category = ANY(%(categories)s::text[]) THEN p.category ELSE 'default'
+        END
+        WHERE e.created >= %(now)s - make_interval(secs => config.window_seconds)
+        GROUP BY p.id, p.category, config.post_half_life
+    ),
+    ranked AS (
+        SELECT post_id, category, score,
+               row_number() OVER (PARTITION BY category ORDER BY score DESC, post_id DESC) AS rank
+        FROM scores
+    )
+    INSERT INTO app_trendingpost (post_id, category, rank, score, computed_at)
+    SELECT post_id, category, rank, score, %(now)s FROM ranked WHERE rank <= %(size)s
+"""
+
+
+def cache_key(category, computed_at):
+    return f'trending:{computed_at.timestamp()}:{quote(category or "")}'
+
+
+def compute():
+    """Replace the rankings of every category, return the number of posts ranked."""
+    windows = {'default': settings.TRENDING_WINDOWS['default'], **settings.TRENDING_WINDOWS}
+    now = timezone.now()
+    params = {
+        'categories': list(windows),
+        'windows': [config['window'].total_seconds() for config in windows.values()],
+        'half_lives': [config['half_life'].total_seconds() for config in windows.values()],
+        'post_half_lives': [config['post_half_life'].total_seconds() for config in windows.values()],
+        'like_weight': settings.TRENDING_LIKE_WEIGHT,
+        'comment_weight': settings.TRENDING_COMMENT_WEIGHT,
+        'since': now - max(config['window'] for config in windows.values()),
+        'now': now,
+        'size': settings.TRENDING_SIZE,
+    }
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('DELETE FROM app_trendingpost')
+        cursor.execute(COMPUTE_SQL, params)
+        return cursor.rowcount
+
+
+def get(category=None):
+    """Return the serialized ranking of ``category``, of every category when None."""
+    computed_at = TrendingPost.objects.aggregate(computed_at=Max('computed_at'))['computed_at']
+    if computed_at is None:
+        return []
+    key = cache_key(category, computed_at)
+    ranking = cache.get(key)
+    if ranking is None:
+        posts = TrendingPost.objects.select_related('post')
+        if category:
+            posts = posts.filter(category=category).order_by('rank')
+        else:
+            posts = posts.order_by('-score')
+        posts = list(posts[:settings.TRENDING_SIZE])
+        for rank, trending_post in enumerate(posts, start=1):
+            trending_post.rank = rank
+        ranking = TrendingPostSerializer(posts, many=True).data
+        cache.set(key, ranking, settings.TRENDING_CACHE_TTL)
+    return ranking
+
+
+def schedule():
+    """Queue the next computation in ``TRENDING_INTERVAL`` seconds, unless one is queued already."""
+    return jobs.enqueue('compute_trending', {'reschedule': True}, delay=timedelta(seconds=settings.TRENDING_INTERVAL),
+                        dedup_key='compute_trending')
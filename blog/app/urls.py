@@ -1,7 +1,8 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from . import views
+from . import async_views, views
 
 app_name = 'app'
 
@@ -14,5 +15,26 @@ router.register('like', views.LikeView, basename='like')
 urlpatterns = [
     path('user/', views.UserView.as_view(), name='user'),
     path('profile/', views.ProfileView.as_view(), name='profile'),
+    path('export/<str:name>.<str:output_format>', views.ExportView.as_view(), name='export'),
+    path('trending/', views.TrendingView.as_view(), name='trending'),
+    path('user/<int:pk>/follow/', views.FollowView.as_view(), name='follow'),
+    path('timeline/', views.TimelineView.as_view(), name='timeline'),
+    path('batch/', views.BatchView.as_view(), name='batch'),
     path('', include(router.urls)),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    # Serve the hot read paths natively under ASGI, writes still go to the viewsets.
+    urlpatterns = [
+        path('post/', async_views.PostListView.as_view(
+            fallback=views.PostView.as_view({'get': 'list', 'post': 'create'})
+        ), name='post-list'),
+        path('post/<pk>/', async_views.PostDetailView.as_view(
+            fallback=views.PostView.as_view({
+                'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'
+            })
+        ), name='post-detail'),
+        path('comment/', async_views.CommentListView.as_view(
+            fallback=views.CommentView.as_view({'get': 'list', 'post': 'create'})
+        ), name='comment-list'),
+    ] + urlpatterns
@@ -1,30 +1,44 @@
-from django.contrib.auth import authenticate, logout
 from django.core.exceptions import ObjectDoesNotExist
-from drf_spectacular.utils import extend_schema
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from drf_spectacular.utils import OpenApiParameter, extend_schema
 from rest_framework import generics, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.generics import get_object_or_404
 from rest_framework.mixins import (CreateModelMixin, DestroyModelMixin,
-                                   ListModelMixin, RetrieveModelMixin,
-                                   UpdateModelMixin)
+                                   RetrieveModelMixin, UpdateModelMixin)
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet
-from rest_framework_simplejwt.token_blacklist.models import (BlacklistedToken,
-                                                             OutstandingToken)
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from app import batch, events, exports, stats, tasks, timeline, trending
+from app.expand import EXPAND_PARAMETER, ExpandMixin
+from app.fast_serializers import FastListModelMixin
 from app.models import Comment, Like, Post, Profile, User
-from app.serializers import (CommentSerializer, CreatePostSerializer,
+from app.serializers import (BatchResponseSerializer, BatchSerializer,
+                             CommentSerializer, CreatePostSerializer,
                              LikeSerializer, LoginUserSerializer,
                              PostSerializer, ProfileSerializer,
                              ShowCommentSerializer, ShowLikeSerializer,
-                             UpdateCommentSerializer, UserSerializer)
+                             TrendingPostSerializer, UpdateCommentSerializer,
+                             UserDetailSerializer, UserSerializer)
+from blog import routers
+from blog.throttling import ThrottledViewMixin
 
+WRITE_THROTTLE_SCOPES = {'create': 'write', 'update': 'write', 'partial_update': 'write', 'destroy': 'write'}
 
-class UserSessionView(viewsets.GenericViewSet):
+
+class UserSessionView(ThrottledViewMixin, viewsets.GenericViewSet):
     """Views to configure endpoints for sign up, log in and logout for users"""
     permission_classes_by_action = {'signup': [AllowAny], 'login': [AllowAny], 'logout': [IsAuthenticated]}
+    throttle_scopes = {'signup': 'signup', 'login': 'login'}
 
     @extend_schema(
         request=UserSerializer,
@@ -48,44 +62,40 @@ class UserSessionView(viewsets.GenericViewSet):
     def login(self, request):
         serializer = LoginUserSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        username = request.data.get('username')
-        password = request.data.get('password', None)
-        authenticate(username=username, password=password)
         return Response(serializer.data,
                         status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['post'])
     def logout(self, request, *args, **kwargs):
         if self.request.data.get('all'):
-            tokens = OutstandingToken.objects.filter(user=request.user)
-            for token in tokens:
-                _, _ = BlacklistedToken.objects.get_or_create(token=token)
-            logout(request)
+            # Inline, not in a job: the tokens must be unusable once we answer.
+            tasks.blacklist_user_tokens(request.user.id)
             return Response({'status': 'OK, goodbye, all refresh tokens blacklisted'}, status=status.HTTP_200_OK)
         refresh_token = self.request.data.get('refresh_token')
         token = RefreshToken(token=refresh_token)
         token.blacklist()
-        logout(request)
         return Response({'status': 'Logout'}, status=status.HTTP_200_OK)
 
 
 class UserView(generics.RetrieveUpdateDestroyAPIView):
     """Views to configure endpoints for users"""
-    serializer_class = UserSerializer
+    serializer_class = UserDetailSerializer
     permission_classes = [IsAuthenticated]
+    query_budget = {'get': 2}
 
     def get_object(self):
-        return User.objects.get(id=self.request.user.id)
+        return User.objects.select_related('stats').get(id=self.request.user.id)
 
 
 class ProfileView(generics.RetrieveUpdateDestroyAPIView, generics.CreateAPIView):
     """Views to configure endpoints for profiles"""
     serializer_class = ProfileSerializer
     permission_classes = [IsAuthenticated]
+    query_budget = {'get': 2}
 
     def get_object(self):
         try:
-            return Profile.objects.get(user=self.request.user.id)
+            return Profile.objects.select_related('user__stats').get(user=self.request.user.id)
         except ObjectDoesNotExist:
             raise ValidationError({'detail': 'No profile associated'})
 
@@ -96,13 +106,17 @@ class ProfileView(generics.RetrieveUpdateDestroyAPIView, generics.CreateAPIView)
         serializer.is_valid(raise_exception=True)
         serializer.save()
 
-        return Response(data=profile, status=status.HTTP_200_OK)
+        # Not the request data: the uploaded image cannot be rendered back.
+        return Response(data=serializer.data, status=status.HTTP_200_OK)
 
 
-class PostView(ListModelMixin, RetrieveModelMixin, CreateModelMixin, UpdateModelMixin, DestroyModelMixin, GenericViewSet):
+class PostView(ThrottledViewMixin, ExpandMixin, FastListModelMixin, RetrieveModelMixin, CreateModelMixin, UpdateModelMixin, DestroyModelMixin, GenericViewSet):
     """Views to configure endpoints for posts"""
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticated]
+    query_budget = {'list': 3, 'retrieve': 2}
+    expandable = {'author': 'author', 'author.profile': 'author__profile'}
+    throttle_scopes = WRITE_THROTTLE_SCOPES
 
     @extend_schema(
         responses=PostSerializer,
@@ -155,7 +169,8 @@ class PostView(ListModelMixin, RetrieveModelMixin, CreateModelMixin, UpdateModel
             post_id = kwargs['pk']
             post = Post.objects.get(id=post_id)
             if user == post.author:
-                Post.objects.filter(id=post_id).update(**request.data)
+                # update() skips auto_now, and incremental exports rely on modified.
+                Post.objects.filter(id=post_id).update(**{**request.data, 'modified': timezone.now()})
                 return Response(PostSerializer(Post.objects.get(id=post_id)).data, status=status.HTTP_200_OK)
             raise ValidationError({'detail': 'You cannot update someone else post'})
         except ObjectDoesNotExist:
@@ -165,19 +180,27 @@ class PostView(ListModelMixin, RetrieveModelMixin, CreateModelMixin, UpdateModel
         try:
             user = self.request.user
             post_id = kwargs['pk']
-            post = Post.objects.get(id=post_id)
-            if user == post.author:
+            with transaction.atomic():
+                # Locked, so a concurrent delete waits and finds nothing left to count out. Locking
+                # the comments too holds back the likes added meanwhile, until their deferred FK check.
+                post = Post.objects.select_for_update().get(id=post_id)
+                if user != post.author:
+                    raise ValidationError({'detail': 'You cannot delete someone else post'})
+                list(Comment.objects.filter(post=post).select_for_update().values_list('id'))
+                stats.post_deleted(post)
                 post.delete()
-                return Response(status=status.HTTP_204_NO_CONTENT)
-            raise ValidationError({'detail': 'You cannot delete someone else post'})
+            return Response(status=status.HTTP_204_NO_CONTENT)
         except ObjectDoesNotExist:
             raise ValidationError({'detail': 'No post found'})
 
 
-class CommentView(ListModelMixin, RetrieveModelMixin, CreateModelMixin, UpdateModelMixin, DestroyModelMixin, GenericViewSet):
+class CommentView(ThrottledViewMixin, ExpandMixin, FastListModelMixin, RetrieveModelMixin, CreateModelMixin, UpdateModelMixin, DestroyModelMixin, GenericViewSet):
     """Views to configure endpoints for comments"""
     serializer_class = ShowCommentSerializer
     permission_classes = [IsAuthenticated]
+    query_budget = {'list': 3, 'retrieve': 2}
+    expandable = {'user': 'user', 'user.profile': 'user__profile'}
+    throttle_scopes = WRITE_THROTTLE_SCOPES
 
     @extend_schema(
         responses=ShowCommentSerializer,
@@ -237,19 +260,25 @@ class CommentView(ListModelMixin, RetrieveModelMixin, CreateModelMixin, UpdateMo
         try:
             user = self.request.user
             comment_id = kwargs['pk']
-            comment = Comment.objects.get(id=comment_id)
-            if user == comment.user:
+            with transaction.atomic():
+                # Locked, as in PostView.destroy.
+                comment = Comment.objects.select_for_update().get(id=comment_id)
+                if user != comment.user:
+                    raise ValidationError({'detail': 'You cannot delete someone else comment'})
+                stats.comment_deleted(comment)
+                events.comment_deleted(comment)
                 comment.delete()
-                return Response(status=status.HTTP_204_NO_CONTENT)
-            raise ValidationError({'detail': 'You cannot delete someone else comment'})
+            return Response(status=status.HTTP_204_NO_CONTENT)
         except ObjectDoesNotExist:
             raise ValidationError({'detail': 'No comment found'})
 
 
-class LikeView(ListModelMixin, CreateModelMixin, DestroyModelMixin, GenericViewSet):
+class LikeView(ThrottledViewMixin, FastListModelMixin, CreateModelMixin, DestroyModelMixin, GenericViewSet):
     """Views to configure endpoints for likes"""
     serializer_class = ShowLikeSerializer
     permission_classes = [IsAuthenticated]
+    query_budget = {'list': 3}
+    throttle_scopes = WRITE_THROTTLE_SCOPES
 
     @extend_schema(
         responses=ShowLikeSerializer,
@@ -274,10 +303,115 @@ class LikeView(ListModelMixin, CreateModelMixin, DestroyModelMixin, GenericViewS
         try:
             user = self.request.user
             like_id = kwargs['pk']
-            like = Like.objects.get(id=like_id)
-            if user == like.user:
+            with transaction.atomic():
+                # Locked, as in PostView.destroy. Only the like, not the post or comment it joins.
+                like = Like.objects.select_related('post', 'comment').select_for_update(of=('self',)).get(id=like_id)
+                if user != like.user:
+                    raise ValidationError({'detail': 'You cannot delete someone else comment'})
+                stats.like_deleted(like)
+                events.like_deleted(like)
                 like.delete()
-                return Response(status=status.HTTP_204_NO_CONTENT)
-            raise ValidationError({'detail': 'You cannot delete someone else comment'})
+            return Response(status=status.HTTP_204_NO_CONTENT)
         except ObjectDoesNotExist:
             raise ValidationError({'detail': 'No comment found'})
+
+
+class ExportView(APIView):
+    """View to stream every post, comment or like as NDJSON or CSV"""
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(responses={(200, 'application/x-ndjson'): str, (200, 'text/csv'): str})
+    def get(self, request, name, output_format):
+        if name not in exports.EXPORTS or output_format not in exports.FORMATS:
+            raise NotFound()
+        since = request.query_params.get('since')
+        if since is not None:
+            since = parse_datetime(since)
+            if since is None:
+                raise ValidationError({'since': 'Enter a valid ISO 8601 date time.'})
+        # Django consumes sync iterators into a list under ASGI, give it an async one there.
+        stream = exports.astream if isinstance(request._request, ASGIRequest) else exports.stream
+        response = StreamingHttpResponse(
+            stream(name, output_format, since), content_type=exports.FORMATS[output_format]
+        )
+        response['Content-Disposition'] = f'attachment; filename="{name}.{output_format}"'
+        return response
+
+
+class TrendingView(APIView):
+    """View to list the trending posts, of one category or of all"""
+    permission_classes = [IsAuthenticated]
+    query_budget = {'get': 2}
+
+    @extend_schema(
+        parameters=[OpenApiParameter('category', str, description='Only rank the posts of this category.')],
+        responses=TrendingPostSerializer(many=True),
+    )
+    def get(self, request):
+        return Response(trending.get(request.query_params.get('category')), status=status.HTTP_200_OK)
+
+
+class FollowView(ThrottledViewMixin, APIView):
+    """View to follow and unfollow a user"""
+    permission_classes = [IsAuthenticated]
+    throttle_scopes = {'post': 'write', 'delete': 'write'}
+
+    def get_followed(self, pk):
+        followed = get_object_or_404(User, pk=pk)
+        if followed == self.request.user:
+            raise ValidationError({'detail': 'You cannot follow yourself'})
+        return followed
+
+    @extend_schema(request=None, responses=None)
+    def post(self, request, pk):
+        if timeline.follow(request.user, self.get_followed(pk)):
+            return Response({'detail': 'Followed'}, status=status.HTTP_201_CREATED)
+        return Response({'detail': 'Already followed'}, status=status.HTTP_200_OK)
+
+    @extend_schema(request=None, responses=None)
+    def delete(self, request, pk):
+        if not timeline.unfollow(request.user, self.get_followed(pk)):
+            raise ValidationError({'detail': 'You do not follow this user'})
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class TimelinePagination(CursorPagination):
+    ordering = '-timeline_created'
+
+
+class TimelineView(ExpandMixin, generics.ListAPIView):
+    """View to list the posts of the followed authors and of the user, newest first"""
+    serializer_class = PostSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = TimelinePagination
+    query_budget = {'get': 3}
+    expandable = {'author': 'author', 'author.profile': 'author__profile'}
+
+    def get_queryset(self):
+        return timeline.posts(self.request.user)
+
+    @extend_schema(parameters=[EXPAND_PARAMETER])
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        if self.paginator.cursor_query_param in request.query_params or not timeline.pull(request.user):
+            return super().list(request, *args, **kwargs)
+        # Read the pulled entries from the primary, for this request only: no pinning cookie.
+        token = routers.set_pinned(True)
+        try:
+            return super().list(request, *args, **kwargs)
+        finally:
+            routers.reset_pinned(token)
+
+
+class BatchView(APIView):
+    """View to run several API calls in one request"""
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(request=BatchSerializer, responses=BatchResponseSerializer)
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        responses = batch.execute(request, **serializer.validated_data)
+        return Response({'responses': responses}, status=status.HTTP_200_OK)
@@ -0,0 +1,266 @@
+"""
+Benchmark the /api/v1/ endpoints of sessions, users, profiles, posts,
+comments, likes, the trending posts and the timeline on a running server.
+
+Seed a dataset first (``python manage.py seed``), start the server, then:
+
+    python -m benchmarks.endpoints --url http://127.0.0.1:8000 \\
+        --username <seeded username> --password password --save-baseline baseline.json
+
+The user gets a profile if it has none. ``--writes`` adds the endpoints
+changing rows: creates, updates, deletes, profile creation and logout. Each
+delete and like gets a row of its own, ``--rows`` of them are created before
+the run, and the endpoint stops once they are used up. Logouts log in first
+and profile creations sign up a new user first, outside of the measured
+latency. Following, batches, exports, the event
+streams (see ``benchmarks.sse``) and changing or deleting the user are not
+covered.
+
+Login, signup and writes are throttled, start the server with
+``THROTTLE_ENABLED=False``. Responses other than 2xx are listed by status,
+the run then exits with status 1 and saves no baseline.
+
+Later runs given ``--baseline baseline.json`` report the endpoints whose p95
+latency grew more than ``--tolerance`` or that run more queries per request,
+and exit with status 1 when there is any regression.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import time
+import uuid
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from benchmarks.load import exchange, run_load, summarize
+
+POST = {'title': 'Benchmark', 'content': 'content', 'publish_date': None, 'category': 'news', 'tags': ['bench']}
+# A 1x1 GIF, the smallest image the profile accepts.
+GIF = (
+    b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00'
+    b',\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
+)
+
+
+def fetch_json(url, headers=None, method='GET', body=None):
+    """Return the decoded JSON body of a single request, ``body`` is sent as is when bytes."""
+    data = body if isinstance(body, bytes) else json.dumps(body).encode() if body is not None else None
+    headers = {'Content-Type': 'application/json', **(headers or {})}
+    with urlopen(Request(url, data=data, method=method, headers=headers)) as response:
+        return json.loads(response.read())
+
+
+def multipart(fields, files):
+    """Return the body and Content-Type of a form of ``fields`` and ``files``, ``{name: (filename, content)}``."""
+    boundary = uuid.uuid4().hex
+    parts = [
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        for name, value in fields.items()
+    ]
+    parts += [
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+        f'Content-Type: application/octet-stream\r\n\r\n'.encode() + content + b'\r\n'
+        for name, (filename, content) in files.items()
+    ]
+    return b''.join(parts) + f'--{boundary}--\r\n'.encode(), f'multipart/form-data; boundary={boundary}'
+
+
+def profile_form():
+    return multipart({'biography': 'Benchmark'}, {'profile_image': ('bench.gif', GIF)})
+
+
+def ensure_profile(base_url, headers):
+    """Create the profile of the user, the profile endpoints need one."""
+    try:
+        fetch_json(f'{base_url}/api/v1/profile/', headers)
+    except HTTPError as error:
+        if error.code != 400:
+            raise
+        body, content_type = profile_form()
+        fetch_json(f'{base_url}/api/v1/profile/', {**headers, 'Content-Type': content_type}, 'POST', body)
+
+
+def create_rows(base_url, headers, path, bodies, key):
+    """POST each of ``bodies`` to ``path`` and return the ids of the rows created.
+
+    Creations answer with what they were sent, so each row is found in its
+    list, newest first, by its ``key`` value.
+    """
+    ids = []
+    for body in bodies:
+        fetch_json(f'{base_url}{path}', headers, 'POST', body)
+        rows = fetch_json(f'{base_url}{path}', headers)['results']
+        ids.append(next(row['id'] for row in rows if row[key] == body[key]))
+    return ids
+
+
+def take(rows, make):
+    """Return a ``prepare`` handing each request ``make(row)`` for one of ``rows``, until there are none left."""
+    async def prepare():
+        return make(rows.pop()) if rows else None
+    return prepare
+
+
+async def log_in(base_url, credentials):
+    """Return the tokens of a new session, outside of the measured requests."""
+    status, _, content, _ = await exchange(f'{base_url}/api/v1/login/', {}, 30.0, 'POST', credentials)
+    if status != 200:
+        raise ValueError(f'login answered {status}')
+    return json.loads(content)['tokens']
+
+
+def scenarios(base_url, username, password, writes, rows):
+    """Build the ``(name, method, path, body, prepare)`` list to benchmark."""
+    login = {'username': username, 'password': password}
+    tokens = fetch_json(f'{base_url}/api/v1/login/', method='POST', body=login)['tokens']
+    headers = {'Authorization': f"Bearer {tokens['access']}"}
+    ensure_profile(base_url, headers)
+    post_id = fetch_json(f'{base_url}/api/v1/post/', headers)['results'][0]['id']
+    comment_id = fetch_json(f'{base_url}/api/v1/comment/', headers)['results'][0]['id']
+
+    items = [
+        ('health-check', 'GET', '/api/health-check/', None, None),
+        ('session-login', 'POST', '/api/v1/login/', login, None),
+        ('user', 'GET', '/api/v1/user/', None, None),
+        ('profile', 'GET', '/api/v1/profile/', None, None),
+        ('post-list', 'GET', '/api/v1/post/', None, None),
+        ('post-list-deep', 'GET', '/api/v1/post/?page=1000', None, None),
+        ('post-detail', 'GET', f'/api/v1/post/{post_id}/', None, None),
+        ('comment-list', 'GET', '/api/v1/comment/', None, None),
+        ('comment-detail', 'GET', f'/api/v1/comment/{comment_id}/', None, None),
+        ('like-list', 'GET', '/api/v1/like/', None, None),
+        ('trending', 'GET', '/api/v1/trending/', None, None),
+        ('timeline', 'GET', '/api/v1/timeline/', None, None),
+    ]
+    if writes:
+        counter = itertools.count()
+        run = int(time.time())
+
+        def posts(label):
+            return [{**POST, 'title': f'bench {run} {label} {index}'} for index in range(rows)]
+
+        own_post, = create_rows(base_url, headers, '/api/v1/post/', posts('own')[:1], 'title')
+        own_comment, = create_rows(base_url, headers, '/api/v1/comment/', [{'post': own_post, 'text': f'bench {run}'}], 'text')
+        liked = create_rows(base_url, headers, '/api/v1/post/', posts('liked'), 'title')
+        unliked = create_rows(base_url, headers, '/api/v1/post/', posts('unliked'), 'title')
+        likes = create_rows(base_url, headers, '/api/v1/like/', [{'post': post} for post in liked], 'post')
+        comments = create_rows(base_url, headers, '/api/v1/comment/', [
+            {'post': own_post, 'text': f'bench {run} {index}'} for index in range(rows)
+        ], 'text')
+        deleted = create_rows(base_url, headers, '/api/v1/post/', posts('deleted'), 'title')
+
+        async def logout():
+            refresh = (await log_in(base_url, login))['refresh']
+            return f'{base_url}/api/v1/logout/', headers, {'refresh_token': refresh}
+
+        async def new_profile():
+            # Logins take 17 characters at most.
+            username = f'bp{uuid.uuid4().hex[:15]}'
+            status, _, _, _ = await exchange(f'{base_url}/api/v1/signup/', {}, 30.0, 'POST', signup_body(username))
+            if status != 201:
+                raise ValueError(f'signup answered {status}')
+            access = (await log_in(base_url, {'username': username, 'password': 'thepassword'}))['access']
+            body, content_type = profile_form()
+            return f'{base_url}/api/v1/profile/', {'Authorization': f'Bearer {access}', 'Content-Type': content_type}, body
+
+        def url(path):
+            return lambda row: (f'{base_url}{path.format(row)}', headers, None)
+
+        items += [
+            ('session-signup', 'POST', '/api/v1/signup/', lambda: signup_body(f'bench{run}_{next(counter)}'), None),
+            ('session-logout', 'POST', '/api/v1/logout/', None, logout),
+            ('profile-create', 'POST', '/api/v1/profile/', None, new_profile),
+            ('profile-update', 'PATCH', '/api/v1/profile/', {'biography': 'Benchmark'}, None),
+            ('post-create', 'POST', '/api/v1/post/', POST, None),
+            ('post-update', 'PUT', f'/api/v1/post/{own_post}/', POST, None),
+            ('post-patch', 'PATCH', f'/api/v1/post/{own_post}/', {'title': 'Benchmark'}, None),
+            ('comment-create', 'POST', '/api/v1/comment/', {'post': post_id, 'text': 'Benchmark'}, None),
+            ('comment-update', 'PUT', f'/api/v1/comment/{own_comment}/', {'text': 'Benchmark'}, None),
+            ('comment-patch', 'PATCH', f'/api/v1/comment/{own_comment}/', {'text': 'Benchmark'}, None),
+            ('like-create', 'POST', '/api/v1/like/', None, take(
+                unliked, lambda post: (f'{base_url}/api/v1/like/', headers, {'post': post})
+            )),
+            ('like-delete', 'DELETE', '/api/v1/like/{}/', None, take(likes, url('/api/v1/like/{}/'))),
+            ('comment-delete', 'DELETE', '/api/v1/comment/{}/', None, take(comments, url('/api/v1/comment/{}/'))),
+            ('post-delete', 'DELETE', '/api/v1/post/{}/', None, take(deleted, url('/api/v1/post/{}/'))),
+        ]
+    return headers, items
+
+
+def signup_body(username):
+    return {
+        'username': username, 'email': f'{username}@example.com',
+        'first_name': 'Bench', 'last_name': 'User', 'password': 'thepassword',
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Return a description of each regression against ``baseline``."""
+    regressions = []
+    for name, row in current.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if base['p95'] and row['p95'] > base['p95'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {base['p95']:.1f}ms -> {row['p95']:.1f}ms")
+        if base.get('queries') is not None and row['queries'] is not None and row['queries'] > base['queries']:
+            regressions.append(f"{name}: queries {base['queries']:.1f} -> {row['queries']:.1f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--username', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per endpoint.')
+    parser.add_argument('--only', action='append', help='Endpoint name to run, repeatable.')
+    parser.add_argument('--writes', action='store_true', help='Also benchmark endpoints changing rows.')
+    parser.add_argument('--rows', type=int, default=100, help='Rows created for each deleting endpoint.')
+    parser.add_argument('--baseline', help='JSON results of a previous run to compare with.')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p95 growth, 0.2 is 20%%.')
+    parser.add_argument('--save-baseline', help='Write the results to this JSON file.')
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip('/')
+    headers, items = scenarios(base_url, args.username, args.password, args.writes, args.rows)
+    results = {}
+    print(f"{'endpoint':<18}{'requests':>10}{'errors':>8}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}")
+    for name, method, path, body, prepare in items:
+        if args.only and name not in args.only:
+            continue
+        row = results[name] = summarize(asyncio.run(run_load(
+            base_url + path, args.concurrency, args.duration, headers, method=method, body=body, prepare=prepare
+        )))
+        queries = f"{row['queries']:.1f}" if row['queries'] is not None else '-'
+        print(
+            f"{name:<18}{row['requests']:>10}{row['errors']:>8}{row['rps']:>9.1f}"
+            f"{row['p50']:>9.1f}{row['p95']:>9.1f}{row['p99']:>9.1f}{queries:>9}"
+        )
+
+    failed = False
+    for name, row in results.items():
+        if row['errors']:
+            failed = True
+            statuses = ', '.join(f'{count} x {status}' for status, count in sorted(row['statuses'].items()))
+            print(f'ERRORS {name}: {statuses}')
+    if failed and any('429' in row['statuses'] for row in results.values()):
+        print('Throttled: start the server with THROTTLE_ENABLED=False')
+    if args.save_baseline and not failed:
+        with open(args.save_baseline, 'w') as output:
+            json.dump(results, output, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(results, json.load(baseline), args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        failed = failed or bool(regressions)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""
+Load generator comparing the same endpoint served by different workers.
+
+Each virtual client opens its own connection, so a high ``--concurrency``
+mimics many slow mobile clients holding requests open at the same time.
+
+Example, WSGI against ASGI with the async read views enabled:
+
+    gunicorn blog.wsgi -w 4 -b 127.0.0.1:8001
+    ASYNC_READ_VIEWS=True uvicorn blog.asgi:application --workers 4 --port 8002
+    python -m benchmarks.load --path /api/v1/post/ --token <access token> \\
+        --target wsgi=http://127.0.0.1:8001 --target asgi=http://127.0.0.1:8002
+"""
+import argparse
+import asyncio
+import json
+import re
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+
+def percentile(values, pct):
+    """Return the ``pct`` percentile of ``values`` using nearest rank."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def exchange(url, headers, timeout, method='GET', body=None):
+    """Send one request and return ``(status, headers, body, elapsed seconds)``.
+
+    ``body`` is sent as JSON when given, or as is when it is bytes, with its
+    Content-Type in ``headers``.
+    """
+    parts = urlsplit(url)
+    path = parts.path + ('?' + parts.query if parts.query else '')
+    payload = body if isinstance(body, bytes) else json.dumps(body).encode() if body is not None else b''
+    start = time.perf_counter()
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(parts.hostname, parts.port or 80), timeout)
+    try:
+        lines = [f'{method} {path} HTTP/1.1', f'Host: {parts.netloc}', 'Connection: close']
+        if body is not None:
+            if not isinstance(body, bytes):
+                lines.append('Content-Type: application/json')
+            lines.append(f'Content-Length: {len(payload)}')
+        lines += [f'{name}: {value}' for name, value in headers.items()]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + payload)
+        await writer.drain()
+        raw = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+    head, _, content = raw.partition(b'\r\n\r\n')
+    head = head.decode('latin-1').split('\r\n')
+    response_headers = dict(line.split(': ', 1) for line in head[1:] if ': ' in line)
+    return int(head[0].split()[1]), response_headers, content, elapsed
+
+
+async def request(url, headers, timeout, method='GET', body=None):
+    """Send one request and return ``(status, headers, elapsed seconds)``, see ``exchange``."""
+    status, response_headers, _, elapsed = await exchange(url, headers, timeout, method, body)
+    return status, response_headers, elapsed
+
+
+async def run_load(url, concurrency=50, duration=10.0, headers=None, timeout=30.0, method='GET', body=None,
+                   prepare=None):
+    """Hit ``url`` from ``concurrency`` clients for ``duration`` seconds.
+
+    ``body`` may be a callable, called for every request, so writes do not
+    all send the same payload. ``prepare`` may be a coroutine function,
+    awaited before every request and returning its ``(url, headers, body)``,
+    or None when there is nothing left to send. Its time is not part of the
+    latencies, but it is part of the elapsed time the rps is computed over.
+    Responses other than 2xx, and requests that fail, are errors, counted by
+    status or exception name in ``statuses``.
+    """
+    headers = headers or {}
+    deadline = time.perf_counter() + duration
+    results = {'latencies': [], 'errors': 0, 'statuses': Counter(), 'responses': []}
+
+    async def client():
+        while time.perf_counter() < deadline:
+            try:
+                if prepare is None:
+                    target, target_headers, payload = url, headers, body() if callable(body) else body
+                elif (prepared := await prepare()) is None:
+                    return
+                else:
+                    target, target_headers, payload = prepared
+                status, response_headers, elapsed = await request(target, target_headers, timeout, method, payload)
+            except (OSError, asyncio.TimeoutError, ValueError, IndexError) as error:
+                results['errors'] += 1
+                results['statuses'][type(error).__name__] += 1
+                continue
+            if not 200 <= status < 300:
+                results['errors'] += 1
+                results['statuses'][str(status)] += 1
+                continue
+            results['latencies'].append(elapsed)
+            results['responses'].append(response_headers)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    results['elapsed'] = time.perf_counter() - start
+    return results
+
+
+def queries(response_headers):
+    """Return the query count reported in the ``Server-Timing`` header."""
+    match = re.search(r'desc="(\d+) queries"', response_headers.get('Server-Timing', ''))
+    return int(match.group(1)) if match else None
+
+
+def summarize(results):
+    latencies = results['latencies']
+    counts = [count for count in map(queries, results['responses']) if count is not None]
+    return {
+        'queries': sum(counts) / len(counts) if counts else None,
+        'requests': len(latencies),
+        'errors': results['errors'],
+        'statuses': dict(results['statuses']),
+        'rps': len(latencies) / results['elapsed'] if results['elapsed'] else 0.0,
+        'p50': percentile(latencies, 50) * 1000,
+        'p95': percentile(latencies, 95) * 1000,
+        'p99': percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', action='append', required=True, help='name=base_url, repeatable')
+    parser.add_argument('--path', default='/api/v1/post/')
+    parser.add_argument('--token', help='JWT access token sent as bearer')
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=15.0)
+    args = parser.parse_args()
+
+    headers = {'Authorization': f'Bearer {args.token}'} if args.token else {}
+    print(f"{'target':<10}{'requests':>10}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for target in args.target:
+        name, base_url = target.split('=', 1)
+        results = asyncio.run(run_load(base_url.rstrip('/') + args.path, args.concurrency, args.duration, headers))
+        row = summarize(results)
+        print(
+            f"{name:<10}{row['requests']:>10}{row['errors']:>8}{row['rps']:>10.1f}"
+            f"{row['p50']:>10.1f}{row['p95']:>10.1f}{row['p99']:>10.1f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Cost of recording metrics, per call and per request.
+
+    python -m benchmarks.metrics --requests 5000
+
+Times ``metrics.record_request`` on its own, then requests through a WSGI
+handler with and without ``MetricsMiddleware``.
+"""
+import argparse
+import os
+import statistics
+import time
+from io import BytesIO
+
+from benchmarks.middleware import measure
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--path', default='/api/health-check/')
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--calls', type=int, default=200000)
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blog.settings')
+    import django
+    django.setup()
+
+    from django.conf import settings
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.test.utils import override_settings
+
+    from blog import metrics
+
+    start = time.perf_counter()
+    for index in range(args.calls):
+        metrics.record_request('app:post-list', 'GET', 200, index % 100 / 1000, index % 7, 0.001)
+    per_call = (time.perf_counter() - start) / args.calls
+    print(f'record_request: {per_call * 1e9:.0f}ns per call')
+
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': args.path, 'SERVER_NAME': '127.0.0.1', 'SERVER_PORT': '80',
+        'HTTP_HOST': '127.0.0.1', 'wsgi.url_scheme': 'http', 'wsgi.errors': BytesIO(),
+    }
+    without = [path for path in settings.MIDDLEWARE if path != 'blog.middleware.MetricsMiddleware']
+    results = {}
+    for name, middleware in (('without', without), ('with', settings.MIDDLEWARE)):
+        with override_settings(MIDDLEWARE=middleware):
+            handler = WSGIHandler()
+            measure(handler, environ, min(200, args.requests))
+            results[name] = statistics.median(measure(handler, environ, args.requests))
+    print(f"request without metrics: {results['without'] * 1e6:.0f}us")
+    print(f"request with metrics: {results['with'] * 1e6:.0f}us")
+    print(f"overhead: {(results['with'] - results['without']) * 1e6:.1f}us per request")
+
+
+if __name__ == '__main__':
+    main()
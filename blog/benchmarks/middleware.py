@@ -0,0 +1,82 @@
+"""
+Per-request cost of the middleware stack, measured in-process.
+
+Sends requests straight to a WSGI handler built with each stack, no server
+or network involved, and reports the time per request:
+
+    python -m benchmarks.middleware --path /api/v1/post/ --requests 2000
+
+``none`` runs no middleware at all, ``legacy`` is the stack every request
+used to go through and ``current`` is ``settings.MIDDLEWARE``.
+"""
+import argparse
+import os
+import statistics
+import time
+from io import BytesIO
+
+LEGACY_MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'blog.middleware.ReplicaPinningMiddleware',
+    'blog.middleware.QueryInstrumentationMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+
+def measure(handler, environ, requests):
+    """Return the seconds taken by each of ``requests`` requests."""
+    timings = []
+    for _ in range(requests):
+        request_environ = {**environ, 'wsgi.input': BytesIO()}
+        start = time.perf_counter()
+        b''.join(handler(request_environ, lambda status, headers: None))
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--path', default='/api/health-check/')
+    parser.add_argument('--token', help='JWT access token sent as bearer')
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blog.settings')
+    import django
+    django.setup()
+
+    from django.conf import settings
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.test.utils import override_settings
+
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': args.path, 'SERVER_NAME': '127.0.0.1', 'SERVER_PORT': '80',
+        'HTTP_HOST': '127.0.0.1', 'wsgi.url_scheme': 'http', 'wsgi.errors': BytesIO(),
+    }
+    if args.token:
+        environ['HTTP_AUTHORIZATION'] = f'Bearer {args.token}'
+
+    stacks = {'none': [], 'legacy': LEGACY_MIDDLEWARE, 'current': settings.MIDDLEWARE}
+    results = {}
+    for name, middleware in stacks.items():
+        with override_settings(MIDDLEWARE=middleware):
+            handler = WSGIHandler()
+            measure(handler, environ, min(200, args.requests))
+            results[name] = measure(handler, environ, args.requests)
+
+    baseline = statistics.median(results['none'])
+    print(f"{'stack':<10}{'p50 us':>10}{'p95 us':>10}{'overhead us':>14}")
+    for name, timings in results.items():
+        timings.sort()
+        p50 = statistics.median(timings)
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        print(f'{name:<10}{p50 * 1e6:>10.0f}{p95 * 1e6:>10.0f}{(p50 - baseline) * 1e6:>14.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Rows per second of the list serializers, DRF against the fast row converters.
+
+    python -m benchmarks.serializers --rows 100000
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+
+def measure(function, rows):
+    start = time.perf_counter()
+    function()
+    return rows / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50000)
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blog.settings')
+    import django
+    django.setup()
+
+    from app.fast_serializers import get_row_converter
+    from app.models import Comment, Like, Post
+    from app.serializers import (PostSerializer, ShowCommentSerializer,
+                                 ShowLikeSerializer)
+
+    now = datetime.now(timezone.utc)
+    cases = {
+        PostSerializer: [
+            Post(id=i, author_id=i % 100, title=f'Post {i}', content='lorem ipsum', category='news',
+                 publish_date=now - timedelta(seconds=i), tags=['python', 'django'])
+            for i in range(args.rows)
+        ],
+        ShowCommentSerializer: [Comment(id=i, user_id=i % 100, post_id=i, text='nice') for i in range(args.rows)],
+        ShowLikeSerializer: [Like(id=i, user_id=i % 100, post_id=i, comment_id=None) for i in range(args.rows)],
+    }
+    print(f"{'serializer':<24}{'DRF rows/s':>14}{'fast rows/s':>14}{'speedup':>10}")
+    for serializer_class, instances in cases.items():
+        converter = get_row_converter(serializer_class)
+        rows = [tuple(getattr(instance, column) for column in converter.columns) for instance in instances]
+        slow = measure(lambda: serializer_class(instances, many=True).data, args.rows)
+        fast = measure(lambda: converter(rows), args.rows)
+        print(f'{serializer_class.__name__:<24}{slow:>14,.0f}{fast:>14,.0f}{fast / slow:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Soak test of the live event streams of a running ASGI worker.
+
+Opens ``--connections`` idle streams on one post, keeps them for
+``--duration`` seconds while posting ``--events`` comments through the API,
+and reports how long each comment took to reach every stream, the streams
+lost and the memory the worker gained (``--pid``, read from /proc).
+
+    EVENTS_BACKEND=postgres uvicorn blog.asgi:application --workers 1 --port 8002
+    ulimit -n 20000
+    python -m benchmarks.sse --url http://127.0.0.1:8002 --username <seeded username> \\
+        --password password --connections 5000 --pid <worker pid>
+"""
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+from benchmarks.endpoints import fetch_json
+from benchmarks.load import percentile
+
+
+def rss(pid):
+    """Return the resident memory of ``pid`` in MiB, None when unknown."""
+    if not pid:
+        return None
+    with open(f'/proc/{pid}/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+class Stream:
+    """One idle event stream, recording when each comment reaches it."""
+
+    def __init__(self):
+        self.received = {}
+        self.opened = asyncio.Event()
+        self.lost = False
+
+    async def run(self, url, headers, timeout):
+        parts = urlsplit(url)
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(parts.hostname, parts.port or 80), timeout)
+            lines = [f'GET {parts.path} HTTP/1.1', f'Host: {parts.netloc}', 'Accept: text/event-stream']
+            lines += [f'{name}: {value}' for name, value in headers.items()]
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode())
+            await writer.drain()
+            status_line = await asyncio.wait_for(reader.readline(), timeout)
+            if b' 200 ' not in status_line:
+                raise ValueError(status_line)
+            self.opened.set()
+            while line := await reader.readline():
+                if line.startswith(b'data: '):
+                    # Chunked transfer framing aside, every data line is one event.
+                    self.received.setdefault(json.loads(line[6:]).get('text'), time.perf_counter())
+        except (OSError, asyncio.TimeoutError, ValueError):
+            pass
+        self.lost = True
+        self.opened.set()
+
+
+async def soak(base_url, username, password, connections, events, duration, timeout, pid):
+    login = {'username': username, 'password': password}
+    tokens = fetch_json(f'{base_url}/api/v1/login/', method='POST', body=login)['tokens']
+    headers = {'Authorization': f"Bearer {tokens['access']}"}
+    post_id = fetch_json(f'{base_url}/api/v1/post/', headers)['results'][0]['id']
+
+    memory_before = rss(pid)
+    streams = [Stream() for _ in range(connections)]
+    tasks = [asyncio.ensure_future(stream.run(f'{base_url}/api/v1/post/{post_id}/events/', headers, timeout))
+             for stream in streams]
+    start = time.perf_counter()
+    await asyncio.gather(*(stream.opened.wait() for stream in streams))
+    print(f'opened {sum(not stream.lost for stream in streams)}/{connections} streams '
+          f'in {time.perf_counter() - start:.1f}s')
+    memory_open = rss(pid)
+
+    latencies = []
+    interval = duration / max(events, 1)
+    loop = asyncio.get_running_loop()
+    for index in range(events):
+        await asyncio.sleep(interval)
+        # The create answer has no id, events are told apart by their text.
+        text = f'soak {start} {index}'
+        sent = time.perf_counter()
+        await loop.run_in_executor(None, lambda: fetch_json(
+            f'{base_url}/api/v1/comment/', headers, method='POST', body={'post': post_id, 'text': text},
+        ))
+        deadline = time.perf_counter() + timeout
+        alive = [stream for stream in streams if not stream.lost]
+        while time.perf_counter() < deadline and not all(text in stream.received for stream in alive):
+            await asyncio.sleep(0.01)
+        latencies += [stream.received[text] - sent for stream in alive if text in stream.received]
+
+    for task in tasks:
+        task.cancel()
+    return {
+        'lost': sum(stream.lost for stream in streams),
+        'delivered': len(latencies),
+        'expected': events * connections,
+        'p50': percentile(latencies, 50) * 1000,
+        'p99': percentile(latencies, 99) * 1000,
+        'max': max(latencies, default=0) * 1000,
+        'memory': (memory_open - memory_before) if memory_before is not None else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--username', required=True)
+    parser.add_argument('--password', default='password')
+    parser.add_argument('--connections', type=int, default=2000)
+    parser.add_argument('--events', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=60.0)
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--pid', type=int, help='worker process to read the memory of')
+    args = parser.parse_args()
+
+    row = asyncio.run(soak(
+        args.url.rstrip('/'), args.username, args.password, args.connections, args.events,
+        args.duration, args.timeout, args.pid,
+    ))
+    print(f"delivered {row['delivered']}/{row['expected']} events, {row['lost']} streams lost")
+    print(f"latency p50 {row['p50']:.1f} ms, p99 {row['p99']:.1f} ms, max {row['max']:.1f} ms")
+    if row['memory'] is not None:
+        print(f"worker memory +{row['memory']:.1f} MiB, {row['memory'] * 1024 / args.connections:.1f} KiB per stream")
+
+
+if __name__ == '__main__':
+    main()
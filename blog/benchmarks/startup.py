@@ -0,0 +1,110 @@
+"""
+Cold start of a worker: time to first response and import time breakdown.
+
+Each run starts a fresh interpreter that loads ``blog.wsgi`` and answers one
+request, the way a new worker does after a deploy or a scale out:
+
+    python -m benchmarks.startup --profile full --profile api --save-baseline startup.json
+
+Later runs given ``--baseline startup.json`` exit with status 1 when the
+95th percentile of the time to first response of a profile grew more than
+``--tolerance``, the median is only reported.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from benchmarks.endpoints import compare
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_REQUEST = """
+import sys
+from wsgiref.util import setup_testing_defaults
+
+from blog.wsgi import application
+
+environ = {'PATH_INFO': sys.argv[1], 'HTTP_HOST': '127.0.0.1'}
+setup_testing_defaults(environ)
+statuses = []
+b''.join(application(environ, lambda status, headers: statuses.append(status)))
+print(statuses[0], flush=True)
+"""
+
+
+def first_response(profile, path, importtime=False):
+    """Return ``(seconds until the first response, stderr)`` of a new worker."""
+    env = {**os.environ, 'APP_PROFILE': profile, 'DJANGO_SETTINGS_MODULE': 'blog.settings'}
+    command = [sys.executable, *(['-X', 'importtime'] if importtime else []), '-c', FIRST_REQUEST, path]
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        command, cwd=PROJECT_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    status = process.stdout.readline()
+    elapsed = time.perf_counter() - start
+    _, stderr = process.communicate()
+    if not status:
+        raise RuntimeError(f'{profile} worker failed:\n{stderr}')
+    return elapsed, stderr
+
+
+def import_times(stderr):
+    """Return the self import time in microseconds per top-level package."""
+    totals = Counter()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_time, _, name = line[len('import time:'):].split('|')
+        totals[name.strip().split('.')[0]] += int(self_time)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profile', action='append', help='APP_PROFILE to start, repeatable.')
+    parser.add_argument('--path', default='/api/health-check/', help='Path of the first request.')
+    parser.add_argument('--runs', type=int, default=5, help='Workers started per profile, at least 2.')
+    parser.add_argument('--top', type=int, default=10, help='Packages shown in the import breakdown.')
+    parser.add_argument('--baseline', help='JSON results of a previous run to compare with.')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed growth, 0.2 is 20%%.')
+    parser.add_argument('--save-baseline', help='Write the results to this JSON file.')
+    args = parser.parse_args()
+    if args.runs < 2:
+        parser.error('--runs must be at least 2 to compute a percentile')
+
+    results = {}
+    for profile in args.profile or ['full', 'api']:
+        timings = [first_response(profile, args.path)[0] * 1000 for _ in range(args.runs)]
+        _, stderr = first_response(profile, args.path, importtime=True)
+        packages = import_times(stderr)
+        results[profile] = {
+            'p50': statistics.median(timings),
+            'p95': statistics.quantiles(timings, n=20)[-1],
+            'imports': sum(packages.values()) / 1000,
+        }
+        print(
+            f"{profile}: first response {results[profile]['p50']:.0f}ms median, "
+            f"{results[profile]['p95']:.0f}ms p95, imports {results[profile]['imports']:.0f}ms"
+        )
+        for name, self_time in packages.most_common(args.top):
+            print(f'    {name:<32}{self_time / 1000:>8.1f}ms')
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as output:
+            json.dump(results, output, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(results, json.load(baseline), args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,7 @@
 ASGI config for blog project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The live event streams of app/events.py are answered before Django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
@@ -13,4 +14,8 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blog.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from app import events  # noqa: E402 (needs the apps loaded)
+
+application = events.route(django_application)
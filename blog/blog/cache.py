@@ -0,0 +1,41 @@
+"""
+Cache backends counting their hits and misses in ``blog.metrics``.
+"""
+from django.core.cache.backends import locmem, redis
+
+from blog import metrics
+
+_missing = object()
+
+
+class MetricsMixin:
+    """Count the lookups of ``get``, labelled ``METRICS_NAME``.
+
+    ``BaseCache.get_many`` goes through ``get``, backends with their own
+    ``get_many`` count it too.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(location, params)
+        self.metrics_name = params.get('METRICS_NAME', 'default')
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        if value is _missing:
+            metrics.record_cache(self.metrics_name, 0, 1)
+            return default
+        metrics.record_cache(self.metrics_name, 1, 0)
+        return value
+
+
+class LocMemCache(MetricsMixin, locmem.LocMemCache):
+    pass
+
+
+class RedisCache(MetricsMixin, redis.RedisCache):
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        values = super().get_many(keys, version)
+        metrics.record_cache(self.metrics_name, len(values), len(keys) - len(values))
+        return values
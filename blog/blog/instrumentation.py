@@ -0,0 +1,56 @@
+"""
+Per-request SQL statistics collected through ``connection.execute_wrapper``.
+"""
+import time
+from collections import Counter
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A view ran more queries than its declared ``query_budget``."""
+
+
+class QueryStats:
+    """Count and time the queries of one request.
+
+    Queries are grouped by SQL text, which Django keeps parametrized, so the
+    same statement run once per row of a page shows up as a repeated pattern
+    (N+1). Exact duplicates also compare the parameters.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.patterns = Counter()
+        self.duplicates = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.patterns[sql] += 1
+            self.duplicates[(sql, repr(params))] += 1
+
+    def repeated(self, threshold):
+        """Return the SQL patterns run at least ``threshold`` times."""
+        return {sql: count for sql, count in self.patterns.items() if count >= threshold}
+
+    def duplicated(self):
+        """Return how many queries were exact repeats of an earlier one."""
+        return sum(count - 1 for count in self.duplicates.values())
+
+
+def get_query_budget(view_func, method):
+    """Return the ``query_budget`` declared on the view for this method.
+
+    The budget is either a number or a dict keyed by action on viewsets and
+    by lowercase method name on other views.
+    """
+    view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    budget = getattr(view_class, 'query_budget', None)
+    if isinstance(budget, dict):
+        actions = getattr(view_func, 'actions', None)
+        return budget.get(actions.get(method.lower()) if actions else method.lower())
+    return budget
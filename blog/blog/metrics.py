@@ -0,0 +1,218 @@
+"""
+Request, database and cache metrics in the Prometheus text format.
+
+Each process records into its own in-memory ``Registry``. With
+``METRICS_DIR`` set, a background thread writes it every
+``METRICS_FLUSH_INTERVAL`` seconds to ``<METRICS_DIR>/metrics-<pid>.json``
+and the scrape endpoint adds up the files of every worker. Counters and
+histograms of exited workers are kept, gauges only count live ones, so the
+directory must be emptied when the server starts.
+
+The endpoint is only served to ``Authorization: Bearer <METRICS_TOKEN>``.
+"""
+import atexit
+import glob
+import hmac
+import json
+import os
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+HELP = {
+    'http_requests_total': 'Requests by route, method and status code.',
+    'http_request_duration_seconds': 'Time spent answering requests.',
+    'http_requests_in_flight': 'Requests being answered.',
+    'db_queries_per_request': 'SQL queries run by one request.',
+    'db_duration_seconds': 'Time spent in SQL by one request.',
+    'cache_requests_total': 'Cache lookups by cache and result.',
+}
+
+
+class Registry:
+    """Counters, gauges and histograms of one process, keyed by name and labels."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.gauges = defaultdict(float)
+        self.histograms = {}
+
+    def inc(self, name, labels, value=1):
+        with self.lock:
+            self.counters[name, labels] += value
+
+    def add(self, name, labels, value):
+        with self.lock:
+            self.gauges[name, labels] += value
+
+    def observe(self, name, labels, value, buckets):
+        with self.lock:
+            histogram = self.histograms.get((name, labels))
+            if histogram is None:
+                histogram = self.histograms[name, labels] = {'buckets': buckets, 'counts': [0] * (len(buckets) + 1), 'sum': 0.0}
+            histogram['counts'][bisect_left(buckets, value)] += 1
+            histogram['sum'] += value
+
+    def dump(self):
+        """Return the metrics as JSON serializable data."""
+        with self.lock:
+            return {
+                'counters': [[name, labels, value] for (name, labels), value in self.counters.items()],
+                'gauges': [[name, labels, value] for (name, labels), value in self.gauges.items()],
+                'histograms': [[name, labels, dict(histogram, counts=list(histogram['counts']))]
+                               for (name, labels), histogram in self.histograms.items()],
+            }
+
+
+registry = Registry()
+_flusher = None
+_flusher_lock = threading.Lock()
+
+
+def record_request(route, method, status, duration, queries=None, db_duration=None):
+    """Record one answered request, ``queries`` and ``db_duration`` when instrumented."""
+    registry.inc('http_requests_total', (('route', route), ('method', method), ('status', str(status))))
+    registry.observe('http_request_duration_seconds', (('route', route), ('method', method)), duration, LATENCY_BUCKETS)
+    if queries is not None:
+        registry.observe('db_queries_per_request', (('route', route),), queries, QUERY_BUCKETS)
+        registry.observe('db_duration_seconds', (('route', route),), db_duration, LATENCY_BUCKETS)
+    if settings.METRICS_DIR:
+        start_flusher()
+
+
+def record_in_flight(value):
+    registry.add('http_requests_in_flight', (), value)
+
+
+def record_cache(cache, hits, misses):
+    if hits:
+        registry.inc('cache_requests_total', (('cache', cache), ('result', 'hit')), hits)
+    if misses:
+        registry.inc('cache_requests_total', (('cache', cache), ('result', 'miss')), misses)
+
+
+def flush():
+    """Write the metrics of this process to ``METRICS_DIR``."""
+    path = os.path.join(settings.METRICS_DIR, f'metrics-{os.getpid()}.json')
+    with open(f'{path}.tmp', 'w') as output:
+        json.dump(registry.dump(), output)
+    os.replace(f'{path}.tmp', path)
+
+
+def _flush_forever(event):
+    while not event.wait(settings.METRICS_FLUSH_INTERVAL):
+        flush()
+
+
+def start_flusher():
+    global _flusher
+    if _flusher is None:
+        with _flusher_lock:
+            if _flusher is None:
+                os.makedirs(settings.METRICS_DIR, exist_ok=True)
+                _flusher = threading.Thread(target=_flush_forever, args=(threading.Event(),), daemon=True)
+                _flusher.start()
+                atexit.register(flush)
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect():
+    """Return the metrics of every worker added up, as ``Registry.dump`` does."""
+    if not settings.METRICS_DIR:
+        return registry.dump()
+    flush()
+    total = Registry()
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, 'metrics-*.json')):
+        pid = int(os.path.basename(path)[len('metrics-'):-len('.json')])
+        try:
+            with open(path) as metrics_file:
+                data = json.load(metrics_file)
+        except (OSError, ValueError):
+            continue
+        for name, labels, value in data['counters']:
+            total.counters[name, tuple(map(tuple, labels))] += value
+        if is_alive(pid):
+            for name, labels, value in data['gauges']:
+                total.gauges[name, tuple(map(tuple, labels))] += value
+        for name, labels, histogram in data['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            merged = total.histograms.setdefault(
+                key, {'buckets': histogram['buckets'], 'counts': [0] * len(histogram['counts']), 'sum': 0.0}
+            )
+            merged['counts'] = [a + b for a, b in zip(merged['counts'], histogram['counts'])]
+            merged['sum'] += histogram['sum']
+    return total.dump()
+
+
+def format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def format_labels(labels, **extra):
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def exposition(data):
+    """Render ``collect()`` data in the Prometheus text format."""
+    samples = defaultdict(list)
+    types = {}
+    for name, labels, value in sorted(data['counters']):
+        types[name] = 'counter'
+        samples[name].append(f'{name}{format_labels(labels)} {format_value(value)}')
+    for name, labels, value in sorted(data['gauges']):
+        types[name] = 'gauge'
+        samples[name].append(f'{name}{format_labels(labels)} {format_value(value)}')
+    for name, labels, histogram in sorted(data['histograms'], key=lambda item: item[:2]):
+        types[name] = 'histogram'
+        cumulative = 0
+        for bound, count in zip([*histogram['buckets'], '+Inf'], histogram['counts']):
+            cumulative += count
+            samples[name].append(f'{name}_bucket{format_labels(labels, le=bound)} {cumulative}')
+        samples[name].append(f'{name}_sum{format_labels(labels)} {format_value(histogram["sum"])}')
+        samples[name].append(f'{name}_count{format_labels(labels)} {cumulative}')
+    lines = []
+    for name in sorted(samples):
+        lines += [f'# HELP {name} {HELP.get(name, name)}', f'# TYPE {name} {types[name]}', *samples[name]]
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """Scrape endpoint in the Prometheus text format, not found without ``METRICS_TOKEN``."""
+    if not settings.METRICS_TOKEN:
+        raise Http404
+    credentials = request.headers.get('Authorization', '').encode()
+    if not hmac.compare_digest(credentials, f'Bearer {settings.METRICS_TOKEN}'.encode()):
+        response = HttpResponse(status=401)
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+    return HttpResponse(exposition(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def _after_fork():
+    global registry, _flusher
+    registry = Registry()
+    _flusher = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
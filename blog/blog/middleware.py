@@ -0,0 +1,229 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import (iscoroutinefunction, markcoroutinefunction,
+                          sync_to_async)
+from django.conf import settings
+from django.db import connections
+from django.utils.module_loading import import_string
+
+from blog import metrics, routers
+from blog.instrumentation import (QueryBudgetExceeded, QueryStats,
+                                  get_query_budget)
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class AsyncCapableMiddleware:
+    """Base of middleware running in the mode of the handler.
+
+    Under ASGI the chain then stays async down to the async views, instead of
+    running in a thread with every async view wrapped in ``async_to_sync``.
+    Subclasses implement ``__call__``, which returns a coroutine when
+    ``is_async``, usually from their ``__acall__``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    """Record the latency, status and SQL of each request in ``blog.metrics``.
+
+    Comes first in ``MIDDLEWARE`` so the timing covers the other middleware
+    and ``request.query_stats`` is complete when it is read.
+    """
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        metrics.record_in_flight(1)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.record_in_flight(-1)
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        metrics.record_in_flight(1)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.record_in_flight(-1)
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, elapsed):
+        match = request.resolver_match
+        stats = getattr(request, 'query_stats', None)
+        metrics.record_request(
+            match.view_name if match else '<unmatched>', request.method, response.status_code, elapsed,
+            stats.count if stats else None, stats.duration if stats else None,
+        )
+
+
+class ReplicaPinningMiddleware(AsyncCapableMiddleware):
+    """Keep a client's reads on the primary for a while after it writes.
+
+    Unsafe requests are pinned to the primary for their whole duration and
+    answer with a short lived cookie, the client's following requests are
+    pinned as long as the cookie is sent back.
+    """
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = routers.set_pinned(self.is_pinned(request))
+        try:
+            response = self.get_response(request)
+            wrote = self.wrote(request)
+        finally:
+            routers.reset_pinned(token)
+        return self.set_cookie(response, wrote)
+
+    async def __acall__(self, request):
+        # Pins set by sync code run through sync_to_async come back to this context.
+        token = routers.set_pinned(self.is_pinned(request))
+        try:
+            response = await self.get_response(request)
+            wrote = self.wrote(request)
+        finally:
+            routers.reset_pinned(token)
+        return self.set_cookie(response, wrote)
+
+    def is_pinned(self, request):
+        return request.method not in SAFE_METHODS or settings.REPLICA_PIN_COOKIE in request.COOKIES
+
+    def wrote(self, request):
+        cookie = settings.REPLICA_PIN_COOKIE
+        return request.method not in SAFE_METHODS or (routers.is_pinned() and cookie not in request.COOKIES)
+
+    def set_cookie(self, response, wrote):
+        if wrote:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax'
+            )
+        return response
+
+
+class QueryInstrumentationMiddleware(AsyncCapableMiddleware):
+    """Record the SQL run by each request.
+
+    The statistics are kept on ``request.query_stats``, sent back in a
+    ``Server-Timing`` header and logged as JSON. Requests with repeated query
+    patterns (N+1) or over the view's ``query_budget`` are logged as warnings
+    and, with ``QUERY_BUDGET_ENFORCE``, going over budget raises.
+    """
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats = request.query_stats = QueryStats()
+        request.query_budget = None
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            self.wrap_connections(stack, stats)
+            response = self.get_response(request)
+        return self.finish(request, response, stats, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        stats = request.query_stats = QueryStats()
+        request.query_budget = None
+        start = time.perf_counter()
+        stack = ExitStack()
+        # Connections are per thread: wrap those of the thread the request's
+        # sync code and async ORM calls run in, not the event loop's.
+        await sync_to_async(self.wrap_connections)(stack, stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.finish(request, response, stats, time.perf_counter() - start)
+
+    def wrap_connections(self, stack, stats):
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(stats))
+
+    def finish(self, request, response, stats, elapsed):
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"',
+            f'app;dur={(elapsed - stats.duration) * 1000:.1f}',
+            f'total;dur={elapsed * 1000:.1f}',
+        ])
+        self.report(request, response, stats, elapsed)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_query_budget(view_func, request.method)
+
+    def report(self, request, response, stats, elapsed):
+        match = request.resolver_match
+        repeated = stats.repeated(settings.QUERY_N_PLUS_ONE_THRESHOLD)
+        over_budget = request.query_budget is not None and stats.count > request.query_budget
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'route': match.view_name if match else None,
+            'status': response.status_code,
+            'queries': stats.count,
+            'duplicated_queries': stats.duplicated(),
+            'db_ms': round(stats.duration * 1000, 2),
+            'total_ms': round(elapsed * 1000, 2),
+            'query_budget': request.query_budget,
+            'repeated_queries': repeated,
+        }
+        logger.log(logging.WARNING if repeated or over_budget else logging.DEBUG, json.dumps(record))
+        if over_budget and settings.QUERY_BUDGET_ENFORCE:
+            raise QueryBudgetExceeded(
+                f'{record["route"]} ran {stats.count} queries, its budget is {request.query_budget}'
+            )
+
+
+class StatefulPathsMiddleware(AsyncCapableMiddleware):
+    """Run ``STATEFUL_MIDDLEWARE`` only under ``STATEFUL_PATH_PREFIXES``.
+
+    The API authenticates with JWT and needs no session, CSRF token or
+    messages, so only the admin goes through those middleware. Their
+    ``process_view`` hooks are called from this middleware's own.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.view_hooks = []
+        handler = get_response
+        for path in reversed(settings.STATEFUL_MIDDLEWARE):
+            middleware = import_string(path)(handler)
+            if hasattr(middleware, 'process_view'):
+                self.view_hooks.insert(0, middleware.process_view)
+            handler = middleware
+        self.stateful_response = handler
+
+    def is_stateful(self, request):
+        return request.path_info.startswith(tuple(settings.STATEFUL_PATH_PREFIXES))
+
+    def __call__(self, request):
+        # Django's middleware adapt to the mode of the handler they wrap, so
+        # the stateful chain is async when this middleware is.
+        if self.is_stateful(request):
+            return self.stateful_response(request)
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self.is_stateful(request):
+            for hook in self.view_hooks:
+                response = hook(request, view_func, view_args, view_kwargs)
+                if response is not None:
+                    return response
+        return None
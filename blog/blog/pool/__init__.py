@@ -0,0 +1,259 @@
+"""
+Process wide connection pool used by the ``blog.pool`` database backend.
+
+Pools are created lazily, one per database alias and connection target, and
+are dropped in forked children so a worker never reuses a socket it
+inherited from its parent.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """No connection could be checked out before the timeout."""
+
+
+class ConnectionPool:
+    """Thread safe pool of DB-API connections.
+
+    ``connect`` opens a new connection, ``check`` pings a connection that has
+    been idle for more than ``check_interval`` seconds and raises when it is
+    dead. Pings run outside the lock, so a hung connection only holds up its
+    own checkout. Connections older than ``max_lifetime`` or idle for more
+    than ``max_idle`` seconds are closed instead of being handed out, except
+    the ``min_size`` connections kept warm. These are opened by a background
+    thread after the first checkout.
+    """
+
+    def __init__(self, connect, check=None, min_size=0, max_size=10, timeout=30.0,
+                 max_lifetime=3600.0, max_idle=600.0, check_interval=1.0):
+        self.connect = connect
+        self.check = check
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.check_interval = check_interval
+        self.pid = os.getpid()
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._created = {}
+        self._size = 0
+        self._waiting = 0
+        self._filling = False
+        self._checkouts = 0
+        self._timeouts = 0
+        self._failed_checks = 0
+        self._checkout_time_total = 0.0
+        self._checkout_time_max = 0.0
+
+    def getconn(self):
+        """Check a connection out, opening a new one when none is idle."""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        while True:
+            connection, stale = self._reserve(deadline)
+            if connection is None:
+                connection = self._open()
+                break
+            if not stale or self._ping(connection):
+                break
+
+        elapsed = time.monotonic() - start
+        with self._cond:
+            self._checkouts += 1
+            self._checkout_time_total += elapsed
+            self._checkout_time_max = max(self._checkout_time_max, elapsed)
+            if self._size < self.min_size and not self._filling:
+                self._filling = True
+                threading.Thread(target=self._fill, name='pool-fill', daemon=True).start()
+        return connection
+
+    def putconn(self, connection, discard=False):
+        """Return a connection, closing it when it is broken or expired."""
+        if not discard:
+            discard = not self._reset(connection) or self._expired(connection, time.monotonic(), 0)
+        if discard:
+            self._discard(connection)
+            return
+        with self._cond:
+            self._idle.append((connection, time.monotonic()))
+            self._cond.notify()
+
+    def close(self):
+        """Close every idle connection, checked out ones are closed on return."""
+        with self._cond:
+            idle, self._idle = self._idle, deque()
+        for connection, _ in idle:
+            self._discard(connection)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'waiting': self._waiting,
+                'max_size': self.max_size,
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'failed_checks': self._failed_checks,
+                'checkout_time_avg_ms': (
+                    self._checkout_time_total / self._checkouts * 1000 if self._checkouts else 0.0
+                ),
+                'checkout_time_max_ms': self._checkout_time_max * 1000,
+            }
+
+    def _reserve(self, deadline):
+        """Return ``(idle connection, needs a ping)``, or ``(None, False)`` with a slot taken to open one."""
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    idle = self._pop_idle()
+                    if idle is not None:
+                        return idle
+                    if self._size < self.max_size:
+                        self._size += 1
+                        return None, False
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(f'No connection available after {self.timeout}s')
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+    def _open(self):
+        """Open a connection in a slot already taken, freeing it on failure."""
+        try:
+            connection = self.connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        self._created[id(connection)] = time.monotonic()
+        return connection
+
+    def _ping(self, connection):
+        """Check a connection taken from the idle ones, closing it when dead."""
+        try:
+            self.check(connection)
+        except Exception:
+            with self._cond:
+                self._failed_checks += 1
+                self._close(connection)
+            return False
+        return True
+
+    def _fill(self):
+        """Open connections until there are ``min_size``, stopping at the first failure."""
+        try:
+            while True:
+                with self._cond:
+                    if self._size >= self.min_size:
+                        return
+                    self._size += 1
+                self.putconn(self._open())
+        except Exception:
+            pass
+        finally:
+            with self._cond:
+                self._filling = False
+
+    def _pop_idle(self):
+        """Return ``(connection, needs a ping)`` for the most recently used idle connection, if any.
+
+        Must be called with the condition held. Expired connections are
+        closed on the way.
+        """
+        now = time.monotonic()
+        while self._idle:
+            connection, returned_at = self._idle.pop()
+            if self._expired(connection, now, now - returned_at):
+                self._close(connection)
+                continue
+            return connection, self.check is not None and now - returned_at >= self.check_interval
+        return None
+
+    def _expired(self, connection, now, idle_for):
+        if getattr(connection, 'closed', False):
+            return True
+        if now - self._created.get(id(connection), now) >= self.max_lifetime:
+            return True
+        return idle_for >= self.max_idle and self._size > self.min_size
+
+    def _reset(self, connection):
+        """Roll back whatever the borrower left open, False if that failed."""
+        if getattr(connection, 'closed', False):
+            return False
+        try:
+            if not getattr(connection, 'autocommit', True):
+                connection.rollback()
+        except Exception:
+            return False
+        return True
+
+    def _close(self, connection):
+        """Close a connection and free its slot, with the condition held."""
+        self._size -= 1
+        self._created.pop(id(connection), None)
+        try:
+            connection.close()
+        except Exception:
+            pass
+        self._cond.notify()
+
+    def _discard(self, connection):
+        with self._cond:
+            self._close(connection)
+
+
+_pools = {}
+_lock = threading.Lock()
+# Pools inherited through fork() are kept referenced, never closed: closing
+# them would terminate the sessions the parent process is still using.
+_inherited = []
+
+
+def get_pool(key, factory):
+    """Return the pool registered for ``key``, creating it with ``factory``."""
+    pool = _pools.get(key)
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+    with _lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            if pool is not None:
+                _inherited.append(pool)
+            pool = _pools[key] = factory()
+        return pool
+
+
+def close_pools(alias=None):
+    """Close the idle connections of every pool, or only those of ``alias``."""
+    for key, pool in list(_pools.items()):
+        if alias is None or key[0] == alias:
+            pool.close()
+
+
+def stats():
+    """Return the statistics of the pools owned by this process, by alias."""
+    return {
+        key[0]: pool.stats() for key, pool in list(_pools.items()) if pool.pid == os.getpid()
+    }
+
+
+def _after_fork():
+    with _lock:
+        _inherited.extend(_pools.values())
+        _pools.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
@@ -0,0 +1,60 @@
+"""
+PostgreSQL backend handing out connections from ``blog.pool``.
+
+Configure it per alias with ``'ENGINE': 'blog.pool'`` and an optional
+``POOL`` dict (``MIN_SIZE``, ``MAX_SIZE``, ``TIMEOUT``, ``MAX_LIFETIME``,
+``MAX_IDLE``, ``CHECK_INTERVAL``). Keep ``CONN_MAX_AGE`` at 0 so Django gives
+the connection back to the pool at the end of every request.
+"""
+from django.db.backends.postgresql import base, creation
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+from blog.pool import ConnectionPool, close_pools, get_pool
+
+
+def ping(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections would block the DROP DATABASE.
+        close_pools(self.connection.alias)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def get_pool(self, conn_params):
+        key = (self.alias,) + tuple(sorted((k, str(v)) for k, v in conn_params.items()))
+        options = self.settings_dict.get('POOL', {})
+
+        def factory():
+            return ConnectionPool(
+                connect=lambda: base.DatabaseWrapper.get_new_connection(self, conn_params),
+                check=ping,
+                min_size=options.get('MIN_SIZE', 0),
+                max_size=options.get('MAX_SIZE', 10),
+                timeout=options.get('TIMEOUT', 30.0),
+                max_lifetime=options.get('MAX_LIFETIME', 3600.0),
+                max_idle=options.get('MAX_IDLE', 600.0),
+                check_interval=options.get('CHECK_INTERVAL', 1.0),
+            )
+        return get_pool(key, factory)
+
+    def get_new_connection(self, conn_params):
+        self._pool = self.get_pool(conn_params)
+        connection = self._pool.getconn()
+        # The parent sets this while connecting, pooled connections skip it.
+        self.isolation_level = IsolationLevel(
+            self.settings_dict['OPTIONS'].get('isolation_level', IsolationLevel.READ_COMMITTED)
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self._pool.putconn(self.connection)
@@ -0,0 +1,85 @@
+"""
+Database router sending reads to the replicas listed in ``DATABASE_REPLICAS``.
+
+Reads stay on ``default`` while the current request is pinned to the primary
+(see ``blog.middleware.ReplicaPinningMiddleware``) and replicas lagging more
+than ``REPLICA_MAX_LAG`` seconds behind are skipped.
+"""
+import contextvars
+import random
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+_pinned = contextvars.ContextVar('pinned_to_primary', default=False)
+_lag_cache = {}
+
+LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+
+def pin_to_primary():
+    """Send every following read of the current request to the primary."""
+    _pinned.set(True)
+
+
+def set_pinned(value):
+    """Pin or unpin the current context, returns a token for ``reset_pinned``."""
+    return _pinned.set(value)
+
+
+def reset_pinned(token):
+    _pinned.reset(token)
+
+
+def is_pinned():
+    return _pinned.get()
+
+
+def replica_lag(alias):
+    """Return the replication lag of ``alias`` in seconds, None if unreachable.
+
+    The value is cached for ``REPLICA_LAG_CHECK_INTERVAL`` seconds.
+    """
+    now = time.monotonic()
+    cached = _lag_cache.get(alias)
+    if cached is not None and now - cached[0] < settings.REPLICA_LAG_CHECK_INTERVAL:
+        return cached[1]
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            lag = cursor.fetchone()[0]
+        lag = float(lag or 0)
+    except DatabaseError:
+        lag = None
+    _lag_cache[alias] = (now, lag)
+    return lag
+
+
+class ReplicaRouter:
+    """Route reads to healthy replicas and everything else to the primary."""
+
+    def db_for_read(self, model, **hints):
+        if is_pinned():
+            return 'default'
+        replicas = [
+            alias for alias in settings.DATABASE_REPLICAS
+            if (lag := replica_lag(alias)) is not None and lag <= settings.REPLICA_MAX_LAG
+        ]
+        return random.choice(replicas) if replicas else 'default'
+
+    def db_for_write(self, model, **hints):
+        # Whatever the request reads after writing must see the write.
+        pin_to_primary()
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
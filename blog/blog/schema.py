@@ -0,0 +1,109 @@
+"""
+OpenAPI schema served from memory.
+
+The schema only changes on deploy, so it is generated once per process, or
+read from the file written at build time by
+``python manage.py spectacular --file``, and each rendering is kept with its
+gzip copy and ETag. Clients revalidating with ``If-None-Match`` get a 304.
+Only the versions of ``ALLOWED_VERSIONS`` and the languages of ``LANGUAGES``
+are kept, other ``?version=`` and ``?lang=`` values are rendered per request.
+"""
+import gzip
+import hashlib
+import json
+import threading
+
+import yaml
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils import translation
+from django.utils.cache import patch_vary_headers
+from drf_spectacular.views import SpectacularAPIView
+from rest_framework.settings import api_settings
+
+_lock = threading.Lock()
+_renderings = {}
+
+
+class Rendering:
+    """A rendered schema with its compressed copy and ETag."""
+
+    def __init__(self, content, content_type, filename):
+        self.content = content
+        self.compressed = gzip.compress(content)
+        self.content_type = content_type
+        self.filename = filename
+        self.etag = '"%s"' % hashlib.sha256(content).hexdigest()[:32]
+
+
+def load_schema_file(path):
+    """Return the schema stored at ``path`` as written by ``spectacular --file``."""
+    with open(path, encoding='utf-8') as schema_file:
+        if path.endswith('.json'):
+            return json.load(schema_file)
+        return yaml.safe_load(schema_file)
+
+
+def cacheable(version, language):
+    """Whether the rendering of ``version`` in ``language`` is kept, from a bounded set."""
+    versions = api_settings.ALLOWED_VERSIONS or ()
+    languages = {settings.LANGUAGE_CODE, *(code for code, name in settings.LANGUAGES)}
+    return (version is None or version in versions) and (language is None or language in languages)
+
+
+def clear():
+    """Forget the renderings, e.g. after the schema file changed."""
+    with _lock:
+        _renderings.clear()
+
+
+class CachedSpectacularAPIView(SpectacularAPIView):
+    """``SpectacularAPIView`` generating the schema once per process."""
+
+    def _get_schema_response(self, request):
+        if not self.serve_public:
+            # The schema depends on the user's permissions.
+            return super()._get_schema_response(request)
+        version = self.api_version or request.version or self._get_version_parameter(request)
+        language = translation.get_language()
+        if not cacheable(version, language):
+            return self.respond(request, self.render_schema(request, version))
+        key = (request.accepted_renderer.format, request.accepted_media_type, version, language)
+        rendering = _renderings.get(key)
+        if rendering is None:
+            with _lock:
+                rendering = _renderings.get(key)
+                if rendering is None:
+                    rendering = _renderings[key] = self.render_schema(request, version)
+        return self.respond(request, rendering)
+
+    def get_schema(self, request, version):
+        path = getattr(settings, 'SPECTACULAR_SCHEMA_FILE', None)
+        if path and version is None and not request.GET.get('lang'):
+            return load_schema_file(path)
+        generator = self.generator_class(urlconf=self.urlconf, api_version=version, patterns=self.patterns)
+        return generator.get_schema(request=request, public=self.serve_public)
+
+    def render_schema(self, request, version):
+        renderer = request.accepted_renderer
+        content = renderer.render(
+            self.get_schema(request, version), request.accepted_media_type, self.get_renderer_context()
+        )
+        content_type = request.accepted_media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        return Rendering(content, content_type, self._get_filename(request, version))
+
+    def respond(self, request, rendering):
+        if rendering.etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+        elif 'gzip' in request.headers.get('Accept-Encoding', ''):
+            response = HttpResponse(rendering.compressed, content_type=rendering.content_type)
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(rendering.content, content_type=rendering.content_type)
+        response['ETag'] = rendering.etag
+        response['Cache-Control'] = 'no-cache'
+        response['Content-Disposition'] = f'inline; filename="{rendering.filename}"'
+        patch_vary_headers(response, ['Accept', 'Accept-Encoding'])
+        return response
@@ -52,15 +52,34 @@ INSTALLED_APPS = [
     'app',
 ]
 
+# `api` leaves the admin, the schema docs and the dev tools out of API-only
+# workers, which then boot faster. Run `manage.py` with the default profile.
+APP_PROFILE = os.environ.get('APP_PROFILE', 'full')
+if APP_PROFILE == 'api':
+    INSTALLED_APPS = [
+        app for app in INSTALLED_APPS if app not in ('django.contrib.admin', 'django_extensions', 'drf_spectacular')
+    ]
+
 MIDDLEWARE = [
+    'blog.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'blog.middleware.ReplicaPinningMiddleware',
+    'blog.middleware.QueryInstrumentationMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'blog.middleware.StatefulPathsMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+# The API is stateless, sessions, CSRF and messages are only for the admin.
+STATEFUL_PATH_PREFIXES = ['/admin/']
+STATEFUL_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
+# The admin checks only look for these in MIDDLEWARE.
+SILENCED_SYSTEM_CHECKS = ['admin.E408', 'admin.E409', 'admin.E410']
 
 ROOT_URLCONF = 'blog.urls'
 
@@ -82,21 +101,163 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'blog.wsgi.application'
 
+ASGI_APPLICATION = 'blog.asgi.application'
+
+# Serve post list/retrieve and comment list with native async views.
+# Enable it on ASGI workers only, under WSGI every request would spin up an event loop.
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS', 'False') == 'True'
+
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# DB_POOL=True hands connections out of the in-process pool in blog/pool, in
+# that case Django must give them back after each request (CONN_MAX_AGE 0).
+# Otherwise connections are kept open per worker thread for CONN_MAX_AGE seconds.
+DB_POOL = os.environ.get('DB_POOL', 'False') == 'True'
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql_psycopg2',
+        'ENGINE': 'blog.pool' if DB_POOL else 'django.db.backends.postgresql_psycopg2',
         'NAME': os.environ.get('DB_NAME'), 
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASSWORD'),
         'HOST': os.environ.get('DB_HOST'), 
         'PORT': os.environ.get('DB_PORT'),
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get('CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5))},
+        'POOL': {
+            'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            'MAX_LIFETIME': float(os.environ.get('DB_POOL_MAX_LIFETIME', 3600)),
+            'MAX_IDLE': float(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+            'CHECK_INTERVAL': float(os.environ.get('DB_POOL_CHECK_INTERVAL', 1)),
+        },
     }
 }
 
+# Read replicas, DB_REPLICA_HOSTS is a comma separated list of host[:port].
+# Safe requests read from a replica unless the client wrote in the last
+# REPLICA_PIN_SECONDS or every replica lags more than REPLICA_MAX_LAG seconds.
+DATABASE_REPLICAS = []
+for index, replica in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))):
+    host, _, port = replica.partition(':')
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['blog.routers.ReplicaRouter']
+REPLICA_PIN_COOKIE = 'primary_pin'
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+REPLICA_MAX_LAG = float(os.environ.get('REPLICA_MAX_LAG', 10))
+REPLICA_LAG_CHECK_INTERVAL = 5
+
+# SQL instrumentation, a pattern run this many times in one request is
+# reported as an N+1. With QUERY_BUDGET_ENFORCE a view going over its
+# query_budget raises, the test suite turns it on (see conftest.py).
+QUERY_N_PLUS_ONE_THRESHOLD = 5
+QUERY_BUDGET_ENFORCE = os.environ.get('QUERY_BUDGET_ENFORCE', 'False') == 'True'
+
+# A Redis cache shares the throttle buckets between workers. The backends of
+# blog.cache count hits and misses for the metrics.
+CACHES = {
+    'default': {
+        'BACKEND': 'blog.cache.LocMemCache',
+    }
+}
+if os.environ.get('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'blog.cache.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+
+# Metrics scraped from /api/metrics/ with the METRICS_TOKEN bearer token, not
+# served without one. With several worker processes, set METRICS_DIR to a
+# directory emptied when the server starts.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+METRICS_DIR = os.environ.get('METRICS_DIR') or None
+METRICS_FLUSH_INTERVAL = 1
+
+# Readiness probes give up after READINESS_PROBE_TIMEOUT seconds and their
+# result is reused for READINESS_PROBE_TTL seconds.
+READINESS_PROBE_TIMEOUT = float(os.environ.get('READINESS_PROBE_TIMEOUT', 1))
+READINESS_PROBE_TTL = float(os.environ.get('READINESS_PROBE_TTL', 2))
+
+# Admin changelists count rows exactly up to ADMIN_EXACT_COUNT_LIMIT and use
+# the planner's estimate above. Filter choices are cached for
+# ADMIN_FILTER_CHOICES_TTL seconds.
+ADMIN_EXACT_COUNT_LIMIT = int(os.environ.get('ADMIN_EXACT_COUNT_LIMIT', 10000))
+ADMIN_FILTER_CHOICES_TTL = int(os.environ.get('ADMIN_FILTER_CHOICES_TTL', 600))
+
+# Trending posts (app/trending.py): the top TRENDING_SIZE posts of every
+# category are recomputed every TRENDING_INTERVAL seconds. Likes and comments
+# count for their weight, halved every 'half_life', and only within 'window';
+# the total is halved every 'post_half_life' of the post's age. Categories
+# missing from TRENDING_WINDOWS use 'default'.
+TRENDING_SIZE = int(os.environ.get('TRENDING_SIZE', 50))
+TRENDING_INTERVAL = int(os.environ.get('TRENDING_INTERVAL', 300))
+TRENDING_CACHE_TTL = int(os.environ.get('TRENDING_CACHE_TTL', 60))
+TRENDING_LIKE_WEIGHT = 1.0
+TRENDING_COMMENT_WEIGHT = 2.0
+TRENDING_WINDOWS = {
+    'default': {'window': timedelta(days=2), 'half_life': timedelta(hours=6), 'post_half_life': timedelta(days=1)},
+    'news': {'window': timedelta(days=1), 'half_life': timedelta(hours=3), 'post_half_life': timedelta(hours=12)},
+}
+
+# /api/v1/batch/ takes up to BATCH_MAX_REQUESTS sub-requests and runs
+# parallel reads on up to BATCH_MAX_WORKERS threads, each with its own
+# database connection.
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', 20))
+BATCH_MAX_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS', 4))
+
+# Live events of /api/v1/post/<id>/events/ (app/events.py): EVENTS_BACKEND
+# 'local' only reaches the streams of the same process, 'postgres' goes through
+# LISTEN/NOTIFY to every worker. Idle streams get a comment every
+# EVENTS_HEARTBEAT seconds. A stream falling EVENTS_QUEUE_SIZE events behind is
+# closed, and a reconnecting client gets up to EVENTS_REPLAY_LIMIT missed ones,
+# plus those created EVENTS_REPLAY_MARGIN seconds before its last, in case they
+# committed late.
+EVENTS_BACKEND = os.environ.get('EVENTS_BACKEND', 'local')
+EVENTS_HEARTBEAT = float(os.environ.get('EVENTS_HEARTBEAT', 15))
+EVENTS_QUEUE_SIZE = int(os.environ.get('EVENTS_QUEUE_SIZE', 100))
+EVENTS_REPLAY_LIMIT = int(os.environ.get('EVENTS_REPLAY_LIMIT', 500))
+EVENTS_REPLAY_MARGIN = float(os.environ.get('EVENTS_REPLAY_MARGIN', 5))
+
+# Home timelines (app/timeline.py): a new post is written to the timeline of
+# every follower of its author, unless they have TIMELINE_FANOUT_LIMIT
+# followers or more, then their posts are pulled when a reader opens the first
+# page. Following someone adds their latest TIMELINE_BACKFILL posts. Every
+# TIMELINE_TRIM_INTERVAL seconds timelines are trimmed to TIMELINE_LENGTH posts.
+TIMELINE_LENGTH = int(os.environ.get('TIMELINE_LENGTH', 800))
+TIMELINE_FANOUT_LIMIT = int(os.environ.get('TIMELINE_FANOUT_LIMIT', 10000))
+TIMELINE_BACKFILL = int(os.environ.get('TIMELINE_BACKFILL', 50))
+TIMELINE_TRIM_INTERVAL = int(os.environ.get('TIMELINE_TRIM_INTERVAL', 3600))
+
+# Background jobs (app/jobs.py): failed jobs are retried after
+# JOB_RETRY_BASE_DELAY seconds, doubling up to JOB_RETRY_MAX_DELAY, and jobs
+# running for more than JOB_TIMEOUT seconds are handed to another worker.
+JOB_RETRY_BASE_DELAY = float(os.environ.get('JOB_RETRY_BASE_DELAY', 5))
+JOB_RETRY_MAX_DELAY = float(os.environ.get('JOB_RETRY_MAX_DELAY', 3600))
+JOB_TIMEOUT = float(os.environ.get('JOB_TIMEOUT', 600))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'blog': {'handlers': ['console'], 'level': os.environ.get('LOG_LEVEL', 'WARNING')},
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -124,8 +285,24 @@ REST_FRAMEWORK = {
     'EXCEPTION_HANDLER': 'drf_standardized_errors.handler.exception_handler',
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+    ),
+    # Token buckets of blog.throttling, '<scope>.<ip|user|username>': '<capacity>/<period>'.
+    'DEFAULT_THROTTLE_RATES': {
+        'login.ip': '10/min',
+        'login.username': '20/hour',
+        'signup.ip': '20/hour',
+        'write.ip': '300/min',
+        'write.user': '60/min',
+    },
+    # Reverse proxies in front of the app. Client IPs are read from their
+    # X-Forwarded-For entries, or REMOTE_ADDR with none.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
 }
+if APP_PROFILE == 'api':
+    # Schemas are not served, don't import drf_spectacular's inspector.
+    REST_FRAMEWORK['DEFAULT_SCHEMA_CLASS'] = 'rest_framework.schemas.inspectors.ViewInspector'
+# The token buckets of blog.throttling. Only turn them off on servers under a load test.
+THROTTLE_ENABLED = os.environ.get('THROTTLE_ENABLED', 'True') == 'True'
 
 SPECTACULAR_SETTINGS = {
     "TITLE": "BLOG API",
@@ -146,6 +323,9 @@ SPECTACULAR_SETTINGS = {
     "COMPONENT_SPLIT_REQUEST": True,
 }
 
+# Written at build time by `manage.py spectacular --format openapi-json --file <path>`.
+SPECTACULAR_SCHEMA_FILE = os.environ.get('SPECTACULAR_SCHEMA_FILE') or None
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
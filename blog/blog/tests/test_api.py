@@ -1,11 +1,18 @@
 """
 Tests for the health check API.
 """
-from django.test import TestCase
+import threading
+import time
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from blog import utils
+
 
 class HealthCheckTests(TestCase):
     """Test the health check API."""
@@ -17,3 +24,54 @@ class HealthCheckTests(TestCase):
         res = client.get(url)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class ReadinessTests(TestCase):
+    """Test the readiness API."""
+
+    def setUp(self):
+        patcher = mock.patch.object(utils, '_readiness', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.url = reverse('readiness')
+
+    def test_ready(self):
+        """The database is probed and its latency reported."""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.data['ready'])
+        self.assertTrue(res.data['probes']['database:default']['ok'])
+        self.assertIn('latency_ms', res.data['probes']['database:default'])
+
+    def test_probes_are_cached(self):
+        """Requests within the TTL reuse the last probe."""
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(READINESS_PROBE_TTL=0)
+    def test_not_ready(self):
+        """A failing database makes the worker unready."""
+        with mock.patch.object(utils, 'probe_database', side_effect=OperationalError('timeout')):
+            res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(res.data['ready'])
+        self.assertEqual(res.data['probes']['database:default']['error'], 'OperationalError: timeout')
+
+    @override_settings(READINESS_PROBE_TIMEOUT=0.1, READINESS_PROBE_TTL=0)
+    def test_probe_deadline(self):
+        """A database that does not answer, even to connect, fails the probe in time."""
+        hung = threading.Event()
+        self.addCleanup(hung.set)
+        start = time.monotonic()
+        with mock.patch.object(utils, 'probe_database', side_effect=lambda alias: hung.wait(5)):
+            res = self.client.get(self.url)
+
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res.data['probes']['database:default']['error'], 'TimeoutError: no answer in 0.1s')
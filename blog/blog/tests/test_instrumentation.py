@@ -0,0 +1,64 @@
+"""
+Tests for the per-request SQL instrumentation.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from app.models import Post
+from app.tests.factories import UserFactory
+from app.views import PostView
+from blog.instrumentation import QueryBudgetExceeded
+from blog.middleware import QueryInstrumentationMiddleware
+
+
+class QueryInstrumentationTests(TestCase):
+    """Test the query statistics reported for each request."""
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.post = Post.objects.create(author=self.user, title='title', category='news', tags=[])
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_server_timing_header(self):
+        """Responses carry the query count and DB time."""
+        response = self.client.get(reverse('app:post-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('queries"', response['Server-Timing'])
+        self.assertEqual(response.wsgi_request.query_stats.count, 2)
+        self.assertEqual(response.wsgi_request.query_budget, 3)
+
+    async def test_async_requests(self):
+        """Under ASGI, the queries the view runs in its thread are counted."""
+        tokens = await sync_to_async(self.user.tokens)()
+        headers = {'Authorization': f"Bearer {tokens['access']}"}
+        response = await self.async_client.get(reverse('app:post-list'), headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.asgi_request.query_stats.count, 3)
+        self.assertIn('desc="3 queries"', response['Server-Timing'])
+
+    def test_repeated_queries_are_logged(self):
+        """A query pattern repeated past the threshold is reported as N+1."""
+        def view(request):
+            for post_id in range(3):
+                Post.objects.filter(id=post_id).exists()
+            return HttpResponse()
+
+        middleware = QueryInstrumentationMiddleware(view)
+        with self.assertLogs('blog.middleware', level='WARNING') as logs:
+            with self.settings(QUERY_N_PLUS_ONE_THRESHOLD=3):
+                middleware(RequestFactory().get('/'))
+        self.assertIn('"repeated_queries": {"SELECT', logs.output[0])
+
+    @override_settings(QUERY_BUDGET_ENFORCE=True)
+    def test_budget_is_enforced(self):
+        """Going over the declared budget raises when enforced."""
+        budget = PostView.query_budget
+        PostView.query_budget = {'list': 1}
+        self.addCleanup(setattr, PostView, 'query_budget', budget)
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('app:post-list'))
@@ -0,0 +1,102 @@
+"""
+Tests for the metrics and their scrape endpoint.
+"""
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from app.models import Post
+from app.tests.factories import UserFactory
+from blog import metrics
+from blog.cache import LocMemCache
+
+
+@override_settings(METRICS_TOKEN='secret')
+class MetricsTests(TestCase):
+    """Test what is recorded and how it is exposed."""
+
+    def setUp(self):
+        patcher = mock.patch.object(metrics, 'registry', metrics.Registry())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer secret')
+
+    def test_requests(self):
+        """Requests are counted by route and status, with their SQL."""
+        user = UserFactory()
+        Post.objects.create(author=user, title='title', category='news', tags=[])
+        self.client.force_authenticate(user=user)
+        self.client.get(reverse('app:post-list'))
+        self.client.get('/api/v1/post/0/')
+
+        text = self.client.get(reverse('metrics')).content.decode()
+
+        self.assertIn('http_requests_total{route="app:post-list",method="GET",status="200"} 1\n', text)
+        self.assertIn('http_requests_total{route="app:post-detail",method="GET",status="404"} 1\n', text)
+        self.assertIn('http_request_duration_seconds_bucket{route="app:post-list",method="GET",le="+Inf"} 1\n', text)
+        self.assertIn('db_queries_per_request_bucket{route="app:post-list",le="2"} 1\n', text)
+        self.assertIn('db_queries_per_request_bucket{route="app:post-list",le="1"} 0\n', text)
+        self.assertIn('http_requests_in_flight 1\n', text)
+        self.assertIn('# TYPE db_duration_seconds histogram\n', text)
+
+    def test_cache(self):
+        """The cache backends count their hits and misses."""
+        cache = LocMemCache('metrics-test', {'METRICS_NAME': 'test'})
+        cache.set('a', 1)
+        cache.get('a')
+        cache.get('b')
+        self.assertEqual(cache.get_many(['a', 'b', 'c']), {'a': 1})
+
+        text = metrics.exposition(metrics.collect())
+
+        self.assertIn('cache_requests_total{cache="test",result="hit"} 2\n', text)
+        self.assertIn('cache_requests_total{cache="test",result="miss"} 3\n', text)
+
+    def test_processes_are_added_up(self):
+        """Every worker's file counts, the gauges of exited ones do not."""
+        metrics.record_request('app:post-list', 'GET', 200, 0.02, 2, 0.001)
+        metrics.record_in_flight(1)
+        exited = {
+            'counters': [['http_requests_total', [['route', 'app:post-list'], ['method', 'GET'], ['status', '200']], 4]],
+            'gauges': [['http_requests_in_flight', [], 3]],
+            'histograms': [['http_request_duration_seconds', [['route', 'app:post-list'], ['method', 'GET']], {
+                'buckets': list(metrics.LATENCY_BUCKETS), 'counts': [4] + [0] * len(metrics.LATENCY_BUCKETS), 'sum': 0.004,
+            }]],
+        }
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            with open(os.path.join(directory, 'metrics-999999999.json'), 'w') as metrics_file:
+                json.dump(exited, metrics_file)
+            text = metrics.exposition(metrics.collect())
+
+        self.assertIn('http_requests_total{route="app:post-list",method="GET",status="200"} 5\n', text)
+        self.assertIn('http_requests_in_flight 1\n', text)
+        self.assertIn('http_request_duration_seconds_bucket{route="app:post-list",method="GET",le="0.005"} 4\n', text)
+        self.assertIn('http_request_duration_seconds_bucket{route="app:post-list",method="GET",le="0.025"} 5\n', text)
+        self.assertIn('http_request_duration_seconds_count{route="app:post-list",method="GET"} 5\n', text)
+
+    def test_endpoint(self):
+        """The scrape endpoint answers in the text format."""
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+
+    def test_token(self):
+        """Scrapes without the token are refused, and nothing is served without a token set."""
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer wrong')
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response['WWW-Authenticate'], 'Bearer')
+        self.client.credentials()
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        with override_settings(METRICS_TOKEN=None):
+            self.client.credentials(HTTP_AUTHORIZATION='Bearer None')
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_404_NOT_FOUND)
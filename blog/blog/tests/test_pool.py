@@ -0,0 +1,144 @@
+"""
+Tests for the database connection pool.
+"""
+import threading
+import time
+
+from django.db import connections
+from django.test import SimpleTestCase, TestCase
+
+from blog.pool import ConnectionPool, PoolTimeout, get_pool
+from blog.pool.base import DatabaseWrapper
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.autocommit = True
+        self.rollbacks = 0
+
+    def close(self):
+        self.closed = True
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test the pool bookkeeping with fake connections."""
+
+    def test_reuses_returned_connections(self):
+        """A returned connection is handed out again."""
+        pool = ConnectionPool(FakeConnection, max_size=2)
+        connection = pool.getconn()
+        pool.putconn(connection)
+        self.assertIs(pool.getconn(), connection)
+        self.assertEqual(pool.stats()['size'], 1)
+        self.assertEqual(pool.stats()['checkouts'], 2)
+
+    def test_timeout_when_exhausted(self):
+        """Checking out more than max_size connections times out."""
+        pool = ConnectionPool(FakeConnection, max_size=1, timeout=0.05)
+        pool.getconn()
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waiter_gets_returned_connection(self):
+        """A blocked checkout is served as soon as a connection is returned."""
+        pool = ConnectionPool(FakeConnection, max_size=1, timeout=5)
+        connection = pool.getconn()
+        threading.Timer(0.05, pool.putconn, [connection]).start()
+        self.assertIs(pool.getconn(), connection)
+
+    def test_failed_health_check_is_replaced(self):
+        """Connections failing the checkout ping are closed and replaced."""
+        def check(connection):
+            raise OSError('server closed the connection')
+
+        pool = ConnectionPool(FakeConnection, check=check, check_interval=0)
+        connection = pool.getconn()
+        pool.putconn(connection)
+        replacement = pool.getconn()
+        self.assertIsNot(replacement, connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()['failed_checks'], 1)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_hung_check_blocks_nobody_else(self):
+        """A checkout stuck pinging its connection leaves the pool usable."""
+        pinging, release = threading.Event(), threading.Event()
+
+        def check(connection):
+            pinging.set()
+            release.wait(5)
+
+        pool = ConnectionPool(FakeConnection, check=check, check_interval=0, timeout=1)
+        pool.putconn(pool.getconn())
+        stuck = threading.Thread(target=pool.getconn)
+        stuck.start()
+        self.addCleanup(stuck.join)
+        self.addCleanup(release.set)
+        pinging.wait(5)
+
+        start = time.monotonic()
+        pool.putconn(FakeConnection())
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(pool.stats()['idle'], 1)
+
+    def test_min_size_is_filled(self):
+        """The first checkout opens the connections kept warm in the background."""
+        pool = ConnectionPool(FakeConnection, min_size=3)
+        pool.getconn()
+        deadline = time.monotonic() + 5
+        while pool.stats()['size'] < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual((pool.stats()['size'], pool.stats()['idle']), (3, 2))
+
+    def test_expired_connections_are_closed(self):
+        """Connections past max_lifetime or max_idle are not reused."""
+        pool = ConnectionPool(FakeConnection, max_lifetime=0.01)
+        connection = pool.getconn()
+        time.sleep(0.02)
+        pool.putconn(connection)
+        self.assertTrue(connection.closed)
+
+        pool = ConnectionPool(FakeConnection, max_idle=0.01)
+        connection = pool.getconn()
+        pool.putconn(connection)
+        time.sleep(0.02)
+        self.assertIsNot(pool.getconn(), connection)
+        self.assertTrue(connection.closed)
+
+    def test_open_transactions_are_rolled_back(self):
+        """A connection returned inside a transaction is rolled back."""
+        pool = ConnectionPool(FakeConnection)
+        connection = pool.getconn()
+        connection.autocommit = False
+        pool.putconn(connection)
+        self.assertEqual(connection.rollbacks, 1)
+
+    def test_pool_is_recreated_after_fork(self):
+        """A pool created by another process is never reused."""
+        pool = get_pool(('fork-test',), lambda: ConnectionPool(FakeConnection))
+        pool.pid = -1
+        self.assertIsNot(get_pool(('fork-test',), lambda: ConnectionPool(FakeConnection)), pool)
+
+
+class PooledBackendTests(TestCase):
+    """Test the pooled backend against the real database."""
+
+    def test_connection_is_returned_to_pool(self):
+        """Closing the Django connection keeps the server connection open."""
+        wrapper = DatabaseWrapper(connections['default'].settings_dict.copy(), alias='pool-test')
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        raw_connection = wrapper.connection
+        wrapper.close()
+        self.assertFalse(raw_connection.closed)
+
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.assertIs(wrapper.connection, raw_connection)
+        wrapper.close()
+        wrapper._pool.close()
@@ -0,0 +1,57 @@
+"""
+Tests for the API-only application profile.
+"""
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+CHECK = """
+import json
+import sys
+
+import django
+from django.urls import NoReverseMatch, resolve, reverse
+
+
+
+def routed(name):
+    try:
+        reverse(name)
+    except NoReverseMatch:
+        return False
+    return True
+
+
+django.setup()
+resolve('/api/v1/post/')
+print(json.dumps({'docs': routed('schema'), 'admin': routed('admin:index'), 'modules': sorted(sys.modules)}))
+"""
+
+
+class AppProfileTests(SimpleTestCase):
+    """Test what API-only workers load."""
+
+    def load(self, profile):
+        env = {**os.environ, 'APP_PROFILE': profile, 'DJANGO_SETTINGS_MODULE': 'blog.settings'}
+        output = subprocess.run(
+            [sys.executable, '-c', CHECK], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        return json.loads(output)
+
+    def test_api_profile(self):
+        """The docs and the dev tools are not imported, the admin is not routed."""
+        result = self.load('api')
+        self.assertFalse(result['docs'])
+        self.assertFalse(result['admin'])
+        for module in ('drf_spectacular.views', 'drf_spectacular.openapi', 'django_extensions'):
+            self.assertNotIn(module, result['modules'])
+
+    def test_full_profile(self):
+        """The default profile serves the docs and the admin."""
+        result = self.load('full')
+        self.assertTrue(result['docs'])
+        self.assertTrue(result['admin'])
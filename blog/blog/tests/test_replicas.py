@@ -0,0 +1,90 @@
+"""
+Tests for the read replica router and pinning middleware.
+"""
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from app.models import Post
+from blog import routers
+from blog.middleware import ReplicaPinningMiddleware
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0', 'replica_1'], REPLICA_MAX_LAG=10)
+class ReplicaRouterTests(SimpleTestCase):
+    """Test where the router sends reads and writes."""
+
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        token = routers.set_pinned(False)
+        self.addCleanup(routers.reset_pinned, token)
+
+    def test_reads_go_to_replicas(self):
+        """Unpinned reads use a replica."""
+        with mock.patch('blog.routers.replica_lag', return_value=0):
+            self.assertIn(self.router.db_for_read(Post), ['replica_0', 'replica_1'])
+
+    def test_lagging_replicas_are_skipped(self):
+        """Replicas behind the lag threshold or unreachable are not used."""
+        lags = {'replica_0': 30.0, 'replica_1': 1.0}
+        with mock.patch('blog.routers.replica_lag', side_effect=lags.get):
+            self.assertEqual(self.router.db_for_read(Post), 'replica_1')
+        with mock.patch('blog.routers.replica_lag', return_value=None):
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_write_pins_following_reads(self):
+        """After a write the rest of the request reads from the primary."""
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+        with mock.patch('blog.routers.replica_lag', return_value=0):
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_migrations_only_on_primary(self):
+        """Replicas are never migrated."""
+        self.assertTrue(self.router.allow_migrate('default', 'app'))
+        self.assertFalse(self.router.allow_migrate('replica_0', 'app'))
+
+
+@override_settings(REPLICA_PIN_SECONDS=5)
+class ReplicaPinningMiddlewareTests(SimpleTestCase):
+    """Test the read-your-writes cookie."""
+
+    def setUp(self):
+        token = routers.set_pinned(False)
+        self.addCleanup(routers.reset_pinned, token)
+        self.factory = RequestFactory()
+        self.seen = []
+
+        def view(request):
+            self.seen.append(routers.is_pinned())
+            return HttpResponse()
+        self.middleware = ReplicaPinningMiddleware(view)
+
+    def test_write_sets_cookie(self):
+        """Unsafe requests are pinned and set the pin cookie."""
+        response = self.middleware(self.factory.post('/api/v1/post/'))
+        self.assertEqual(self.seen, [True])
+        self.assertEqual(response.cookies['primary_pin']['max-age'], 5)
+        self.assertFalse(routers.is_pinned())
+
+    def test_read_with_cookie_is_pinned(self):
+        """Reads sent back with the cookie stay on the primary."""
+        self.middleware(self.factory.get('/api/v1/post/'))
+        request = self.factory.get('/api/v1/post/')
+        request.COOKIES['primary_pin'] = '1'
+        response = self.middleware(request)
+        self.assertEqual(self.seen, [False, True])
+        self.assertNotIn('primary_pin', response.cookies)
+
+    async def test_async_pin_from_sync_code(self):
+        """Under ASGI, a pin set by sync code run in a thread still sets the cookie."""
+        async def view(request):
+            await sync_to_async(routers.pin_to_primary)()
+            return HttpResponse()
+        middleware = ReplicaPinningMiddleware(view)
+
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = await middleware(self.factory.get('/api/v1/post/'))
+        self.assertIn('primary_pin', response.cookies)
+        self.assertFalse(routers.is_pinned())
@@ -0,0 +1,79 @@
+"""
+Tests for the cached OpenAPI schema.
+"""
+import gzip
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from drf_spectacular.generators import SchemaGenerator
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from blog import schema
+
+
+class CachedSchemaTests(TestCase):
+    """Test the schema is generated once and served from memory."""
+
+    def setUp(self):
+        schema.clear()
+        self.addCleanup(schema.clear)
+        self.client = APIClient()
+        self.url = reverse('schema')
+
+    def test_schema_is_generated_once(self):
+        """Later requests reuse the rendered schema."""
+        with mock.patch.object(SchemaGenerator, 'get_schema', autospec=True, side_effect=SchemaGenerator.get_schema) as get_schema:
+            first = self.client.get(self.url)
+            second = self.client.get(self.url)
+        self.assertEqual(get_schema.call_count, 1)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.content, second.content)
+        self.assertIn(b'BLOG API', first.content)
+
+    def test_unknown_version_and_language(self):
+        """Versions and languages outside the settings are rendered without being kept."""
+        for params in ({'version': 'v9'}, {'lang': 'xx'}, {'version': 'v9', 'lang': 'xx'}):
+            self.assertEqual(self.client.get(self.url, params).status_code, status.HTTP_200_OK)
+        self.assertEqual(schema._renderings, {})
+
+        self.client.get(self.url, {'lang': 'fr'})
+        self.assertEqual(len(schema._renderings), 1)
+
+    def test_formats_are_cached_separately(self):
+        """JSON and YAML renderings do not share a cache entry."""
+        yaml_response = self.client.get(self.url)
+        json_response = self.client.get(self.url, HTTP_ACCEPT='application/vnd.oai.openapi+json')
+        self.assertEqual(json_response['Content-Type'], 'application/vnd.oai.openapi+json')
+        self.assertEqual(json.loads(json_response.content)['info']['title'], 'BLOG API')
+        self.assertNotEqual(yaml_response['ETag'], json_response['ETag'])
+
+    def test_not_modified(self):
+        """A matching If-None-Match gets an empty 304."""
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+    def test_gzip(self):
+        """Clients accepting gzip get the precompressed copy."""
+        plain = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_schema_file(self):
+        """The schema written at build time is served without generation."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'schema.json')
+            with open(path, 'w') as schema_file:
+                json.dump({'openapi': '3.0.3', 'info': {'title': 'From file', 'version': '1'}, 'paths': {}}, schema_file)
+            with override_settings(SPECTACULAR_SCHEMA_FILE=path), mock.patch.object(SchemaGenerator, 'get_schema') as get_schema:
+                response = self.client.get(self.url, HTTP_ACCEPT='application/json')
+        get_schema.assert_not_called()
+        self.assertEqual(json.loads(response.content)['info']['title'], 'From file')
@@ -0,0 +1,54 @@
+"""
+Tests for the middleware limited to the admin.
+"""
+from django.core.handlers.asgi import ASGIHandler
+from django.test import Client, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from app.tests.factories import UserFactory
+
+
+class StatefulPathsTests(TestCase):
+    """Test sessions and CSRF only apply to the admin."""
+
+    def test_api_is_stateless(self):
+        """API requests get no session and set no cookie."""
+        client = APIClient()
+        client.force_authenticate(user=UserFactory())
+        response = client.get(reverse('app:post-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(hasattr(response.wsgi_request, 'session'))
+        self.assertEqual(response.cookies, {})
+
+    def test_admin_csrf(self):
+        """The admin login form is still protected against CSRF."""
+        client = Client(enforce_csrf_checks=True)
+        response = client.get(reverse('admin:login'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('csrftoken', response.cookies)
+
+        response = client.post(reverse('admin:login'), {'username': 'admin', 'password': 'password'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_admin_session(self):
+        """Admin requests get the session, user and messages."""
+        response = Client().get(reverse('admin:login'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(hasattr(response.wsgi_request, 'session'))
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
+        self.assertTrue(hasattr(response.wsgi_request, '_messages'))
+
+    async def test_async_chain(self):
+        """Under ASGI no middleware runs in a thread, the admin still gets its session."""
+        # Django logs every middleware it adapts, in debug mode.
+        with self.settings(DEBUG=True), self.assertNoLogs('django.request', 'DEBUG'):
+            ASGIHandler()
+
+        response = await self.async_client.get(reverse('admin:login'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(hasattr(response.asgi_request, 'session'))
+        self.assertIn('csrftoken', response.cookies)
@@ -0,0 +1,115 @@
+"""
+Tests for the token bucket throttles.
+"""
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from app.models import Post
+from app.tests.factories import UserFactory
+from blog.throttling import LocalBuckets
+
+RATES = {'login.ip': '2/min', 'login.username': '3/min', 'write.user': '1/min'}
+
+
+@override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': RATES})
+class ThrottleTests(TestCase):
+    """Test requests over their bucket are rejected early."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = UserFactory()
+        self.post = Post.objects.create(author=self.user, title='title', category='news', tags=[])
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {user.tokens()['access']}")
+
+    def test_login_by_ip(self):
+        """Logins from one IP beyond the burst get a 429 with Retry-After."""
+        url = reverse('app:session-login')
+        credentials = {'username': self.user.username, 'password': 'wrong password'}
+        for _ in range(2):
+            self.assertEqual(self.client.post(url, credentials).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        with self.assertNumQueries(0):
+            response = self.client.post(url, credentials)
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '30')
+
+    def test_forwarded_for_is_ignored(self):
+        """A client rotating X-Forwarded-For stays in the bucket of its address."""
+        url = reverse('app:session-login')
+        credentials = {'username': self.user.username, 'password': 'wrong password'}
+        for address in ('10.0.0.1', '10.0.0.2'):
+            self.client.post(url, credentials, HTTP_X_FORWARDED_FOR=address)
+
+        response = self.client.post(url, credentials, HTTP_X_FORWARDED_FOR='10.0.0.3')
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_login_by_username(self):
+        """Logins to one username are throttled across IPs, other usernames are not."""
+        url = reverse('app:session-login')
+        credentials = {'username': self.user.username, 'password': 'wrong password'}
+        for address in ('10.0.0.1', '10.0.0.2', '10.0.0.3'):
+            response = self.client.post(url, credentials, REMOTE_ADDR=address)
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = self.client.post(url, credentials, REMOTE_ADDR='10.0.0.4')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        response = self.client.post(url, {**credentials, 'username': 'other'}, REMOTE_ADDR='10.0.0.4')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_writes_by_user(self):
+        """Rejected writes never load the user."""
+        url = reverse('app:comment-list')
+        self.authenticate(self.user)
+        self.assertEqual(self.client.post(url, {'post': self.post.id, 'text': 'first'}).status_code, status.HTTP_201_CREATED)
+
+        with self.assertNumQueries(0):
+            response = self.client.post(url, {'post': self.post.id, 'text': 'second'})
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.authenticate(UserFactory())
+        self.assertEqual(self.client.post(url, {'post': self.post.id, 'text': 'other'}).status_code, status.HTTP_201_CREATED)
+
+    @override_settings(THROTTLE_ENABLED=False)
+    def test_disabled(self):
+        """With throttling off, logins go on beyond the burst."""
+        url = reverse('app:session-login')
+        credentials = {'username': self.user.username, 'password': 'wrong password'}
+        for _ in range(4):
+            self.assertEqual(self.client.post(url, credentials).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_reads_are_not_throttled(self):
+        """Actions without a scope are not throttled."""
+        self.authenticate(self.user)
+        for _ in range(3):
+            self.assertEqual(self.client.get(reverse('app:comment-list')).status_code, status.HTTP_200_OK)
+
+
+class LocalBucketsTests(TestCase):
+    """Test the in-process token buckets."""
+
+    @mock.patch('blog.throttling.time.monotonic')
+    def test_refill(self, monotonic):
+        """Tokens refill continuously up to the capacity."""
+        buckets = LocalBuckets()
+        monotonic.return_value = 100.0
+        self.assertEqual([buckets.take('key', 2, 0.5) for _ in range(3)], [0, 0, 2.0])
+        monotonic.return_value = 101.0
+        self.assertEqual(buckets.take('key', 2, 0.5), 1.0)
+        monotonic.return_value = 200.0
+        self.assertEqual([buckets.take('key', 2, 0.5) for _ in range(3)], [0, 0, 2.0])
+
+    def test_max_size(self):
+        """The least recently used buckets are dropped."""
+        buckets = LocalBuckets(max_size=2)
+        for key in ('a', 'b', 'a', 'c'):
+            buckets.take(key, 1, 1)
+        self.assertEqual(list(buckets.buckets), ['a', 'c'])
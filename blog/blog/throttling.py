@@ -0,0 +1,200 @@
+"""
+Token bucket throttles, checked before authentication.
+
+A view opts in with ``ThrottledViewMixin`` and ``throttle_scopes``, a dict
+mapping actions on viewsets, or lowercase methods on other views, to a
+scope. Each scope has a bucket per client IP, one per user and one per
+``username`` sent in the body, with rates in ``DEFAULT_THROTTLE_RATES`` under
+``<scope>.ip``, ``<scope>.user`` and ``<scope>.username`` written
+``<capacity>/<period>``: bursts of up to capacity requests, refilled at
+capacity per period. Scopes without a rate for a kind are not throttled by it.
+``THROTTLE_ENABLED = False`` turns them all off, for load tests.
+
+The client IP is ``REMOTE_ADDR``, or with ``NUM_PROXIES`` set the address
+those trusted proxies put in ``X-Forwarded-For``: entries a client adds
+itself are ignored.
+
+Buckets live in Redis when it is the default cache, updated by a Lua script
+in one atomic round trip. Otherwise, or while Redis fails, they live in this
+process.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# Returns the seconds to wait for a token, 0 when one was taken. Redis
+# truncates Lua numbers to integers, hence the string.
+TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return tostring(wait)
+"""
+
+
+def parse_rate(rate):
+    """Return ``(capacity, tokens per second)`` of a ``'<capacity>/<period>'`` rate."""
+    capacity, period = rate.split('/')
+    return int(capacity), int(capacity) / PERIODS[period[0]]
+
+
+class LocalBuckets:
+    """Buckets of this process, the least recently used are dropped past ``max_size``."""
+
+    def __init__(self, max_size=100000):
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.buckets = OrderedDict()
+
+    def take(self, key, capacity, rate):
+        with self.lock:
+            now = time.monotonic()
+            tokens, updated = self.buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self.buckets[key] = (tokens, now)
+            if len(self.buckets) > self.max_size:
+                self.buckets.popitem(last=False)
+            return wait
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+class RedisBuckets:
+    """Buckets shared by every worker through the Redis cache."""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def take(self, key, capacity, rate):
+        key = self.cache.make_and_validate_key(key)
+        client = self.cache._cache.get_client(key, write=True)
+        return float(client.register_script(TAKE_SCRIPT)(keys=[key], args=[capacity, rate]))
+
+
+local_buckets = LocalBuckets()
+
+
+def take(key, capacity, rate):
+    """Take a token from bucket ``key``, return the seconds to wait when empty."""
+    cache = caches['default']
+    if isinstance(cache, RedisCache):
+        try:
+            return RedisBuckets(cache).take(key, capacity, rate)
+        except Exception:  # redis.RedisError, redis is only installed with a Redis cache.
+            logger.warning('Throttle buckets unavailable in Redis, using in-process buckets', exc_info=True)
+    return local_buckets.take(key, capacity, rate)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttle by the bucket of the view's scope for the key of ``kind``."""
+    kind = None
+
+    def __init__(self):
+        self.delay = None
+
+    def get_scope(self, request, view):
+        scopes = getattr(view, 'throttle_scopes', {})
+        return scopes.get(getattr(view, 'action', None) or request.method.lower())
+
+    def get_key(self, request):
+        raise NotImplementedError('.get_key() must be overridden')
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(request, view) if settings.THROTTLE_ENABLED else None
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(f'{scope}.{self.kind}') if scope else None
+        key = self.get_key(request) if rate else None
+        if key is None:
+            return True
+        self.delay = take(f'throttle:{scope}:{self.kind}:{key}', *parse_rate(rate))
+        return not self.delay
+
+    def wait(self):
+        return math.ceil(self.delay) if self.delay else None
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    kind = 'ip'
+
+    def get_key(self, request):
+        return self.get_ident(request)
+
+
+class UsernameTokenBucketThrottle(TokenBucketThrottle):
+    """Keyed by the ``username`` of the request body, whatever the IP it comes from."""
+    kind = 'username'
+
+    def get_key(self, request):
+        username = request.data.get('username') if isinstance(request.data, dict) else None
+        if not isinstance(username, str) or not username:
+            return None
+        return hashlib.sha256(username.encode()).hexdigest()
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """Keyed by the user id claim of the access token, the user is not loaded."""
+    kind = 'user'
+
+    def get_key(self, request):
+        authentication = JWTAuthentication()
+        header = authentication.get_header(request)
+        raw_token = authentication.get_raw_token(header) if header else None
+        if raw_token is None:
+            return None
+        try:
+            return authentication.get_validated_token(raw_token).get(jwt_settings.USER_ID_CLAIM)
+        except InvalidToken:
+            return None
+
+
+class ThrottledViewMixin:
+    """Check the token bucket throttles before authentication.
+
+    Rejected requests are answered without loading the user or touching the
+    database at all.
+    """
+    throttle_classes = [IPTokenBucketThrottle, UsernameTokenBucketThrottle, UserTokenBucketThrottle]
+    throttle_scopes = {}
+
+    def perform_authentication(self, request):
+        super().check_throttles(request)
+        super().perform_authentication(request)
+
+    def check_throttles(self, request):
+        # Already checked by perform_authentication.
+        pass
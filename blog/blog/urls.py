@@ -14,15 +14,13 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.apps import apps
 from django.conf import settings
 from django.conf.urls.static import static
-from django.contrib import admin
 from django.urls import include, path
-from drf_spectacular.views import (SpectacularAPIView, SpectacularRedocView,
-                                   SpectacularSwaggerView)
 from rest_framework_simplejwt.views import TokenRefreshView
 
-from blog import utils
+from blog import metrics, utils
 
 api_v1_routes = [
     path('api/v1/', include(
@@ -33,17 +31,34 @@ api_v1_routes = [
 ]
 
 confpatterns = [
-    path('admin/', admin.site.urls),
     path('api/health-check/', utils.health_check, name='health-check'),
-    # Documentation
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
-    path('api/schema/swagger/', SpectacularSwaggerView.as_view(template_name="swagger-ui.html", url_name='schema'), name='swagger-ui'),
-    path('api/schema/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
+    path('api/health-check/ready/', utils.readiness, name='readiness'),
+    path('api/metrics/', metrics.metrics_view, name='metrics'),
     # JWT
     # path('api/token/', TokenObtainPairView.as_view(), name='api_token'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 ]
 
+# The admin and the documentation are only imported when their apps are
+# installed, see APP_PROFILE.
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+
+    confpatterns.insert(0, path('admin/', admin.site.urls))
+
+if apps.is_installed('drf_spectacular'):
+    from drf_spectacular.views import (SpectacularRedocView,
+                                       SpectacularSwaggerView)
+
+    from blog.schema import CachedSpectacularAPIView
+
+    confpatterns += [
+        # Documentation
+        path('api/schema/', CachedSpectacularAPIView.as_view(), name='schema'),
+        path('api/schema/swagger/', SpectacularSwaggerView.as_view(template_name="swagger-ui.html", url_name='schema'), name='swagger-ui'),
+        path('api/schema/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
+    ]
+
 urlpatterns = confpatterns + api_v1_routes
 
 if settings.DEBUG:
@@ -1,10 +1,117 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connections, transaction
+from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 
+from blog import pool
+
+_readiness_lock = threading.Lock()
+_readiness = None
+
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def health_check(request):
-    """Returns successful response."""
-    return Response({'healthy': True})
+    """Liveness, returns successful response, with the DB pool statistics when pooling."""
+    data = {'healthy': True}
+    pools = pool.stats()
+    if pools:
+        data['pools'] = pools
+    return Response(data)
+
+
+def timed(probe, *args):
+    """Run ``probe`` and return its outcome with its latency in milliseconds."""
+    start = time.perf_counter()
+    try:
+        probe(*args)
+        result = {'ok': True}
+    except Exception as exc:
+        result = {'ok': False, 'error': f'{type(exc).__name__}: {exc}'.strip()}
+    result['latency_ms'] = round((time.perf_counter() - start) * 1000, 2)
+    return result
+
+
+def probe_database(alias):
+    timeout = int(settings.READINESS_PROBE_TIMEOUT * 1000)
+    try:
+        with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+            cursor.execute('SET LOCAL statement_timeout = %s', [timeout])
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    finally:
+        # Probes run in a thread of their own, don't leave its connection open.
+        connections[alias].close()
+
+
+def probe_cache():
+    key = 'readiness-probe'
+    caches['default'].set(key, 1, timeout=10)
+    if caches['default'].get(key) != 1:
+        raise RuntimeError('cache did not return the value set')
+
+
+def run_probes():
+    """Return ``(ready, probes)``; replicas are optional since reads fall back to the primary.
+
+    Probes run in parallel threads. Those without an answer after
+    READINESS_PROBE_TIMEOUT seconds fail, whether they are still connecting
+    or waiting for the query.
+    """
+    checks = {}
+    required = []
+    for alias in settings.DATABASES:
+        name = f'database:{alias}'
+        checks[name] = (probe_database, alias)
+        if alias not in settings.DATABASE_REPLICAS:
+            required.append(name)
+    if not isinstance(caches['default'], (LocMemCache, DummyCache)):
+        checks['cache'] = (probe_cache,)
+        required.append('cache')
+    executor = ThreadPoolExecutor(max_workers=len(checks), thread_name_prefix='readiness')
+    futures = {name: executor.submit(timed, *check) for name, check in checks.items()}
+    executor.shutdown(wait=False)
+    done, _ = wait(futures.values(), timeout=settings.READINESS_PROBE_TIMEOUT)
+    probes = {}
+    for name, future in futures.items():
+        probes[name] = future.result() if future in done else {
+            'ok': False,
+            'error': f'TimeoutError: no answer in {settings.READINESS_PROBE_TIMEOUT}s',
+            'latency_ms': round(settings.READINESS_PROBE_TIMEOUT * 1000, 2),
+        }
+    for alias, stats in pool.stats().items():
+        probes[f'pool:{alias}'] = stats
+    return all(probes[name]['ok'] for name in required), probes
+
+
+def readiness_state():
+    """Return the readiness state, probing at most every READINESS_PROBE_TTL seconds."""
+    global _readiness
+    with _readiness_lock:
+        now = time.monotonic()
+        if _readiness is None or now - _readiness['probed_at'] >= settings.READINESS_PROBE_TTL:
+            ready, probes = run_probes()
+            _readiness = {'probed_at': now, 'ready': ready, 'probes': probes}
+        return _readiness
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def readiness(request):
+    """Readiness, 503 when a required dependency does not answer in time."""
+    state = readiness_state()
+    data = {
+        'ready': state['ready'],
+        'age_ms': round((time.monotonic() - state['probed_at']) * 1000, 2),
+        'probes': state['probes'],
+    }
+    return Response(data, status=status.HTTP_200_OK if state['ready'] else status.HTTP_503_SERVICE_UNAVAILABLE)
@@ -0,0 +1,14 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def enforce_query_budgets(settings):
+    """Fail any test whose requests go over a view's query_budget."""
+    settings.QUERY_BUDGET_ENFORCE = True
+
+
+@pytest.fixture(autouse=True)
+def reset_throttle_buckets():
+    """Start every test with full throttle buckets."""
+    from blog.throttling import local_buckets
+    local_buckets.clear()